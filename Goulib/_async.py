@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# coding: utf8
+"""
+asyncio part of :mod:`Goulib.decorators`, in a separate module
+because its syntax is invalid in Python 2
+"""
+
+import asyncio, functools, time
+
+def timeout_wrapper(func, timeout, executor, stats):
+    """
+    :param func: function to run in a thread pool
+    :param timeout: float max running time in seconds
+    :param executor: function returning the concurrent.futures.Executor to use
+    :param stats: decorators._Stats updated at each call
+    :return: coroutine function calling func, cancelled after timeout
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        loop=getattr(asyncio,'get_running_loop',asyncio.get_event_loop)() # Python < 3.7
+        start=time.time()
+        timedout=False
+        try:
+            future=loop.run_in_executor(executor(), functools.partial(func, *args, **kwargs))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            timedout=True
+            raise
+        finally: # calls raising exceptions are counted too
+            stats.add(time.time()-start, timedout)
+    return wrapper
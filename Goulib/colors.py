@@ -159,9 +159,10 @@ def convert(color,source,target):
     """convert a color between colorspaces,
     eventually using intermediary steps
     """
+    import networkx as nx
     source,target=source.lower(),target.lower()
     if source==target: return color
-    path=converters.shortest_path(source, target)
+    path=nx.shortest_path(converters, source, target) # fewest conversions
     for u,v in itertools2.pairwise(path):
         color=converters[u][v][0]['f'](color)
     return color #isn't it beautiful ?
@@ -239,7 +240,7 @@ class Color(object):
         target=target.lower() if target else self.space
         if target not in self._values:
             try:
-                path=converters.shortest_path(self.space, target)
+                path=nx.shortest_path(converters, self.space, target) # fewest conversions
             except nx.exception.NetworkXNoPath:
                 raise NotImplementedError(
                     'no conversion between %s and %s color spaces'
@@ -241,6 +241,12 @@ class SortedCollection(object):
         if i != len(self):
             return self._items[i]
         raise ValueError('No item found with key above: %r' % (k,))
+
+    def find_range(self, lo=None, hi=None):
+        'Return list of items with lo <= key <= hi. A None bound is ignored'
+        i = 0 if lo is None else bisect_left(self._keys, lo)
+        j = len(self) if hi is None else bisect_right(self._keys, hi)
+        return self._items[i:j]
     
 class Sequence(object):
     """combines a generator and a read-only list
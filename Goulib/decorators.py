@@ -8,17 +8,191 @@ __copyright__ = "Copyright 2015, Philippe Guglielmetti"
 __credits__ = ["http://include.aorcsik.com/2014/05/28/timeout-decorator/"]
 __license__ = "LGPL + MIT"
 
-import functools
+import functools, collections, threading, time
+
+CacheInfo=collections.namedtuple('CacheInfo',['hits', 'misses', 'maxsize', 'currsize'])
+
+class _kwd_mark_class(object):
+    """separates args from kwargs in keys. Its repr is stable across processes,
+    unlike the one of an object(), so keys can be persisted
+    """
+
+_kwd_mark=(_kwd_mark_class,)
+
+def _make_key(args, kwargs, typed):
+    """:return: hashable key for a function call"""
+    key=args
+    if kwargs:
+        key+=_kwd_mark+tuple(sorted(kwargs.items()))
+    if typed:
+        key+=tuple(type(v) for v in args)
+        if kwargs:
+            key+=tuple(type(v) for _,v in sorted(kwargs.items()))
+    try:
+        hash(key)
+    except TypeError: # unhashable args such as lists
+        key=str(args)+str(kwargs)
+    return key
+
+class _LFU(object):
+    """least frequently used eviction in O(1)
+    keys are grouped in buckets of equal use counts, oldest first"""
+    def __init__(self):
+        self.count={} # key -> count
+        self.buckets=collections.defaultdict(collections.OrderedDict)
+        self.min=0
+
+    def touch(self,key):
+        c=self.count.get(key,0)
+        if c:
+            b=self.buckets[c]
+            del b[key]
+            if not b:
+                del self.buckets[c]
+                if self.min==c:
+                    self.min=c+1
+        else:
+            self.min=1
+        self.count[key]=c+1
+        self.buckets[c+1][key]=None
+
+    def pop(self):
+        """removes and returns the least frequently used key"""
+        b=self.buckets[self.min]
+        key,_=b.popitem(last=False)
+        if not b:
+            del self.buckets[self.min]
+            self.min=min(self.buckets) if self.buckets else 0
+        del self.count[key]
+        return key
+
+    def discard(self,key):
+        c=self.count.pop(key,0)
+        if c:
+            b=self.buckets[c]
+            del b[key]
+            if not b:
+                del self.buckets[c]
+                if self.min==c:
+                    self.min=min(self.buckets) if self.buckets else 0
+
+    def clear(self):
+        self.__init__()
 
 #http://wiki.python.org/moin/PythonDecoratorLibrary
-def memoize(obj):
-    cache = obj.cache = {}
+def memoize(obj=None, maxsize=None, policy='lru', ttl=None, typed=False, filename=None):
+    """caches the results of a function
+
+    can be used as @memoize or with parameters as @memoize(maxsize=1000)
+
+    :param maxsize: int max number of cached results, None for unbounded
+    :param policy: string 'lru' (least recently used) or 'lfu' (least frequently used)
+      results evicted first when maxsize is reached
+    :param ttl: float time to live of cached results in seconds, None for infinite
+    :param typed: bool if True, arguments of different types are cached separately
+    :param filename: string optional path of a :mod:`shelve` file where results are
+      persisted, so they survive restarts. Results must be picklable.
+      The file is synced after each new result and closed at exit
+    :return: decorated function with additional cache, cache_info() and cache_clear() attributes.
+      cache is the dict of results, also set as obj.cache, whose keys are built from the arguments
+    """
+    if obj is None:
+        return functools.partial(memoize, maxsize=maxsize, policy=policy, ttl=ttl, typed=typed, filename=filename)
+
+    if policy not in ('lru','lfu'):
+        raise ValueError('unknown policy %s'%policy)
+    cache=collections.OrderedDict() # key -> result
+    expiry={} # key -> expiration time, if ttl
+    lfu=_LFU() if policy=='lfu' else None
+    lock=threading.RLock()
+    stats=[0,0] # hits, misses
+    shelf=None
+    if filename:
+        import shelve, atexit
+        shelf=shelve.open(filename)
+        atexit.register(shelf.close)
+
     @functools.wraps(obj)
     def memoizer(*args, **kwargs):
-        key = str(args) + str(kwargs)
-        if key not in cache:
-            cache[key] = obj(*args, **kwargs)
-        return cache[key]
+        key=_make_key(args, kwargs, typed)
+        with lock:
+            try:
+                result=cache[key]
+            except KeyError:
+                pass
+            else:
+                expires=expiry.get(key)
+                if expires is None or expires>time.time():
+                    stats[0]+=1
+                    if lfu:
+                        lfu.touch(key)
+                    else: # move to end as most recently used
+                        cache[key]=cache.pop(key)
+                    return result
+                del cache[key] # expired
+                del expiry[key]
+                if lfu:
+                    lfu.discard(key)
+            stats[1]+=1
+            if shelf is not None:
+                skey=repr(key)
+                try:
+                    result,expires=shelf[skey]
+                except KeyError:
+                    pass
+                else:
+                    if expires is None or expires>time.time():
+                        stats[0]+=1
+                        stats[1]-=1
+                        _store(key,result,expires)
+                        return result
+        result=obj(*args, **kwargs) # computed without holding the lock
+        with lock:
+            expires=None if ttl is None else time.time()+ttl
+            _store(key,result,expires)
+            if shelf is not None:
+                shelf[repr(key)]=(result,expires)
+                shelf.sync() # written through, so results survive crashes too
+        return result
+
+    def _store(key,result,expires):
+        if key in cache:
+            del cache[key]
+        elif maxsize is not None:
+            while cache and len(cache)>=maxsize:
+                old=lfu.pop() if lfu else next(iter(cache))
+                del cache[old]
+                expiry.pop(old,None)
+        if maxsize!=0:
+            cache[key]=result
+            if expires is not None:
+                expiry[key]=expires
+            if lfu:
+                lfu.touch(key)
+
+    def cache_info():
+        """:return: CacheInfo namedtuple (hits, misses, maxsize, currsize)"""
+        with lock:
+            return CacheInfo(stats[0],stats[1],maxsize,len(cache))
+
+    def cache_clear():
+        """clears the in-memory cache and statistics. the shelve file is kept"""
+        with lock:
+            cache.clear()
+            expiry.clear()
+            if lfu:
+                lfu.clear()
+            stats[:]=[0,0]
+
+    memoizer.cache=cache
+    try:
+        obj.cache=cache # as in previous versions
+    except AttributeError: # builtins, methods
+        pass
+    memoizer.cache_info=cache_info
+    memoizer.cache_clear=cache_clear
+    if shelf is not None:
+        memoizer.shelf=shelf
     return memoizer
 
 
@@ -57,37 +231,263 @@ def nodebug(func):
 
 import multiprocessing
 from multiprocessing.pool import ThreadPool
+from multiprocessing import TimeoutError
 import six.moves._thread as thread
 import threading
 import weakref
- 
-thread_pool = None
- 
-def get_thread_pool():
-    global thread_pool
-    if thread_pool is None:
-        # fix for python <2.7.2
-        if not hasattr(threading.current_thread(), "_children"):
-            threading.current_thread()._children = weakref.WeakKeyDictionary()
-        thread_pool = ThreadPool(processes=1)
-    return thread_pool
- 
-def timeout(timeout):
+import pickle
+
+thread_pools = {} # number of workers -> ThreadPool
+
+def get_thread_pool(processes=None):
+    """:return: shared ThreadPool with the given number of workers (default: number of CPUs)"""
+    processes=processes or multiprocessing.cpu_count()
+    try:
+        return thread_pools[processes]
+    except KeyError:
+        pass
+    # fix for python <2.7.2
+    if not hasattr(threading.current_thread(), "_children"):
+        threading.current_thread()._children = weakref.WeakKeyDictionary()
+    pool = thread_pools[processes] = ThreadPool(processes=processes)
+    return pool
+
+class _Stats(dict):
+    """per function timing and timeout counters"""
+    def __init__(self):
+        super(_Stats,self).__init__(calls=0, timeouts=0, time=0.)
+        self.lock=threading.Lock()
+
+    def add(self, elapsed, timedout=False):
+        with self.lock:
+            self['calls']+=1
+            self['time']+=elapsed
+            if timedout:
+                self['timeouts']+=1
+
+def _reference(func):
+    """:return: (module,name) tuple to import func in a child process,
+    or func itself if it cannot be resolved by module and name (lambdas, local functions,
+    functools.partial and other callable objects)
+    decorated functions cannot be pickled as their name refers to the decorator's wrapper
+    """
+    name=getattr(func,'__qualname__',getattr(func,'__name__',None))
+    module=getattr(func,'__module__',None)
+    if not name or not module or '<' in name:
+        return func
+    try:
+        if _resolve((module,name)) is func:
+            return module,name
+    except (ImportError,AttributeError):
+        pass
+    return func
+
+def _resolve(ref):
+    """:return: function referenced by :func:`_reference`, undecorated"""
+    if not isinstance(ref,tuple):
+        return ref
+    import importlib
+    module,name=ref
+    res=importlib.import_module(module)
+    for attr in name.split('.'):
+        res=getattr(res,attr)
+    return getattr(res,'_undecorated',res)
+
+def _run_in_process(conn, func, args, kwargs):
+    """process target sending back result or exception through a pipe"""
+    try:
+        conn.send((True,func(*args, **kwargs)))
+    except Exception as e:
+        conn.send((False,e))
+    finally:
+        conn.close()
+
+def _worker(conn):
+    """worker process loop: receives (ref,args,kwargs) tasks through a pipe
+    and sends back results or exceptions, until the pipe is closed
+    """
+    while True:
+        try:
+            ref,args,kwargs=conn.recv()
+        except EOFError:
+            break
+        try:
+            res=(True,_resolve(ref)(*args, **kwargs))
+        except Exception as e:
+            res=(False,e)
+        try:
+            conn.send(res)
+        except Exception as e: # result or exception cannot be pickled
+            conn.send((False,RuntimeError(repr(e))))
+    conn.close()
+
+class _ProcessPool(object):
+    """pool of worker processes reused across calls.
+    A worker that times out is terminated and replaced by a new one on next call,
+    so runaway work is actually stopped, unlike in a multiprocessing.Pool
+    """
+    def __init__(self, processes):
+        self.slots=threading.BoundedSemaphore(processes)
+        self.lock=threading.Lock()
+        self.idle=[] # (process,connection) of workers waiting for a task
+
+    def _start(self):
+        parent,child=multiprocessing.Pipe()
+        p=multiprocessing.Process(target=_worker, args=(child,))
+        p.daemon=True
+        p.start()
+        child.close()
+        return p,parent
+
+    def _kill(self, p, conn):
+        if p.is_alive():
+            p.terminate()
+        p.join()
+        conn.close()
+
+    def _send(self, task, timeout):
+        """runs a pickled task in an idle worker, or in a new one if none is idle
+        :return: (ok,result or exception) tuple
+        """
+        with self.lock:
+            worker=self.idle.pop() if self.idle else None
+        if worker is not None and not worker[0].is_alive():
+            self._kill(*worker)
+            worker=None
+        if worker is None:
+            worker=self._start()
+        p,conn=worker
+        try:
+            conn.send_bytes(task)
+            if not conn.poll(timeout):
+                raise TimeoutError
+            res=conn.recv()
+        except EOFError: # the worker died without answering
+            self._kill(p,conn)
+            return False,RuntimeError('worker process exited with code %s'%p.exitcode)
+        except: # timeout
+            self._kill(p,conn) # actually stops runaway work
+            raise
+        with self.lock:
+            self.idle.append(worker)
+        return res
+
+    def _fork(self, func, args, kwargs, timeout):
+        """runs a task that cannot be pickled in a dedicated child process.
+        works only with the fork start method, where the task isn't sent to the child
+        :return: (ok,result or exception) tuple
+        """
+        parent,child=multiprocessing.Pipe(duplex=False)
+        p=multiprocessing.Process(target=_run_in_process, args=(child, func, args, kwargs))
+        p.daemon=True
+        p.start()
+        child.close()
+        try:
+            if not parent.poll(timeout):
+                raise TimeoutError
+            return parent.recv()
+        except EOFError: # the child died without answering
+            return False,RuntimeError('%s process exited with code %s'%(func,p.exitcode))
+        finally:
+            self._kill(p,parent)
+
+    def apply(self, func, args=(), kwargs={}, timeout=None):
+        """runs func in a worker process, killed if it takes longer than timeout
+        :raise: multiprocessing.TimeoutError if timeout occured
+        :return: result of func, or raises the exception it raised
+        """
+        with self.slots:
+            try:
+                task=pickle.dumps((_reference(func), args, kwargs), pickle.HIGHEST_PROTOCOL)
+            except Exception: # lambda, local function or unpicklable arguments
+                ok,res=self._fork(func, args, kwargs, timeout)
+            else:
+                ok,res=self._send(task, timeout)
+        if ok:
+            return res
+        raise res
+
+process_pools = {} # number of workers -> _ProcessPool
+
+def get_process_pool(processes=None):
+    """:return: shared pool of worker processes with the given number of workers (default: number of CPUs)"""
+    processes=processes or multiprocessing.cpu_count()
+    try:
+        return process_pools[processes]
+    except KeyError:
+        pass
+    pool = process_pools[processes] = _ProcessPool(processes)
+    return pool
+
+def timeout(timeout, workers=None, processes=False):
+    """limits the running time of a function
+
+    :param timeout: float max running time in seconds
+    :param workers: int max number of concurrent calls (default: number of CPUs)
+    :param processes: bool if True, calls run in a shared pool of worker processes
+      where a worker that times out is terminated and replaced.
+      Otherwise calls run in a shared thread pool,
+      where timed out calls keep running in the background
+    :raise: multiprocessing.TimeoutError if timeout occured
+    :return: decorated function with a `stats` dict of calls, timeouts and total time
+    """
     def wrap_function(func):
+        stats=_Stats()
+
         @functools.wraps(func)
         def __wrapper(*args, **kwargs):
+            start=time.time()
+            timedout=False
             try:
-                async_result = get_thread_pool().apply_async(func, args=args, kwds=kwargs)
+                if processes:
+                    return get_process_pool(workers).apply(func, args, kwargs, timeout)
+                try:
+                    async_result = get_thread_pool(workers).apply_async(func, args=args, kwds=kwargs)
+                except thread.error:
+                    return func(*args, **kwargs)
                 return async_result.get(timeout)
-            except thread.error:
-                return func(*args, **kwargs)
+            except TimeoutError:
+                timedout=True
+                raise
+            finally: # calls raising exceptions are counted too
+                stats.add(time.time()-start, timedout)
+        __wrapper.stats=stats
+        __wrapper._undecorated=func # called in child processes
         return __wrapper
     return wrap_function
 
+_executors = {} # number of workers -> concurrent.futures.ThreadPoolExecutor
+
+def async_timeout(timeout, workers=None):
+    """asyncio friendly version of :func:`timeout`, requires Python 3.5+
+
+    the decorated function is a coroutine function running the function
+    in a thread pool, through :func:`asyncio.wait_for`
+
+    :param timeout: float max running time in seconds
+    :param workers: int number of threads of the executor (default: number of CPUs)
+    :raise: asyncio.TimeoutError when awaited if timeout occured
+    :return: decorated function with a `stats` dict of calls, timeouts and total time
+    """
+    def executor():
+        from concurrent.futures import ThreadPoolExecutor
+        n=workers or multiprocessing.cpu_count()
+        res=_executors.get(n)
+        if res is None:
+            res=_executors[n]=ThreadPoolExecutor(n)
+        return res
+
+    def wrap_function(func):
+        from ._async import timeout_wrapper # async syntax isn't valid in Python 2
+        stats=_Stats()
+        res=timeout_wrapper(func, timeout, executor, stats)
+        res.stats=stats
+        return res
+    return wrap_function
+
 #https://gist.github.com/goulu/45329ef041a368a663e5
 from threading import Timer
-from multiprocessing import TimeoutError
-    
+
 def itimeout(iterable,timeout):
     """timeout for loops
     :param iterable: any iterable
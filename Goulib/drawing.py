@@ -20,8 +20,13 @@ __copyright__ = "Copyright 2014, Philippe Guglielmetti"
 __credits__ = ['http://effbot.org/imagingbook/imagedraw.htm', 'http://images.autodesk.com/adsk/files/acad_dxf0.pdf']
 __license__ = "LGPL"
 
-from math import  radians, degrees, tan, atan
-import logging, base64
+from math import  radians, degrees, tan, atan, hypot, floor
+import logging, base64, bisect, collections, io, itertools, weakref
+
+try:
+    from collections.abc import Iterator as _Iterator, Mapping as _Mapping
+except ImportError: # python 2
+    from collections import Iterator as _Iterator, Mapping as _Mapping
 
 from .itertools2 import split, filter2, subdict
 from .geom import *
@@ -148,17 +153,160 @@ class BBox(Box):
         return res
 
 
+try: # optional, for faster queries in large Groups
+    from rtree import index as rtree_index # http://toblerity.org/rtree/
+    RTREE=True
+except Exception:
+    RTREE=False
+
+def _box(entity):
+    """
+    :return: (xmin,ymin,xmax,ymax) tuple of entity's bounding box,
+      or None if entity has no (finite) bounding box
+    """
+    try:
+        b=entity.bbox()
+    except Exception: # infinite lines, unknown objects, ...
+        return None
+    if b.xmin is None:
+        return None
+    return (b.xmin,b.ymin,b.xmax,b.ymax)
+
+def _box_distance(a,b):
+    """:return: float minimal distance between two (xmin,ymin,xmax,ymax) boxes"""
+    dx=max(0,a[0]-b[2],b[0]-a[2])
+    dy=max(0,a[1]-b[3],b[1]-a[3])
+    return hypot(dx,dy)
+
+class SpatialIndex(object):
+    """index of entities by their bounding boxes, to find quickly
+    the entities that may intersect or be close to another one
+
+    uses an R-Tree if `rtree <http://toblerity.org/rtree/>`_ is available,
+    otherwise a (much slower) list of boxes. Keys are ints, positions of entities in a Group
+    """
+    def __init__(self,entities=[]):
+        self.boxes={} # key:(xmin,ymin,xmax,ymax)
+        self.unbounded=set() # keys of entities without box, which are always candidates
+        for k,e in enumerate(entities):
+            b=_box(e)
+            if b is None:
+                self.unbounded.add(k)
+            else:
+                self.boxes[k]=b
+        self.rtree=None
+        if RTREE:
+            if self.boxes: # bulk loading is much faster
+                self.rtree=rtree_index.Index((k,b,None) for k,b in six.iteritems(self.boxes))
+            else:
+                self.rtree=rtree_index.Index()
+
+    def __len__(self):
+        return len(self.boxes)+len(self.unbounded)
+
+    def insert(self,key,entity):
+        b=_box(entity)
+        if b is None:
+            self.unbounded.add(key)
+            return
+        self.boxes[key]=b
+        if self.rtree is not None:
+            self.rtree.insert(key,b)
+
+    @property
+    def bounds(self):
+        """:return: (xmin,ymin,xmax,ymax) box containing all boxes, or None"""
+        if self.unbounded or not self.boxes:
+            return None
+        if self.rtree is not None:
+            return tuple(self.rtree.bounds)
+        boxes=list(self.boxes.values())
+        return (min(b[0] for b in boxes),min(b[1] for b in boxes),
+            max(b[2] for b in boxes),max(b[3] for b in boxes))
+
+    def intersection(self,box,tol=1E-9):
+        """
+        :param box: (xmin,ymin,xmax,ymax) tuple
+        :param tol: float box is enlarged by tol to compensate rounding errors
+        :return: sorted list of keys of entities whose box intersects box
+        """
+        box=(box[0]-tol,box[1]-tol,box[2]+tol,box[3]+tol)
+        if self.rtree is not None:
+            res=list(self.rtree.intersection(box))
+        else:
+            res=[k for k,b in six.iteritems(self.boxes)
+                if b[0]<=box[2] and box[0]<=b[2] and b[1]<=box[3] and box[1]<=b[3]]
+        res.extend(self.unbounded)
+        return sorted(res)
+
+    def nearest(self,box):
+        """:return: iterator over (distance,key) tuples by increasing distance of the boxes to box"""
+        for k in self.unbounded:
+            yield 0,k
+        if self.rtree is not None:
+            keys=self.rtree.nearest(box,num_results=len(self.boxes))
+            for k in keys:
+                yield _box_distance(self.boxes[k],box),k
+        else:
+            for d,k in sorted((_box_distance(b,box),k) for k,b in six.iteritems(self.boxes)):
+                yield d,k
+
+
+class _Parents(list):
+    """weak references to the Groups containing an Entity, which are neither copied nor pickled"""
+    def __deepcopy__(self, memo):
+        return _Parents()
+
+    def __reduce__(self):
+        return (_Parents,())
+
+def _add_parent(entity, group):
+    """registers group to be invalidated when entity changes"""
+    try:
+        parents=entity._parents
+        if not parents:
+            parents=entity._parents=_Parents()
+    except AttributeError: # not an Entity, or without __dict__
+        return
+    if not any(ref() is group for ref in parents):
+        parents[:]=[ref for ref in parents if ref() is not None] # forget deleted Groups
+        parents.append(weakref.ref(group))
+
 class Entity(plot.Plot):
     """Base class for all drawing entities"""
     
     color='black' # by default
+    _bbox=None # cached BBox
+    _parents=() # Groups containing entity, invalidated when it changes
+    _watched=False # if True, Groups are invalidated even if the bbox isn't cached
+    _volatile=('_bbox','_parents','_watched') # neither copied nor pickled
+    _graphic=('color','layer','width','name','dxf') # attributes that do not change the bbox
+    _geometric=('x','y','p','p2','v','c','r','r2','a','b','dir') # attributes that change the bbox, see setattr
+
+    def __getstate__(self):
+        return dict((k,v) for k,v in six.iteritems(self.__dict__) if k not in self._volatile)
+
+    def invalidate(self):
+        """clears cached data of entity and of the Groups containing it
+        called by transforms and :meth:`setattr`, but must be called when the geometry
+        of entity is modified otherwise, for example by assigning e.p or moving one of its points
+        """
+        if self._bbox is None and not self._watched:
+            return # Groups containing entity aren't cached either
+        self._bbox=None
+        for ref in self._parents:
+            group=ref()
+            if group is not None:
+                group.invalidate()
     
     def setattr(self,  **kwargs):
-        """ set (graphic) attributes to entity
+        """ set attributes to entity, invalidating it if geometric attributes are set
         :param kwargs: dict of attributes copied to entity
         """
         for key in kwargs:
             setattr(self, key, kwargs[key])
+        if any(key in self._geometric for key in kwargs):
+            self.invalidate()
 
     @property
     def start(self):
@@ -180,7 +328,15 @@ class Entity(plot.Plot):
 
     def bbox(self):
         """
-        :return: :class:`BBox` bounding box of Entity"""
+        :return: :class:`BBox` bounding box of Entity.
+          it is cached, so it should not be modified
+        """
+        if self._bbox is None:
+            self._bbox=self._get_bbox()
+        return self._bbox
+
+    def _get_bbox(self):
+        """:return: :class:`BBox` bounding box of Entity, computed"""
         if isinstance(self,Point2):
             return BBox(self,self)
         elif isinstance(self,Segment2):
@@ -410,9 +566,10 @@ class Entity(plot.Plot):
 
         return fig
 
-    def draw(self, fig=None, **kwargs):
+    def draw(self, fig=None, batch=False, **kwargs):
         """ draw  entities
         :param fig: matplotlib figure where to draw. figure(g) is called if missing
+        :param batch: bool draws with :meth:`collections` instead of :meth:`patches`, faster for large groups
         :return: fig,patch
         """
 
@@ -424,24 +581,142 @@ class Entity(plot.Plot):
             
         args=subdict(kwargs,('color','linewidth'))
 
-        p=self.patches(**args) #some of which might be Annotations, which aren't patches but Artists...
+        p=self.collections(**args) if batch else self.patches(**args)
+        #some of which might be Annotations, which aren't patches but Artists...
 
         from matplotlib.patches import Patch
+        from matplotlib.collections import Collection, PatchCollection
         patches,artists=filter2(p,lambda e:isinstance(e,Patch))
 
         if patches:
-            from matplotlib.collections import PatchCollection
             plt.gca().add_collection(PatchCollection(patches,match_original=True))
 
-        if artists:
-            for e in artists:
+        for e in artists:
+            if isinstance(e,Collection):
+                plt.gca().add_collection(e)
+            else:
                 plt.gca().add_artist(e)
         plt.draw()
 
         return fig #, p
 
+    def collections(self, **kwargs):
+        """
+        batched equivalent of :meth:`patches`, much faster to draw for large groups:
+        unfilled Entities are gathered in a single Collection per color, layer and width
+        :param kwargs: dict of graphic attributes overriding those of entities
+        :return: list of :class:`~matplotlib.collections.Collection`,
+          followed by the patches of entities which can't be batched
+        """
+        import numpy as np
+        from matplotlib.collections import LineCollection, PathCollection
+        from matplotlib.path import Path
+        from matplotlib.transforms import Affine2D
+
+        batches=collections.OrderedDict() # (style,id(trans)):(style,trans,list of untransformed segments)
+        paths=collections.OrderedDict() # (color,layer,width):list of Paths
+        others=[]
+        for e,t in TransformStack().walk(self):
+            key=(kwargs.get('color',e.color),getattr(e,'layer',None),kwargs.get('linewidth',getattr(e,'width',None)))
+            if isinstance(e,Segment2):
+                batches.setdefault((key,id(t)),(key,t,[]))[2].append((e.start.xy,e.end.xy))
+                continue
+            if t is not None:
+                e=t*e
+            if isinstance(e,(Point2,Text)) or getattr(e,'fill',False):
+                others.extend(e.patches(**kwargs))
+                continue
+            if isinstance(e,Arc2):
+                theta1,theta2=degrees(e.a),degrees(e.b)
+                if e.dir<1 : #swap
+                    theta1,theta2=theta2,theta1
+                path=Affine2D().scale(e.r).translate(*e.c.xy).transform_path(Path.arc(theta1,theta2))
+            elif isinstance(e,Circle): # and Ellipse
+                r2=e.r2 if isinstance(e,Ellipse) else e.r
+                path=Affine2D().scale(e.r,r2).translate(*e.c.xy).transform_path(Path.unit_circle())
+            elif isinstance(e,Spline):
+                path=Path(e.xy, [Path.MOVETO, Path.CURVE4, Path.CURVE4, Path.CURVE4])
+            else:
+                others.extend(e.patches(**kwargs))
+                continue
+            paths.setdefault(key,[]).append(path)
+
+        lines=collections.OrderedDict() # (color,layer,width):list of segments
+        for key,t,segments in batches.values():
+            segments=TransformStack.apply(t,np.reshape(segments,(-1,2))).reshape(-1,2,2)
+            lines.setdefault(key,[]).extend(segments)
+        res=[]
+        for (color,layer,width),segments in lines.items():
+            res.append(LineCollection(segments,colors=color,linewidths=width,label=layer))
+        for (color,layer,width),p in paths.items():
+            res.append(PathCollection(p,edgecolors=color,facecolors='none',linewidths=width,label=layer))
+        return res+others
+
+    def thumbnail(self, size=128, background='white', fmt='png'):
+        """ fast rendering of a small bitmap with numpy, without matplotlib
+        entities are drawn with 1 pixel wide lines of their color, texts are ignored
+        :param size: int max width and height of image in pixels, or (width,height) tuple
+        :param background: color of image background
+        :param fmt: string image format supported by PIL, or None to get the pixels array
+        :return: image as a byte stream in specified format, or numpy (height,width,3) uint8 array
+        """
+        import numpy as np
+        from matplotlib.colors import to_rgb
+
+        try:
+            w,h=size
+        except TypeError:
+            w,h=size,size
+        box=self.bbox()
+        if box.xmin is None: # empty
+            box=BBox((0,0),(0,0))
+        scale=min((w-1)/box.width if box.width else float('inf'),(h-1)/box.height if box.height else float('inf'))
+        if scale==float('inf'): # single point
+            scale=1
+
+        batches={} # id(trans):(trans,list of (x0,y0,x1,y1,color index) before transform)
+        polylines=[] # arrays of (x0,y0,x1,y1,color index)
+        colors={}
+        for e,t in TransformStack().walk(self):
+            c=colors.setdefault(e.color,len(colors))
+            if isinstance(e,Segment2):
+                batches.setdefault(id(t),(t,[]))[1].append((e.p.x,e.p.y,e.p.x+e.v.x,e.p.y+e.v.y,c))
+            elif isinstance(e,Point2):
+                batches.setdefault(id(t),(t,[]))[1].append((e.x,e.y,e.x,e.y,c))
+            else:
+                p=_polyline(e if t is None else t*e,2/scale) # 2 pixels long segments
+                if p is not None:
+                    polylines.append(np.column_stack((p[:-1],p[1:],np.full(len(p)-1,c))))
+        for t,segments in batches.values():
+            segments=np.array(segments,dtype=float)
+            for j in (0,2):
+                segments[:,j:j+2]=TransformStack.apply(t,segments[:,j:j+2])
+            polylines.append(segments)
+        s=np.vstack(polylines) if polylines else np.empty((0,5))
+
+        img=np.empty((int(round(box.height*scale))+1,int(round(box.width*scale))+1,3),np.uint8)
+        img[:]=np.array(to_rgb(background))*255
+        if len(s):
+            x0,x1=(s[:,0]-box.xmin)*scale,(s[:,2]-box.xmin)*scale
+            y0,y1=(box.ymax-s[:,1])*scale,(box.ymax-s[:,3])*scale # y axis goes down
+            n=np.ceil(np.maximum(abs(x1-x0),abs(y1-y0))).astype(int)+1 # pixels per segment
+            i=np.repeat(np.arange(len(s)),n) # segment of each pixel
+            t=np.arange(n.sum())-np.repeat(np.cumsum(n)-n,n) # rank of each pixel in its segment
+            t=t/np.maximum(n-1,1)[i]
+            x=np.clip(np.rint(x0[i]+t*(x1-x0)[i]).astype(int),0,img.shape[1]-1)
+            y=np.clip(np.rint(y0[i]+t*(y1-y0)[i]).astype(int),0,img.shape[0]-1)
+            palette=np.array([to_rgb(c) for c in sorted(colors,key=colors.get)])*255
+            img[y,x]=palette[s[i,4].astype(int)]
+        if fmt is None:
+            return img
+        from PIL import Image
+        buffer = six.BytesIO()
+        Image.fromarray(img).save(buffer,format=fmt)
+        return buffer.getvalue()
+
     def render(self,fmt,**kwargs):
         """ render graph to bitmap stream
+        :param batch: bool draws with :meth:`collections` instead of :meth:`patches`, faster for large groups
         :return: matplotlib figure as a byte stream in specified format
         """
         transparent=kwargs.pop('transparent',True)
@@ -466,6 +741,19 @@ Point2.__bases__ += (Entity,)
 Segment2.__bases__ += (Entity,)
 Circle.__bases__ += (Entity,) # adds it also to Arc2
 
+def _invalidating(method):
+    """:return: method of Entity wrapped to invalidate the entity it modifies"""
+    def wrapper(self, *args, **kwargs):
+        res=method(self, *args, **kwargs)
+        if self._bbox is not None or self._watched: # avoids a call for the many geom temporaries
+            self.invalidate()
+        return res
+    return wrapper
+
+# geom classes grafted with Entity invalidate their caches when they are transformed in place
+for _cls in (Point2, Segment2, Circle, Arc2, Ellipse):
+    _cls._apply_transform=_invalidating(_cls._apply_transform)
+
 class Spline(Entity, Geometry):
     """cubic spline segment"""
 
@@ -491,7 +779,7 @@ class Spline(Entity, Geometry):
         """:return: float (very) approximate length"""
         return sum((x.dist(self.p[i - 1]) for i, x in enumerate(self.p) if i>0))
 
-    def bbox(self):
+    def _get_bbox(self):
         res=BBox()
         for p in self.p:
             res+=p
@@ -501,6 +789,7 @@ class Spline(Entity, Geometry):
         """ swap start and end"""
         self.p.reverse() #reverse in place
 
+    @_invalidating
     def _apply_transform(self, t):
         self.p=[t*p for p in self.p]
 
@@ -514,19 +803,72 @@ def Spline(pts):
     return Arc2(c,p0,p3)
 '''
         
+def _atoms(entity):
+    """generates the "atomic" (non iterable) Entities in entity"""
+    if isinstance(entity,_Group):
+        for e in entity:
+            for a in _atoms(e):
+                yield a
+    else:
+        yield entity
+
+def _polyline(entity, step):
+    """
+    :param entity: curved :class:`Entity`
+    :param step: float max length of the segments
+    :return: numpy (n,2) array of points approximating entity, or None if entity isn't a curve
+    """
+    import numpy as np
+    if isinstance(entity,Spline): # cubic Bezier
+        p=np.array(entity.xy)
+        n=max(2,int(entity.length/step)+1)
+        t=np.linspace(0,1,n)[:,None]
+        return (1-t)**3*p[0]+3*(1-t)**2*t*p[1]+3*(1-t)*t**2*p[2]+t**3*p[3]
+    if not isinstance(entity,Circle):
+        return None
+    a,sweep=(entity.a,entity.angle()) if isinstance(entity,Arc2) else (0,2*pi)
+    r2=entity.r2 if isinstance(entity,Ellipse) else entity.r
+    n=max(3,int(abs(sweep)*max(entity.r,r2)/step)+1)
+    t=a+np.linspace(0,sweep,n)
+    return np.column_stack((entity.c.x+entity.r*np.cos(t),entity.c.y+r2*np.sin(t)))
+
 class _Group(Entity, Geometry):
     """ abstract class for iterable Entities"""
+
+    def _candidates(self, box):
+        """
+        :param box: (xmin,ymin,xmax,ymax) tuple or None
+        :return: iterable of Entities that may intersect box
+        """
+        return self
+
+    def _nearest(self, box):
+        """
+        :param box: (xmin,ymin,xmax,ymax) tuple or None
+        :return: iterable of (distance,Entity) where distance is a lower bound of the
+          distance between Entity and box, by increasing distance
+        """
+        return ((0,e) for e in self)
+
     def bbox(self, filter=None):
         """
         :param filter: optional function(entity):bool returning True if entity should be considered in box
         :return: :class:`BBox` bounding box of Entity
         """
+        if filter is None: # cached
+            return super(_Group,self).bbox()
         res=BBox()
         for entity in self: # do not use sum() as it copies Boxes unnecessarily
-            if filter is None or filter(entity):
+            if filter(entity):
                 res+=entity.bbox()
         return res
 
+    def _get_bbox(self):
+        res=BBox()
+        for entity in self:
+            res+=entity.bbox()
+        return res
+
     @property
     def length(self):
         return sum((entity.length for entity in self))
@@ -545,8 +887,8 @@ class _Group(Entity, Geometry):
             recurse=False
         else:
             recurse=True
-            
-        for e in self:
+
+        for e in self._candidates(_box(other)):
             inter=other.intersect(e) if recurse else e.intersect(other)
                 
             if inter is None: 
@@ -564,6 +906,14 @@ class _Group(Entity, Geometry):
                     e2.group=e
                     yield (i,e2)
 
+    def intersections(self):
+        """
+        all intersections between "atomic" Entities of the group, including the
+        common ends of contiguous Entities, see :func:`geom.intersections`
+        :result: generate tuples (Point2,Entity,Entity)
+        """
+        return intersections(_atoms(self))
+
     def connect(self, other):
         for (inter, _) in self.intersect(other):
             if isinstance(inter,Point2):
@@ -577,7 +927,28 @@ class _Group(Entity, Geometry):
             recurse=False
         else:
             recurse=True
-        return min((other.connect(e).swap() if recurse else e.connect(other) for e in self), key=lambda e:e.length)
+        res=None
+        for d,e in self._nearest(_box(other)):
+            if res is not None and d>=res.length:
+                break # all other entities are farther
+            c=other.connect(e).swap() if recurse else e.connect(other)
+            if res is None or c.length<res.length:
+                res=c
+        return res
+
+    def nearest(self, other, n=1):
+        """
+        :param other: `geom.Entity`, typically a :class:`geom.Point2`
+        :param n: int number of Entities to return
+        :return: list of the n Entities of group closest to other, closest first
+        """
+        res=[] # sorted list of (distance,rank,Entity)
+        for i,(d,e) in enumerate(self._nearest(_box(other))):
+            if len(res)>=n and d>=res[-1][0]:
+                break # all other entities are farther
+            bisect.insort(res,(e.distance(other),i,e))
+            del res[n:]
+        return [e for _,_,e in res]
 
     def patches(self, **kwargs):
         """:return: list of :class:`~matplotlib.patches.Patch` corresponding to group"""
@@ -600,7 +971,84 @@ class Group(list, _Group):
     """group of Entities
     but it is a Geometry since we can intersect, connect and compute distances between Groups
     """
-    
+
+    _sindex=None # SpatialIndex, built on first query
+    _sindex_min=16 # smaller Groups are simply scanned
+
+    def __init__(self, data=[]):
+        super(Group,self).__init__(data)
+        for entity in self:
+            _add_parent(entity,self)
+
+    @property
+    def spatial_index(self):
+        """:return: :class:`SpatialIndex` of entities in group, built if needed"""
+        if self._sindex is None:
+            self._sindex=SpatialIndex(self)
+        return self._sindex
+
+    def invalidate(self):
+        self._sindex=None
+        super(Group,self).invalidate()
+
+    def _candidates(self, box):
+        if box is None or len(self)<self._sindex_min:
+            return self
+        return [self[i] for i in self.spatial_index.intersection(box)]
+
+    def _nearest(self, box):
+        if box is None or len(self)<self._sindex_min:
+            return super(Group,self)._nearest(box)
+        return ((d,self[i]) for d,i in self.spatial_index.nearest(box))
+
+    def _get_bbox(self):
+        if len(self)>=self._sindex_min:
+            b=self.spatial_index.bounds
+            if b is not None:
+                return BBox(b[:2],b[2:])
+        return super(Group,self)._get_bbox()
+
+    def __getstate__(self):
+        state=super(Group,self).__getstate__()
+        state.pop('_sindex',None) # rebuilt when needed
+        return state
+
+    # list methods that move entities
+    def __setitem__(self, key, value):
+        self.invalidate()
+        super(Group,self).__setitem__(key,value)
+        for entity in (value if isinstance(key,slice) else [value]):
+            _add_parent(entity,self)
+
+    def __delitem__(self, key):
+        self.invalidate()
+        super(Group,self).__delitem__(key)
+
+    def insert(self, i, entity):
+        self.invalidate()
+        super(Group,self).insert(i,entity)
+        _add_parent(entity,self)
+
+    def pop(self, i=-1):
+        self.invalidate()
+        return super(Group,self).pop(i)
+
+    def remove(self, entity):
+        self.invalidate()
+        super(Group,self).remove(entity)
+
+    def reverse(self):
+        self.invalidate()
+        super(Group,self).reverse()
+
+    def sort(self, *args, **kwargs):
+        self.invalidate()
+        super(Group,self).sort(*args, **kwargs)
+
+    def __iadd__(self, entities):
+        self.extend(entities)
+        return self
+
     @property
     def color(self):
         return self[0].color
@@ -629,6 +1077,10 @@ class Group(list, _Group):
             return None #to show nothing was done
         entity.setattr(**kwargs)
         super(Group,self).append(entity)
+        _add_parent(entity,self)
+        if self._sindex is not None:
+            self._sindex.insert(len(self)-1,entity)
+        Entity.invalidate(self) # keeps the spatial index
         return self
 
     def extend(self,entities,**kwargs):
@@ -644,12 +1096,13 @@ class Group(list, _Group):
         return res
 
     def _apply_transform(self,trans):
+        self.invalidate()
         for entity in self:
             entity._apply_transform(trans)
 
     def swap(self):
         """ swap start and end"""
-        super(Group,self).reverse() #reverse in place
+        self.reverse() #reverse in place
         for e in self:
             e.swap()
             
@@ -669,7 +1122,8 @@ class Group(list, _Group):
         :parm flatten: bool flatten block structure
         :return: :class:`Entity` of correct subtype
         """
-        self.dxf=dxf
+        if not isinstance(dxf, _Iterator): # a stream can't be read again
+            self.dxf=dxf
 
         for e in dxf:
             if layers and e.layer not in layers:
@@ -692,7 +1146,9 @@ class Group(list, _Group):
         return self
 
 class Instance(_Group):
-    
+
+    _geometric=('group','trans')
+
     def __init__(self, group, trans):
         """
         :param group: Group
@@ -700,6 +1156,7 @@ class Instance(_Group):
         """
         self.group=group
         self.trans=trans
+        _add_parent(group,self)
 
     @staticmethod
     def from_dxf(e, blocks, mat3):
@@ -722,12 +1179,208 @@ class Instance(_Group):
     def __iter__(self):
         #TODO: optimize when trans is identity
         for e in self.group:
-            res=self.trans*e
+            if isinstance(e,Instance): # compose transforms rather than copying e.group
+                res=Instance(e.group,self.trans*e.trans) # registered as parent of e.group
+                res.setattr(**subdict(e.__dict__,Entity._graphic))
+            else:
+                res=self.trans*e
             yield res
 
+    def _get_bbox(self):
+        # vertices of segments are transformed in a single call rather than by copying each entity
+        self.group.bbox() # caches the bboxes of the block entities, so that changing them invalidates self
+        res=BBox()
+        batches={} # id(trans):(trans,list of untransformed points)
+        for e,t in TransformStack(self.trans).walk(self.group):
+            if isinstance(e,Segment2):
+                batches.setdefault(id(t),(t,[]))[1].extend((e.start.xy,e.end.xy))
+            elif isinstance(e,Point2):
+                batches.setdefault(id(t),(t,[]))[1].append(e.xy)
+            else:
+                res+=(e if t is None else t*e).bbox()
+        for t,xy in batches.values():
+            xy=TransformStack.apply(t,xy)
+            res+=BBox(tuple(xy.min(axis=0)),tuple(xy.max(axis=0)))
+        return res
+
+    @_invalidating
     def _apply_transform(self,trans):
         self.trans=trans*self.trans
 
+class TransformStack(object):
+    """nested transforms of Instances (block references), composed once per level
+    so that the atomic Entities they contain are transformed by a single matrix,
+    or gathered in arrays transformed in a single call
+    """
+    def __init__(self, trans=None):
+        """
+        :param trans: optional Matrix3 of the outermost transform
+        """
+        self.stack=[trans]
+
+    @property
+    def trans(self):
+        """:return: Matrix3 composed transform of the current level, or None for identity"""
+        return self.stack[-1]
+
+    def push(self, trans):
+        """enters a level transformed by trans
+        :return: Matrix3 composed transform
+        """
+        top=self.stack[-1]
+        if trans is not None and top is not None:
+            trans=top*trans
+        self.stack.append(top if trans is None else trans)
+        return self.stack[-1]
+
+    def pop(self):
+        """leaves the current level
+        :return: Matrix3 composed transform of the level left
+        """
+        return self.stack.pop()
+
+    def walk(self, entity):
+        """generates the atomic (non iterable) Entities in entity, untransformed
+        :return: iterator of (Entity,Matrix3) tuples. The matrix is None for identity
+        """
+        if isinstance(entity,Instance):
+            self.push(entity.trans)
+            try:
+                for x in self.walk(entity.group):
+                    yield x
+            finally:
+                self.pop()
+        elif isinstance(entity,_Group):
+            for e in entity:
+                for x in self.walk(e):
+                    yield x
+        else:
+            yield entity,self.trans
+
+    @staticmethod
+    def apply(trans, xy):
+        """
+        :param trans: Matrix3 or None for identity
+        :param xy: (n,2) array-like of point coordinates
+        :return: numpy (n,2) array of transformed coordinates
+        """
+        res=Point2Array(xy)
+        if trans is not None:
+            res._apply_transform(trans)
+        return res.array
+
+def _distances(pts, a, b):
+    """:return: numpy array of distances of pts to segment ab"""
+    import numpy as np
+    v=b-a
+    l2=v.dot(v)
+    if l2==0:
+        return np.hypot(*(pts-a).T)
+    t=np.minimum(np.maximum((pts-a).dot(v)/l2,0),1) # faster than np.clip
+    return np.hypot(*(pts-a-np.outer(t,v)).T)
+
+def _rdp(pts, tol):
+    """Ramer-Douglas-Peucker polyline simplification
+    :param pts: numpy (n,2) array of polyline vertices
+    :param tol: float max distance between original and simplified polylines
+    :return: numpy array of indices of kept vertices
+    """
+    import numpy as np
+    keep=np.zeros(len(pts),bool)
+    keep[0]=keep[-1]=True
+    stack=[(0,len(pts)-1)]
+    while stack:
+        i,j=stack.pop()
+        if j-i<2:
+            continue
+        d=_distances(pts[i+1:j],pts[i],pts[j])
+        k=np.argmax(d)
+        if d[k]>tol:
+            k+=i+1
+            keep[k]=True
+            stack.extend(((i,k),(k,j)))
+    return np.flatnonzero(keep)
+
+def _arc_fit(pts, tol):
+    """
+    :param pts: numpy (n,2) array of polyline vertices
+    :param tol: float max distance between polyline and arc
+    :return: True if polyline is straight within tol,
+      (center,dir) tuple if it fits an arc from first to last point, None otherwise
+    """
+    import numpy as np
+    a,m,b=pts[0],pts[len(pts)//2],pts[-1]
+    if _distances(pts,a,b).max()<=tol:
+        return True
+    u,v=m-a,b-m
+    cross=u[0]*v[1]-u[1]*v[0]
+    if cross==0:
+        return None
+    # center is at the intersection of the bisectors of am and mb
+    c=np.array([[u[0],u[1]],[v[0],v[1]]])
+    c=np.linalg.solve(c,[u.dot(a+m)/2,v.dot(m+b)/2])
+    r=np.hypot(*(a-c))
+    mid=(pts[:-1]+pts[1:])/2 # chords are farthest from the arc in their middle
+    for q in (pts,mid):
+        if np.abs(np.hypot(*(q-c).T)-r).max()>tol:
+            return None
+    dir=1 if cross>0 else -1
+    angles=np.unwrap(np.arctan2(*(pts-c).T[::-1]))
+    if (np.diff(angles)*dir<=0).any() or abs(angles[-1]-angles[0])>=2*pi:
+        return None
+    return c,dir
+
+def _simplify(pts, tol, arcs=False, min_arc=3):
+    """simplify a polyline
+    :param pts: numpy (n,2) array of polyline vertices
+    :param tol: float max distance between original and simplified polylines
+    :param arcs: bool if True, fits arcs on runs of at least min_arc segments
+    :return: list of Segment2 and Arc2
+    """
+    def segments(run):
+        run=pts[run]
+        run=run[_rdp(run,tol)].tolist()
+        return [Segment2(Point2(p),Point2(q)) for p,q in zip(run,run[1:])]
+
+    import numpy as np
+    pts=np.asarray(pts,float)
+    if not arcs:
+        return segments(range(len(pts)))
+    res=[]
+    run=[0] # indices of vertices not fitted by an arc
+    i,n=0,len(pts)-1
+    while i<n:
+        # longest window from i fitting an arc: doubling, then dichotomy
+        lo,hi,fit=i,i+min_arc,None
+        while hi<=n:
+            f=_arc_fit(pts[i:hi+1],tol)
+            if f is None:
+                break
+            lo,fit,hi=hi,f,i+2*(hi-i)
+        else:
+            hi=n+1 # all windows up to the end may fit
+        while hi-lo>1 and fit is not None:
+            k=(lo+hi)//2
+            f=_arc_fit(pts[i:k+1],tol)
+            if f is None:
+                hi=k
+            else:
+                lo,fit=k,f
+        if fit is None: # nothing fits, vertex i stays
+            i+=1
+            run.append(i)
+        elif fit is True: # straight run, left to _rdp
+            run.extend(range(i+1,lo+1))
+            i=lo
+        else:
+            res.extend(segments(run))
+            c,dir=fit
+            res.append(Arc2(Point2(c),Point2(pts[i]),Point2(pts[lo]),dir=dir))
+            i=lo
+            run=[i]
+    res.extend(segments(run))
+    return res
+
 class Chain(Group): 
     """ group of contiguous Entities (Polyline or similar)"""
 
@@ -977,12 +1630,53 @@ class Chain(Group):
         if not self.isclosed():
             res.add_vertex(self.end.xy)
         return res
+
+    def simplify(self, tol, arcs=False):
+        """ simplified copy of the Chain, with fewer entities
+        runs of contiguous segments are simplified with the Ramer-Douglas-Peucker algorithm,
+        other entities are copied unchanged
+        :param tol: float max distance between original and simplified chains
+        :param arcs: bool if True, runs of short segments are replaced by Arc2 where they fit
+        :return: Chain
+        """
+        def run(e): # runs are contiguous segments with the same attributes
+            if type(e) is Segment2: #not subclasses
+                return True,subdict(e.__dict__,('color','layer','width'))
+            return False,id(e)
+
+        res=Chain()
+        for (isrun,attr),entities in itertools.groupby(self,run):
+            if not isrun:
+                for e in entities:
+                    super(Chain,res).append(copy(e))
+                continue
+            entities=list(entities)
+            pts=[s.start.xy for s in entities]+[entities[-1].end.xy]
+            for x in _simplify(pts,tol,arcs):
+                super(Chain,res).append(x,**attr)
+        return res
     
 def chains(group, tol=1E-6, mergeable=None):
     """build chains from all possible segments in group
+    :param tol: float max distance between contiguous ends
     :param mergeable: function(e1,e2) returning True if entities e1,e2 can be merged
+    :return: Group of Chains
     """
-    
+    # chain ends are hashed in a grid of tol sized cells, so each entity is
+    # tried only on the chains it may be contiguous with, in the order of res
+    size=tol*(1+1E-9) # a bit larger to be safe with rounding errors
+    def cell(p):
+        if size==0:
+            return p.xy
+        return (int(floor(p.x/size)),int(floor(p.y/size)))
+
+    def neighbours(p):
+        if size==0:
+            return [p.xy]
+        x,y=cell(p)
+        return [(x+i,y+j) for i in (-1,0,1) for j in (-1,0,1)]
+
+    ends=collections.defaultdict(set) # cell:set of indices of chains in res
     res=Group()
     changed=False
     #step 1 : add all entities in group to chains in res
@@ -990,9 +1684,17 @@ def chains(group, tol=1E-6, mergeable=None):
         if e is None or isclose(e.length,0,tol):
             continue #will not be present in res
         ok=False
-        for c in res:
+        candidates=set()
+        for p in (e.start,e.end):
+            for k in neighbours(p):
+                candidates.update(ends.get(k,()))
+        for i in sorted(candidates):
+            c=res[i]
             # if c.isclosed(): continue #reopen closed chains might be good
+            old=(c.start,c.end)
             if c.append(e,tol=tol,mergeable=mergeable):
+                for p in old:
+                    ends[cell(p)].discard(i)
                 ok=True
                 break
         if not ok:
@@ -1000,6 +1702,9 @@ def chains(group, tol=1E-6, mergeable=None):
                 res.append(e)
             else:
                 res.append(Chain([e]))
+            c,i=res[-1],len(res)-1
+        for p in (c.start,c.end):
+            ends[cell(p)].add(i)
         changed=changed or ok
     #step 2 : try to merge chains
     if changed:
@@ -1036,6 +1741,8 @@ dtp= 25.4/72 # one dtp point in mm https://en.wikipedia.org/wiki/Point_(typograp
 
 class Text(Entity):
 
+    _geometric=('p','text','size','rotation')
+
     def __init__( self, text, point, size=12, rotation=0):
         """
         :param text: string
@@ -1048,11 +1755,12 @@ class Text(Entity):
         self.size=size # unit is dtp
         self.rotation=rotation
         
+    @_invalidating
     def _apply_transform(self, t):
         self.p=t*self.p
         self.rotation+=degrees(t.angle())
 
-    def bbox(self): #TODO: improve this very rough approximation
+    def _get_bbox(self): #TODO: improve this very rough approximation
         return BBox(self.p,self.p+Vector2(0.8*len(self.text)*self.size*dtp,self.size*dtp))
     
     @property
@@ -1083,6 +1791,99 @@ class Text(Entity):
 
         return [Text_pdf(self.p.x,self.p.y, self.text, size=self.size, rotation=self.rotation,**kwargs)]
 
+def _dxf_groups(filename):
+    """reads a .dxf file tag by tag, without building the whole dxfgrabber Drawing
+    :param filename: string path to .dxf file to read
+    :return: iterator over (section name, list of DXFTags) of each dxf entity in file
+    """
+    from dxfgrabber.tags import stream_tagger, dxfinfo
+    with io.open(filename) as fp: # same encoding detection as in dxfgrabber.readfile
+        info=dxfinfo(fp)
+    encoding='utf-8' if info.version>='AC1021' else info.encoding # R2007+ files are utf-8
+    with io.open(filename, encoding=encoding, errors='ignore') as fp:
+        section,group=None,[]
+        for tag in stream_tagger(fp):
+            if tag.code!=0:
+                group.append(tag)
+                continue
+            if group and group[0].value=='SECTION':
+                section=group[1].value
+            elif section and group:
+                yield section,group
+            if tag.value=='ENDSEC':
+                section=None
+            group=[tag]
+
+def _dxf_keep(group, layers=None, only=[], ignore=['POINT'], **kwargs):
+    """:return: True if dxf entity tags group passes the filters of :meth:`Group.from_dxf`"""
+    dxftype=group[0].value
+    if layers and next((t.value for t in group if t.code==8),'0') not in layers:
+        return False
+    if dxftype in ignore:
+        return False
+    return not only or dxftype in only
+
+def _dxf_entities(groups, **kwargs):
+    """builds dxfgrabber entities from tags groups, skipping those filtered out
+    :param groups: iterable of lists of DXFTags, one per dxf entity
+    :param kwargs: dict of filters as in :meth:`Group.from_dxf`
+    :return: iterator over dxfgrabber entities
+    """
+    from dxfgrabber.entitysection import build_entities
+    run,keep=None,False # groups of an entity followed by VERTEXes or ATTRIBs up to SEQEND
+    for group in groups:
+        dxftype=group[0].value
+        if run is not None:
+            if keep:
+                run.append(group)
+            if dxftype=='SEQEND':
+                for e in build_entities(run):
+                    yield e
+                run=None
+            continue
+        keep=_dxf_keep(group, **kwargs)
+        if dxftype in ('POLYLINE', 'POLYFACE', 'POLYMESH') or \
+            dxftype=='INSERT' and any(t.code==66 and t.value==1 for t in group): #attribs follow
+            run=[group] if keep else []
+        elif keep:
+            for e in build_entities([group]):
+                yield e
+
+class _DxfBlocks(_Mapping):
+    """read-only mapping of Groups built from .dxf blocks at first access"""
+    def __init__(self, **kwargs):
+        """:param kwargs: dict of optional parameters passed to :meth:`Group.from_dxf`"""
+        self.groups={} # name:list of tags groups of blocks not built yet
+        self.built={} # name:Group of blocks already built
+        self.kwargs=kwargs
+
+    def __getitem__(self, name):
+        try:
+            return self.built[name]
+        except KeyError:
+            pass
+        groups=self.groups.pop(name) # raises KeyError for unknown blocks
+        block=Group()
+        block.block=self # for nested Instances
+        entities=list(_dxf_entities(groups, **self.kwargs)) # kept in block.dxf
+        self.built[name]=block.from_dxf(entities, **self.kwargs)
+        return block
+
+    def __contains__(self, name):
+        return name in self.groups or name in self.built
+
+    def __iter__(self):
+        return itertools.chain(list(self.built),list(self.groups))
+
+    def __len__(self):
+        return len(self.built)+len(self.groups)
+
+def _watch(group):
+    """marks group and its entities so that their changes always invalidate the Groups containing them"""
+    group._watched=True
+    for e in group:
+        e._watched=True
+
 class Drawing(Group):
     """list of Entities representing a vector graphics drawing"""
 
@@ -1092,6 +1893,61 @@ class Drawing(Group):
         else:
             Group.__init__(self,data)
 
+    _lod=None # dict of simplified Drawings per tolerance
+
+    def invalidate(self):
+        self._lod=None
+        super(Drawing,self).invalidate()
+
+    def append(self, entity, **kwargs):
+        self._lod=None
+        return super(Drawing,self).append(entity,**kwargs)
+
+    def __getstate__(self):
+        state=super(Drawing,self).__getstate__()
+        state.pop('_lod',None)
+        return state
+
+    def lod(self, tol):
+        """ level of detail : simplified drawing for previews and exports
+        results are cached until the drawing is modified
+        :param tol: float max distance between original and simplified chains
+        :return: Drawing where all Chains are simplified with :meth:`Chain.simplify`
+        """
+        if self._lod is None:
+            self._lod={}
+        if tol not in self._lod:
+            def simplified(group):
+                for e in group:
+                    if isinstance(e,Chain):
+                        _watch(e) # so that changes of its segments invalidate self
+                        e=e.simplify(tol)
+                    elif type(e) is Group:
+                        e._watched=True
+                        e=Group(simplified(e))
+                    yield e
+            self._watched=True
+            self._lod[tol]=Drawing(list(simplified(self)))
+        return self._lod[tol]
+
+    def render(self, fmt, tol=None, **kwargs):
+        """ render graph to bitmap stream
+        :param tol: float if defined, renders the :meth:`lod` of the drawing at this tolerance
+        :return: matplotlib figure as a byte stream in specified format
+        """
+        if tol:
+            return self.lod(tol).render(fmt,**kwargs)
+        return super(Drawing,self).render(fmt,**kwargs)
+
+    def to_dxf(self, tol=None, **attr):
+        """
+        :param tol: float if defined, exports the :meth:`lod` of the drawing at this tolerance
+        :return: flatten list of dxf entities
+        """
+        if tol:
+            return self.lod(tol).to_dxf(**attr)
+        return super(Drawing,self).to_dxf(**attr)
+
     def load(self,filename, **kwargs):
             ext=filename.split('.')[-1].lower()
             if ext=='dxf':
@@ -1192,62 +2048,75 @@ class Drawing(Group):
 
     def read_svg(self,content, **kwargs):
         """appends svg content to drawing
+        paths are processed as they are parsed, so the whole document isn't loaded in memory
         :param content: string, either filename or svg content
         """
-        #from http://stackoverflow.com/questions/15857818/python-svg-parser
-        from xml.dom import minidom
+        from xml.etree import ElementTree
+        from svg.path import parse_path
         try:
-            doc = minidom.parse(content)  # parseString also exists
-        except IOError:
-            doc = minidom.parseString(content.encode('utf-8'))
-            
+            events=ElementTree.iterparse(content) # generates ('end',element) events
+        except IOError: # content is not a filename
+            events=ElementTree.iterparse(io.BytesIO(content.encode('utf-8')))
+
         trans=Trans()
         trans.f=-1 #flip y axis
-        for path in doc.getElementsByTagName('path'):
+        for _,path in events:
+            if path.tag.split('}')[-1]!='path': #ignore namespace
+                continue
             #find the color... dirty, but simply understandable
-            color=path.getAttribute('fill') #assign filling color to default stroke color
+            color=path.get('fill','') #assign filling color to default stroke color
             alpha=1
-            style=path.getAttribute('style')
+            style=path.get('style','')
             for s in style.split(';'):
                 item=s.split(':')
                 if item[0]=='opacity':
                     alpha=float(item[1])
                 elif item[0]=='stroke':
                     color=item[1]
-            if not color or alpha==0 : #ignore picture frame
-                continue
-            # process the path
-            d=path.getAttribute('d')
-            from svg.path import parse_path
-            e=Entity.from_svg(parse_path(d),color)
-            e=trans*e
-            self.append(e)
-        doc.unlink()
+            if color and alpha!=0 : #ignore picture frame
+                # process the path
+                e=Entity.from_svg(parse_path(path.get('d')),color)
+                e=trans*e
+                self.append(e)
+            path.clear() #free memory
         return self
 
     def read_dxf(self, filename, options=None, **kwargs):
         """reads a .dxf file
+        entities are streamed from the file and filtered before they are built,
+        and blocks are built when first used
         :param filename: string path to .dxf file to read
-        :param options: passed to :class:`~dxfgrabber.drawing.Drawing`constructor
-        :param kwargs: dict of optional parameters passed to :method:`Group.from_dxf`
+        :param options: dict of options as in :class:`~dxfgrabber.drawing.Drawing`. only 'grab_blocks' is used
+        :param kwargs: dict of optional parameters passed to :meth:`Group.from_dxf`
         """
         try:
             import dxfgrabber
-            self.dxf = dxfgrabber.readfile(filename,options)
         except ImportError:
             logging.error('optional module dxfgrabber required')
             return
-        except Exception as e:
-            logging.error('could not read %s : %s'%(filename,e))
-            return
         self.name = filename
+        self.block=_DxfBlocks(**kwargs)
+        grab_blocks=(options or {}).get('grab_blocks',True)
+
+        def entities():
+            block=None # list of groups of the block being read
+            for section,group in _dxf_groups(filename):
+                if section=='ENTITIES':
+                    yield group
+                elif section!='BLOCKS' or not grab_blocks:
+                    continue
+                elif group[0].value=='BLOCK':
+                    block=[]
+                    self.block.groups[next(t.value for t in group if t.code==2)]=block
+                elif group[0].value=='ENDBLK':
+                    block=None
+                elif block is not None:
+                    block.append(group)
 
-        #build dictionary of blocks
-        self.block={}
-        for block in self.dxf.blocks:
-            self.block[block.name]=Group().from_dxf(block._entities, **kwargs)
-
-        super(Drawing, self).from_dxf(self.dxf.entities, **kwargs)
+        try:
+            super(Drawing, self).from_dxf(_dxf_entities(entities(), **kwargs), **kwargs)
+        except Exception as e:
+            logging.error('could not read %s : %s'%(filename,e))
         return self
 
     def save(self,filename,**kwargs):
@@ -16,11 +16,16 @@ __docformat__ = 'restructuredtext'
 __version__ = '$Id$'
 __revision__ = '$Revision$'
 
-import operator, six, abc
+import operator, six, abc, heapq, bisect, collections
 
 from math import pi,sin,cos,atan2,sqrt,hypot,copysign
 from .math2 import angle, sat, sign, isclose
 
+try: # needed only for Vector2Array and Point2Array
+    import numpy as np
+except ImportError:
+    np=None
+
 _reltol=1e-6 #relative tolerance used for isclose comparisons
 
 def _hash(v):
@@ -35,12 +40,59 @@ def _hash(v):
 import copy as copier
 copy=copier.deepcopy
 
+from six.moves import copyreg
+
+class _Slots(object):
+    """base of classes storing their attributes in __slots__ to save memory.
+    Derived classes without __slots__ get a __dict__ as usual
+
+    Point2, Segment2 and Circle keep a __dict__ for the attributes of drawing.Entity,
+    which is grafted on them, so they save less: measured with tracemalloc on Python 3.6,
+    including their coordinates, Point2 takes 140 bytes instead of 244, Segment2 285 instead
+    of 612 and Circle 324 instead of 636, but on Python 3.11, which preallocates instance
+    dicts, Point2 is unchanged and Segment2 and Circle save only 40 and 8 bytes.
+    (Arc2 and Ellipse inherit the __dict__ of Circle). Vector2, Line2, Ray2, Matrix3
+    and the geom3d classes have no __dict__ and save fully
+    """
+    __slots__=()
+
+    def __getstate__(self): # required by pickle protocols 0 and 1
+        slots=dict((k,getattr(self,k)) for k in copyreg._slotnames(self.__class__) if hasattr(self,k))
+        d=_state(self)
+        return (d,slots) if slots else d
+
+def _state(self):
+    """:return: __dict__ of self without the cached attributes listed in its _volatile attribute, or None"""
+    d=getattr(self,'__dict__',None)
+    volatile=getattr(self,'_volatile',())
+    if d and volatile:
+        d=dict((k,v) for k,v in six.iteritems(d) if k not in volatile)
+    return d
+
+_atomic=six.integer_types+(float,bool,complex,type(None))+six.string_types
+
+def _deepcopy(self,memo):
+    """__deepcopy__ for _Slots classes, much faster than the generic way, and copy is used a lot"""
+    cls=self.__class__
+    res=cls.__new__(cls)
+    memo[id(self)]=res
+    d=_state(self)
+    if d:
+        res.__dict__.update(copier.deepcopy(d,memo))
+    for k in copyreg._slotnames(cls):
+        try:
+            x=getattr(self,k)
+        except AttributeError: # unset slot
+            continue
+        setattr(res,k,x if type(x) in _atomic else copier.deepcopy(x,memo))
+    return res
+
 # Geometry
 # Much maths thanks to Paul Bourke, http://astronomy.swin.edu.au/~pbourke
 # --------------------------------------------------------------------------
 
 @six.add_metaclass(abc.ABCMeta)
-class Geometry(object):
+class Geometry(_Slots):
     """
     The following classes are available for dealing with simple 2D geometry.
     The interface to each shape is similar; in particular, the ``connect``
@@ -58,6 +110,8 @@ class Geometry(object):
         >>> line.connect(circ).p2
         Point2(1.59, 0.59)
     """
+    __slots__=()
+
     def __init__(self,*args):
         """
         this constructor is called by descendant classes at copy
@@ -135,7 +189,15 @@ def argPair(x,y=None):
     else:
         return (x,y)
     
-class Vector2(object):
+def _isarray(other):
+    """:return: True if other is a batch of vectors, so that the single element
+    operators must return NotImplemented and let the array's reflected operator run
+    """
+    if isinstance(other,_VectorArray):
+        return True
+    return np is not None and isinstance(other,np.ndarray) and other.ndim>1
+
+class Vector2(_Slots):
     """
     Mutable 2D vector:
 
@@ -293,6 +355,8 @@ class Vector2(object):
             Vector3(2.65, 0.35, 2.62)
 
     """
+    __slots__=('x','y')
+    __deepcopy__=_deepcopy
 
     def __init__ ( self, *args ):
         """Constructor.
@@ -348,7 +412,10 @@ class Vector2(object):
         return iter(self.xy)
 
     def __add__(self, other):
-        x,y=argPair(other)
+        xy=None if _isarray(other) else argPair(other)
+        if xy is None:
+            return NotImplemented
+        x,y=xy
         # Vector - Vector -> Vector
         # Vector - Point -> Point
         # Point - Point -> Vector
@@ -368,7 +435,10 @@ class Vector2(object):
         return self
 
     def __sub__(self, other):
-        x,y=argPair(other)
+        xy=None if _isarray(other) else argPair(other)
+        if xy is None:
+            return NotImplemented
+        x,y=xy
         # Vector - Vector -> Vector
         # Vector - Point -> Point
         # Point - Point -> Vector
@@ -383,11 +453,16 @@ class Vector2(object):
         :param other: Point2 or (x,y) tuple
         :return: Vector2
         """
-        x,y=argPair(other)
+        xy=None if _isarray(other) else argPair(other)
+        if xy is None:
+            return NotImplemented
+        x,y=xy
         return Vector2(x - self.x, y - self.y)
 
     def __mul__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(self.x * other, self.y * other)
 
     __rmul__ = __mul__
@@ -402,33 +477,45 @@ class Vector2(object):
 
     def __div__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.truediv(self.x, other),
                        operator.truediv(self.y, other))
 
     def __rdiv__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.truediv(other, self.x),
                        operator.truediv(other, self.y))
 
     def __floordiv__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.floordiv(self.x, other),
                        operator.floordiv(self.y, other))
 
 
     def __rfloordiv__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.floordiv(other, self.x),
                        operator.floordiv(other, self.y))
 
     def __truediv__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.truediv(self.x, other),
                        operator.truediv(self.y, other))
 
 
     def __rtruediv__(self, other):
         # assert type(other) in (int, int, float)
+        if _isarray(other):
+            return NotImplemented
         return Vector2(operator.truediv(other, self.x),
                        operator.truediv(other, self.y))
 
@@ -652,6 +739,7 @@ class Point2(Vector2, Geometry):
         **Ray2**, **Segment2** or **Circle**.
 
     """
+    # no __slots__ here : drawing.Entity attributes are stored in __dict__
 
     def distance(self,other):
         """
@@ -710,6 +798,241 @@ class Point2(Vector2, Geometry):
 def Polar(mag,angle):
     return Vector2(mag*cos(angle),mag*sin(angle))
 
+class _ArrayItem(object):
+    """mixin for single elements of vector arrays : a view on a row of the array,
+    so that changes to the element are changes to the array and vice-versa
+    """
+    def __init__(self,array,i):
+        self._row=array[i]
+
+def _coordinate(j):
+    """:return: property accessing coordinate j of an _ArrayItem"""
+    def fget(self):
+        return float(self._row[j])
+    def fset(self,value):
+        self._row[j]=value
+    return property(fget,fset)
+
+class Vector2View(_ArrayItem,Vector2):
+    """Vector2 element of a Vector2Array"""
+    x=_coordinate(0)
+    y=_coordinate(1)
+
+class Point2View(_ArrayItem,Point2):
+    """Point2 element of a Point2Array"""
+    x=_coordinate(0)
+    y=_coordinate(1)
+
+class _VectorArray(object):
+    """batch of vectors or points stored in a (n,dim) numpy array of floats
+
+    supports the arithmetic of the single element classes, vectorized,
+    and can be transformed by a matrix in a single call.
+    Indexing by an int returns a view on the element, slicing returns a view on the array
+    """
+    _dim=None # number of coordinates
+    _point=False # True for points, False for vectors
+    _item=None # class of elements
+    _vector=None # class of vector arrays of the same dimension
+    _points=None # class of point arrays of the same dimension
+
+    def __init__(self,data=[]):
+        """
+        :param data: iterable of vectors or points, or (n,dim) array
+        """
+        if isinstance(data,_VectorArray):
+            data=data.array
+        elif not isinstance(data,np.ndarray):
+            data=[tuple(v) for v in data]
+        self.array=np.array(data,dtype=float).reshape(-1,self._dim)
+
+    @classmethod
+    def _new(cls,array):
+        """:return: instance of cls using array without copy"""
+        res=cls.__new__(cls)
+        res.array=array
+        return res
+
+    def __repr__(self):
+        return '%s(%s)'%(self.__class__.__name__,[tuple(v) for v in self.array.tolist()])
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self,i):
+        if isinstance(i,six.integer_types+(np.integer,)):
+            return self._item(self.array,i)
+        return self._new(self.array[i])
+
+    def __setitem__(self,i,value):
+        self.array[i]=self._other(value)
+
+    def __iter__(self):
+        for i in range(len(self.array)):
+            yield self._item(self.array,i)
+
+    def __eq__(self,other):
+        try:
+            other=self._other(other)
+            return np.allclose(self.array,other,rtol=_reltol,atol=0)
+        except (TypeError,ValueError):
+            return False
+
+    def __ne__(self,other):
+        return not self.__eq__(other)
+
+    __hash__=None # mutable
+
+    def _other(self,other):
+        """:return: other as something numpy can broadcast with self.array"""
+        if isinstance(other,_VectorArray):
+            return other.array
+        if isinstance(other,np.ndarray):
+            if other.ndim==1 and len(other)==len(self.array) and len(other)!=self._dim:
+                return other[:,np.newaxis] # one scalar per element
+            return other
+        try:
+            other=tuple(other)
+        except TypeError: # scalar
+            return other
+        try:
+            return np.array(other,dtype=float)
+        except TypeError: # iterable of vectors or points, as in __init__
+            return np.array([tuple(v) for v in other],dtype=float)
+
+    def _class(self,other):
+        """:return: class of self+other, which is a point array
+        if exactly one of self and other contains points
+        """
+        ispoint=other._point if isinstance(other,_VectorArray) else isinstance(other,Geometry)
+        return self._points if self._point!=ispoint else self._vector
+
+    def __add__(self,other):
+        return self._class(other)._new(self.array+self._other(other))
+
+    __radd__=__add__
+
+    def __iadd__(self,other):
+        self.array+=self._other(other)
+        return self
+
+    def __sub__(self,other):
+        return self._class(other)._new(self.array-self._other(other))
+
+    def __rsub__(self,other):
+        return self._class(other)._new(self._other(other)-self.array)
+
+    def __isub__(self,other):
+        self.array-=self._other(other)
+        return self
+
+    def __mul__(self,other):
+        return self._vector._new(self.array*self._other(other))
+
+    __rmul__=__mul__
+
+    def __imul__(self,other):
+        self.array*=self._other(other)
+        return self
+
+    def __truediv__(self,other):
+        return self._vector._new(self.array/self._other(other))
+
+    __div__=__truediv__
+
+    def __itruediv__(self,other):
+        self.array/=self._other(other)
+        return self
+
+    __idiv__=__itruediv__
+
+    def __neg__(self):
+        return self._vector._new(-self.array)
+
+    def __pos__(self):
+        return copy(self)
+
+    def mag2(self):
+        """:return: array of squared magnitudes"""
+        return np.einsum('ij,ij->i',self.array,self.array)
+
+    def mag(self):
+        """:return: array of magnitudes"""
+        return np.sqrt(self.mag2())
+
+    __abs__=mag
+
+    length=property(mag)
+
+    def normalize(self):
+        """normalizes all non-null vectors in place"""
+        d=self.mag()
+        d[d==0]=1
+        self.array/=d[:,np.newaxis]
+        return self
+
+    def normalized(self):
+        return copy(self).normalize()
+
+    def dot(self,other):
+        """:return: array of dot products with other vector(s)"""
+        other=self._other(other)
+        return np.einsum('ij,ij->i',self.array,np.broadcast_to(other,self.array.shape))
+
+    def distance(self,other):
+        """:return: array of distances to other point(s)"""
+        d=self.array-self._other(other)
+        return np.sqrt(np.einsum('ij,ij->i',d,d))
+
+    def _affine(self,mat):
+        """:return: linear (dim,dim) array and translation (dim) array of mat"""
+        raise NotImplementedError
+
+    def _apply_transform(self,mat):
+        """transforms all elements in place, with a single matrix product"""
+        m,t=self._affine(mat)
+        res=self.array.dot(m.T)
+        if self._point:
+            res+=t
+        self.array[:]=res
+        return self
+
+class Vector2Array(_VectorArray):
+    """batch of :class:`Vector2` in a numpy array"""
+    _dim=2
+    _item=Vector2View
+
+    @property
+    def x(self):
+        """:return: array view of x coordinates"""
+        return self.array[:,0]
+
+    @property
+    def y(self):
+        """:return: array view of y coordinates"""
+        return self.array[:,1]
+
+    def cross(self):
+        """:return: Vector2Array of perpendicular vectors"""
+        return Vector2Array._new(np.column_stack((self.y,-self.x)))
+
+    def angle(self):
+        """:return: array of directions in radians"""
+        return np.arctan2(self.y,self.x)
+
+    def _affine(self,mat):
+        m=np.asarray(mat)
+        return m[:2,:2],m[:2,2]
+
+class Point2Array(Vector2Array):
+    """batch of :class:`Point2` in a numpy array"""
+    _point=True
+    _item=Point2View
+
+Vector2Array._vector=Point2Array._vector=Vector2Array
+Vector2Array._points=Point2Array._points=Point2Array
+
+
 
 class Line2(Geometry):
     """
@@ -762,6 +1085,8 @@ class Line2(Geometry):
 
     **Segment2** also has a *length* property which is read-only.
     """
+    __slots__=('p','v')
+    __deepcopy__=_deepcopy
 
     def __init__(self, *args):
         super(Line2,self).__init__(*args)
@@ -836,11 +1161,13 @@ class Line2(Geometry):
         return _connect_circle_line2(other, self)
 
 class Ray2(Line2):
+    __slots__=()
 
     def _u_in(self, u):
         return u >= 0.0
 
 class Segment2(Line2):
+    # no __slots__ here : drawing.Entity attributes are stored in __dict__
     p1 = property(lambda self: self.p)
     p2 = property(lambda self: Point2(self.p.x + self.v.x, self.p.y + self.v.y))
 
@@ -896,6 +1223,9 @@ class Circle(Geometry):
         Returns the absolute minimum distance to *other*.  Internally this
         simply returns the length of the result of ``connect``.
     """
+    __slots__=('c','p','r','__dict__') # __dict__ for drawing.Entity attributes
+    __deepcopy__=_deepcopy
+
     def __init__(self, *args):
         """:param args: can be
         * Circle
@@ -1028,6 +1358,7 @@ def arc_from_3_points(a,b,c):
     return res
 
 class Arc2(Circle):
+    __slots__=('p2','dir','a','b')
 
     def __init__(self, center, p1=0, p2=2*pi, r=None, dir=1):
         """
@@ -1130,10 +1461,10 @@ class Arc2(Circle):
     def intersect(self, other):
         inters= other._intersect_circle(self)
         if not inters: return None
-        try:
-            inters[1]
-        except:
-            inters=tuple(inters)
+        if isinstance(inters,Point2): # single point
+            inters=(inters,)
+        elif isinstance(inters,Circle): # inscribed, see _intersect_circle_circle
+            return inters
         res=[]
         for pt in inters:
             if pt in self:
@@ -1149,6 +1480,7 @@ class Arc2(Circle):
         return self.intersect(other)
     
 class Ellipse(Circle):
+    __slots__=('r2',)
  
     def __init__(self, *args):
         """:param args: can be
@@ -1185,9 +1517,125 @@ class Ellipse(Circle):
         self.p = t * self.p
         self.r,self.r2=(self.p-self.c).xy
 
+def _bounds(entity):
+    """:return: (xmin,ymin,xmax,ymax) tuple containing entity, maybe infinite"""
+    if isinstance(entity,Point2):
+        return (entity.x,entity.y,entity.x,entity.y)
+    if isinstance(entity,Segment2):
+        p1,p2=entity.p,entity.p2
+        return (min(p1.x,p2.x),min(p1.y,p2.y),max(p1.x,p2.x),max(p1.y,p2.y))
+    if isinstance(entity,Ellipse):
+        r=max(abs(entity.r),abs(entity.r2))
+    elif isinstance(entity,Circle): # and Arc2, whose box is a bit too large, which doesn't matter
+        r=entity.r
+    else:
+        try:
+            b=entity.bbox()
+            return (b.xmin,b.ymin,b.xmax,b.ymax)
+        except Exception: # Line2, Ray2, ...
+            inf=float('inf')
+            return (-inf,-inf,inf,inf)
+    return (entity.c.x-r,entity.c.y-r,entity.c.x+r,entity.c.y+r)
+
+class _Intervals(object):
+    """dynamic set of closed intervals with bounds among known values,
+    reporting the intervals overlapping a query interval in O(log n + k).
+
+    intervals containing the query's low bound are found in a segment tree
+    over the sorted values, the others by bisecting the sorted low bounds
+    """
+    def __init__(self, values):
+        """:param values: iterable of all bounds of intervals that may be added"""
+        values=sorted(set(values))
+        self.index=dict((v,i) for i,v in enumerate(values))
+        self.size=1
+        while self.size<len(values):
+            self.size*=2
+        self.nodes=collections.defaultdict(set) # node:keys of intervals covering it
+        self.lows=[] # sorted (low index,key) of all intervals
+
+    def _cover(self, lo, hi):
+        """:return: iterator over segment tree nodes covering [lo,hi] indices"""
+        lo,hi=lo+self.size,hi+self.size+1
+        while lo<hi:
+            if lo&1:
+                yield lo
+                lo+=1
+            if hi&1:
+                hi-=1
+                yield hi
+            lo,hi=lo//2,hi//2
+
+    def add(self, key, lo, hi):
+        lo,hi=self.index[lo],self.index[hi]
+        for node in self._cover(lo,hi):
+            self.nodes[node].add(key)
+        bisect.insort(self.lows,(lo,key))
+
+    def remove(self, key, lo, hi):
+        lo,hi=self.index[lo],self.index[hi]
+        for node in self._cover(lo,hi):
+            self.nodes[node].discard(key)
+        del self.lows[bisect.bisect_left(self.lows,(lo,key))]
+
+    def overlap(self, lo, hi):
+        """:return: list of keys of intervals overlapping [lo,hi]"""
+        lo,hi=self.index[lo],self.index[hi]
+        res=[]
+        node=lo+self.size
+        while node: # intervals containing lo
+            res.extend(self.nodes.get(node,()))
+            node//=2
+        i=bisect.bisect_right(self.lows,(lo,float('inf')))
+        j=bisect.bisect_right(self.lows,(hi,float('inf')))
+        res.extend(key for _,key in self.lows[i:j]) # intervals starting in ]lo,hi]
+        return res
 
+def intersections(entities):
+    """all intersections between entities
 
-class Matrix3(object):
+    a sweep line moving along x keeps the entities whose x extent contains it,
+    ordered by y extent, so only entities with overlapping boxes are
+    intersected with each other.
+    colinear overlapping segments intersect as in :meth:`Line2.intersect`
+    and generate the ends of the intersection segment
+
+    :param entities: iterable of :class:`Geometry`, typically :class:`Segment2` and :class:`Arc2`
+    :return: iterator over (Point2,entity1,entity2) tuples, where entity1 is before entity2 in entities
+    """
+    events=[] # (xmin,rank,box,entity)
+    for i,e in enumerate(entities):
+        b=_bounds(e)
+        events.append((b[0],i,b,e))
+    events.sort(key=operator.itemgetter(0,1))
+
+    active=_Intervals(y for _,_,b,_ in events for y in (b[1],b[3])) # events crossing the sweep line
+    ends=[] # heap of (xmax,event) of active entities
+    for n,(x,i,b,e) in enumerate(events):
+        while ends and ends[0][0]<x: # entities at the left of the sweep line
+            m=heapq.heappop(ends)[1]
+            b2=events[m][2]
+            active.remove(m,b2[1],b2[3])
+        for m in sorted(active.overlap(b[1],b[3])): # in sweep order
+            _,j,_,e2=events[m]
+            a,c=(e2,e) if j<i else (e,e2)
+            inter=a.intersect(c)
+            if inter is None:
+                continue
+            if isinstance(inter,Point2):
+                yield (inter,a,c)
+            elif isinstance(inter,Segment2):
+                yield (inter.p,a,c)
+                yield (inter.p2,a,c)
+            elif isinstance(inter,list): # list of multiple points
+                for p in inter:
+                    yield (p,a,c)
+            # else inter is a Circle inscribed in the other, without crossing
+        active.add(n,b[1],b[3])
+        heapq.heappush(ends,(b[2],n))
+
+
+class Matrix3(_Slots):
     """
     Two matrix classes are supplied, *Matrix3*, a 3x3 matrix for working with 2D
     affine transformations, and *Matrix4*, a 4x4 matrix for working with 3D
@@ -1437,6 +1885,8 @@ class Matrix3(object):
     The ``copy`` method is also implemented in both matrix classes and
     behaves in the obvious way.
     """
+    __slots__=('a','b','c','e','f','g','i','j','k')
+    __deepcopy__=_deepcopy
 
     def __init__(self, *args):
         self.identity()
@@ -1522,7 +1972,13 @@ class Matrix3(object):
     
     def __mul__(self, other):
         if isinstance(other,Matrix3):
-            res = copy(self)
+            res = self.__class__.__new__(self.__class__) # much faster than copy
+            (res.a, res.b, res.c,
+             res.e, res.f, res.g,
+             res.i, res.j, res.k) = \
+            (self.a, self.b, self.c,
+             self.e, self.f, self.g,
+             self.i, self.j, self.k)
             res*=other
         else:
             res = copy(other)
@@ -1531,6 +1987,29 @@ class Matrix3(object):
 
     def __call__(self,other):
         return self*other
+
+    def __array__(self, dtype=None, copy=None):
+        """:return: (3,3) numpy array, by lines. Allows numpy.asarray(matrix)
+        :param dtype: of the array, float by default
+        :param copy: as in numpy 2. the array is always a copy, so False raises ValueError
+        """
+        if copy is False:
+            raise ValueError('%s can not be converted to an array without copy'%self.__class__.__name__)
+        return np.array([[self.a, self.b, self.c],
+                         [self.e, self.f, self.g],
+                         [self.i, self.j, self.k]],dtype=float if dtype is None else dtype)
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        :param array: (3,3) array-like, by lines
+        :return: Matrix3
+        """
+        self = cls.__new__(cls)
+        ((self.a, self.b, self.c),
+         (self.e, self.f, self.g),
+         (self.i, self.j, self.k)) = np.asarray(array,dtype=float).tolist()
+        return self
     
     
     def identity(self):
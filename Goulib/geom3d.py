@@ -19,7 +19,7 @@ __revision__ = '$Revision$'
 import operator, six, abc
 
 from math import pi,sin,cos,tan,acos,asin,atan2,sqrt,hypot,copysign
-from .geom import Geometry,copy
+from .geom import Geometry,copy,np,_Slots,_deepcopy,_ArrayItem,_coordinate,_VectorArray
 
 # 3D Geometry
 # -------------------------------------------------------------------------
@@ -222,9 +222,11 @@ def _intersect_plane_plane(A, B):
                         c1 * A.n.z + c2 * B.n.z),
                  A.n.cross(B.n))
 
-class Vector3(object):
+class Vector3(_Slots):
     """ Mutable 3D Vector.
     See `Vector2`documentation"""
+    __slots__=('x','y','z')
+    __deepcopy__=_deepcopy
 
     def __init__(self, *args):
         """Constructor.
@@ -499,6 +501,7 @@ class Point3(Vector3, Geometry):
         Returns the absolute minimum distance to *other*.  Internally this
         simply returns the length of the result of ``connect``.
     """
+    __slots__=()
 
     def intersect(self, other):
         """Point3/object intersection
@@ -529,6 +532,54 @@ class Point3(Vector3, Geometry):
         if c:
             return c.swap()
 
+class Vector3View(_ArrayItem,Vector3):
+    """Vector3 element of a Vector3Array"""
+    x=_coordinate(0)
+    y=_coordinate(1)
+    z=_coordinate(2)
+
+class Point3View(_ArrayItem,Point3):
+    """Point3 element of a Point3Array"""
+    x=_coordinate(0)
+    y=_coordinate(1)
+    z=_coordinate(2)
+
+class Vector3Array(_VectorArray):
+    """batch of :class:`Vector3` in a numpy array"""
+    _dim=3
+    _item=Vector3View
+
+    @property
+    def x(self):
+        """:return: array view of x coordinates"""
+        return self.array[:,0]
+
+    @property
+    def y(self):
+        """:return: array view of y coordinates"""
+        return self.array[:,1]
+
+    @property
+    def z(self):
+        """:return: array view of z coordinates"""
+        return self.array[:,2]
+
+    def cross(self,other):
+        """:return: Vector3Array of cross products with other vector(s)"""
+        return Vector3Array._new(np.cross(self.array,self._other(other)))
+
+    def _affine(self,mat):
+        m=np.asarray(mat)
+        return m[:3,:3],m[:3,3]
+
+class Point3Array(Vector3Array):
+    """batch of :class:`Point3` in a numpy array"""
+    _point=True
+    _item=Point3View
+
+Vector3Array._vector=Point3Array._vector=Vector3Array
+Vector3Array._points=Point3Array._points=Point3Array
+
 class Line3(Geometry):
     """
     A **Line3** is a line on a 3D plane extending to infinity in both directions;
@@ -890,7 +941,10 @@ class Plane(Geometry):
 # i j k l
 # m n o p
 
-class Matrix4(object):
+class Matrix4(_Slots):
+    """3D affine transformation. See `Matrix3` documentation"""
+    __slots__=('a','b','c','d','e','f','g','h','i','j','k','l','m','n','o','p')
+    __deepcopy__=_deepcopy
 
     def __init__(self, *args):
         self.identity()
@@ -1004,6 +1058,31 @@ class Matrix4(object):
     def __call__(self,other):
         return self*other
 
+    def __array__(self, dtype=None, copy=None):
+        """:return: (4,4) numpy array, by lines. Allows numpy.asarray(matrix)
+        :param dtype: of the array, float by default
+        :param copy: as in numpy 2. the array is always a copy, so False raises ValueError
+        """
+        if copy is False:
+            raise ValueError('%s can not be converted to an array without copy'%self.__class__.__name__)
+        return np.array([[self.a, self.b, self.c, self.d],
+                         [self.e, self.f, self.g, self.h],
+                         [self.i, self.j, self.k, self.l],
+                         [self.m, self.n, self.o, self.p]],dtype=float if dtype is None else dtype)
+
+    @classmethod
+    def from_array(cls, array):
+        """
+        :param array: (4,4) array-like, by lines
+        :return: Matrix4
+        """
+        self = cls.__new__(cls)
+        ((self.a, self.b, self.c, self.d),
+         (self.e, self.f, self.g, self.h),
+         (self.i, self.j, self.k, self.l),
+         (self.m, self.n, self.o, self.p)) = np.asarray(array,dtype=float).tolist()
+        return self
+
     def __imul__(self, other):
         # assert isinstance(other, Matrix4)
         # Cache attributes in local vars (see Matrix3.__mul__).
@@ -1058,6 +1137,12 @@ class Matrix4(object):
         return self
 
     def transform(self, other):
+        if isinstance(other, Vector3Array): # vectorized, with perspective division
+            m=np.array(self[:],dtype=float).reshape(4,4) # column major
+            a=np.column_stack((other.array,np.ones(len(other.array)))).dot(m)
+            w=a[:,3:]
+            w[w==0]=1
+            return Point3Array._new(a[:,:3]/w)
         A = self
         B = other
         P = Point3(0, 0, 0)
@@ -1309,7 +1394,7 @@ class Matrix4(object):
 
         return tmp;
 
-class Quaternion:
+class Quaternion(_Slots):
     """
     A quaternion represents a three-dimensional rotation or reflection
     transformation.  They are the preferred way to store and manipulate
@@ -1457,6 +1542,8 @@ class Quaternion:
     # http://www.euclideanspace.com/maths/algebra/realNormedAlgebra/quaternions
 
     # w is the real part, (x, y, z) are the imaginary parts
+    __slots__=('w','x','y','z')
+    __deepcopy__=_deepcopy
 
     def __init__(self, w=1, x=0, y=0, z=0):
         super(Quaternion,self).__init__() #TODO: add a copy constructor one day
@@ -8,7 +8,7 @@ efficient Euclidian Graphs for :mod:`networkx` and related algorithms
 * `matplotlib <http://pypi.python.org/pypi/matplotlib/>`_
 
 :optional:
-* `scipy <http://www.scipy.org/>`_ for delauney triangulation
+* `scipy <http://www.scipy.org/>`_ for delauney triangulation and :class:`FrozenGeoGraph`
 * `rtree <http://toblerity.org/rtree/>`_ for faster GeoGraph algorithms
 """
 
@@ -17,7 +17,7 @@ __copyright__ = "Copyright 2014, Philippe Guglielmetti"
 __credits__ = []
 __license__ = "LGPL"
 
-import logging, math, six, json
+import logging, math, six, json, heapq, itertools, re
 
 import networkx as nx # http://networkx.github.io/
 
@@ -33,6 +33,7 @@ except Exception:
 
 from . import math2
 from . import itertools2
+from .decorators import memoize
 
 """
 finding the nearest neighbor in a large GeoGraph is much faster with the
@@ -120,6 +121,47 @@ def to_networkx_graph(data,create_using=None,multigraph_input=False):
 
 
 
+def _merge_close(pos, tol):
+    """ positions are taken in order, and each one is merged with the closest
+    position kept before it within tol, if any, as :meth:`GeoGraph.add_node` does
+    :param pos: numpy (n,dim) array of positions
+    :param tol: float distance under which positions are merged
+    :return: numpy int array of the index of the kept position merged with each position
+    """
+    import numpy
+    n=len(pos)
+    res=numpy.arange(n)
+    if tol<=0: # only equal positions are merged
+        _,first,inverse=numpy.unique(pos,axis=0,return_index=True,return_inverse=True)
+        return first[inverse]
+    if SCIPY: # only positions having a close one before them are processed in python
+        pairs=scipy.spatial.cKDTree(pos).query_pairs(tol,output_type='ndarray') # i<j
+        pairs=pairs[numpy.lexsort((pairs[:,0],pairs[:,1]))] # grouped by j
+        js,starts=numpy.unique(pairs[:,1],return_index=True)
+        kept=numpy.ones(n,dtype=bool)
+        for j,close in zip(js.tolist(),numpy.split(pairs[:,0],starts[1:])):
+            close=close[kept[close]]
+            if len(close):
+                res[j]=close[((pos[close]-pos[j])**2).sum(axis=1).argmin()]
+                kept[j]=False
+        return res
+    # without scipy, kept positions are hashed in a grid of tol sized cells
+    cells={} # cell:list of indices of kept positions
+    neighbours=list(itertools.product((-1,0,1),repeat=pos.shape[1]))
+    for j,p in enumerate(pos.tolist()):
+        cell=tuple(int(math.floor(x/tol)) for x in p)
+        best,dist=None,tol
+        for offset in neighbours:
+            for i in cells.get(tuple(c+o for c,o in zip(cell,offset)),()):
+                d=math2.dist(p,pos[i])
+                if d<=dist:
+                    best,dist=i,d
+        if best is None:
+            cells.setdefault(cell,[]).append(j)
+        else:
+            res[j]=best
+    return res
+
 class _Geo(plot.Plot):
     """base class for graph with nodes at specified positions.
     if edges have a "length" attribute, it is used to compute distances,
@@ -154,6 +196,111 @@ class _Geo(plot.Plot):
         self.render_args={}
 
 
+    @classmethod
+    def from_arrays(cls, positions, edges=[], tol=None, lengths=None, ids=None, **kwargs):
+        """ fast construction of a large graph
+        all nodes are loaded in the rtree at once and edges lengths are computed in a single call
+        :param positions: (n,dim) array-like of nodes positions
+        :param edges: (m,2) array-like of int indices in positions of the ends of each edge
+        :param tol: float each position is merged with the closest node within tol added before it, if any,
+          as when nodes are added one by one. graph's default tol if None
+        :param lengths: optional (m,) array-like of edges lengths. euclidian distances if None
+        :param ids: optional list of n nodes ids if they aren't their positions. positions are not merged then
+        :param kwargs: passed to the graph constructor
+        :return: graph
+        """
+        import numpy
+        if tol is not None:
+            kwargs['tol']=tol
+        g=cls(**kwargs)
+        pos=numpy.asarray(positions,dtype=float)
+        if len(pos)==0:
+            return g
+        if ids is None:
+            merged=_merge_close(pos,g.tol)
+            nodes=numpy.flatnonzero(merged==numpy.arange(len(pos))) # sorted indices of unique positions
+        else:
+            merged=nodes=numpy.arange(len(pos))
+        points=[tuple(p) for p in pos[nodes].tolist()]
+        if ids is None:
+            ids=points
+
+        global _nk
+        keys=range(_nk+1,_nk+1+len(ids))
+        _nk+=len(ids)
+        prop=index.Property()
+        prop.set_dimension(pos.shape[1])
+        if RTREE: # bulk loading is much faster than inserting nodes one by one
+            g.idx=index.Index(((k,p+p,p) for k,p in zip(keys,points)),properties=prop)
+        else:
+            g.idx=index.Index(properties=prop)
+            for k,p in zip(keys,points):
+                g.idx.insert(k,p,p)
+        g.parent.add_nodes_from(g,((n,{'key':k}) if n==p else (n,{'key':k,'pos':p})
+            for n,k,p in zip(ids,keys,points)))
+        g._map.update(zip(ids,points))
+
+        edges=numpy.asarray(edges,dtype=int).reshape(-1,2)
+        ends=merged[edges]
+        if lengths is None:
+            lengths=numpy.sqrt(((pos[ends[:,0]]-pos[ends[:,1]])**2).sum(axis=1))
+        else:
+            lengths=numpy.asarray(lengths,dtype=float)
+        ends=numpy.searchsorted(nodes,ends) # indices in ids
+        multi=g.is_multigraph()
+        for (u,v),l in zip(ends.tolist(),lengths.tolist()):
+            u,v=ids[u],ids[v]
+            if not multi and v in g.adj[u]:
+                continue # keep existing edge, as add_edge does
+            g.parent.add_edge(g,u,v,None,length=l)
+        return g
+
+    cache_size=128 # max number of shortest path trees kept in cache
+
+    def __getstate__(self):
+        state=dict(self.__dict__)
+        for cache in ('_trees','_nodes_index','_edges_index'): # rebuilt when needed
+            state.pop(cache,None)
+        return state
+
+    def invalidate(self):
+        """clears the cache of shortest paths and the indexes of :meth:`closest_nodes_many`
+        and :meth:`closest_edges_many`. Called automatically when nodes or edges are added or removed,
+        but must be called when the length of an existing edge is changed
+        """
+        trees=self.__dict__.get('_trees')
+        if trees is not None:
+            trees.cache_clear()
+        self.__dict__.pop('_nodes_index',None)
+        self.__dict__.pop('_edges_index',None)
+
+    def freeze(self):
+        """
+        :return: :class:`FrozenGeoGraph` immutable compact copy of graph
+        """
+        import numpy
+        nodes=list(self.nodes())
+        index=dict((n,i) for i,n in enumerate(nodes))
+        rows,cols,lengths=[],[],[]
+        for u,nbrs in six.iteritems(self.adj): # successors only for directed graphs
+            i=index[u]
+            for v,edges in six.iteritems(nbrs):
+                j=index[v]
+                for data in six.itervalues(edges):
+                    rows.append(i)
+                    cols.append(j)
+                    lengths.append(data.get('length',0))
+        rows=numpy.array(rows,dtype=numpy.int64)
+        cols=numpy.array(cols,dtype=numpy.int64)
+        lengths=numpy.array(lengths,dtype=float)
+        order=numpy.lexsort((lengths,cols,rows)) # shortest of multiple edges first
+        indptr=numpy.zeros(len(nodes)+1,dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(rows,minlength=len(nodes)),out=indptr[1:])
+        pos=numpy.array([self.pos(n) for n in nodes],dtype=float).reshape(len(nodes),-1)
+        ids=None if all(n==tuple(p) for n,p in zip(nodes,pos.tolist())) else nodes
+        return FrozenGeoGraph(indptr,cols[order],lengths[order],pos,
+            directed=self.is_directed(),tol=self.tol,ids=ids,name=self.name,multi=self.multi)
+
     def copy(self):
         """
         :return: copy of self graph
@@ -184,6 +331,7 @@ class _Geo(plot.Plot):
 
     def clear(self):
         #saves some graph attributes cleared by convert._prep_create_using
+        self.invalidate()
         t,m=self.tol,self.multi
         self.parent.clear(self)
         self.multi=m
@@ -317,6 +465,107 @@ class _Geo(plot.Plot):
 
         return edges,d
 
+    def _nodes_kdtree(self):
+        """
+        :return: numpy object array of nodes, :class:`scipy.spatial.cKDTree` of their positions
+        """
+        try:
+            return self._nodes_index
+        except AttributeError:
+            pass
+        nodes=list(self.nodes())
+        ids=numpy.empty(len(nodes),dtype=object) # filled one by one, as nodes may be tuples
+        for i,n in enumerate(nodes):
+            ids[i]=n
+        pos=numpy.array([self.pos(n) for n in nodes],dtype=float).reshape(len(nodes),-1)
+        self._nodes_index=ids,scipy.spatial.cKDTree(pos)
+        return self._nodes_index
+
+    def closest_nodes_many(self,points,k=1):
+        """ nodes closest to many positions at once
+        :param points: (m,dim) array-like of positions
+        :param k: int number of nodes to find for each position
+        :return: numpy (m,) object array of closest nodes, (m,) float array of distances,
+          or (m,k) arrays sorted by increasing distance if k>1
+        """
+        ids,tree=self._nodes_kdtree()
+        k=min(k,len(ids))
+        if k==0:
+            raise KeyError('empty graph')
+        dist,i=tree.query(numpy.asarray(points,dtype=float),k=k)
+        return ids[i],dist
+
+    def _edges_kdtree(self):
+        """ edges are indexed by points sampled along them, no farther apart than the median positive edge length,
+        so that edges close to a position are found by a fixed radius query
+        :return: object array of edges (u,v,key), (e,dim) arrays of edges ends,
+          float distance between samples, cKDTree of samples, int array of the edge of each sample
+        """
+        try:
+            return self._edges_index
+        except AttributeError:
+            pass
+        edges=list(self.edges(keys=True))
+        ids=numpy.empty(len(edges),dtype=object)
+        for i,e in enumerate(edges):
+            ids[i]=e
+        a=numpy.array([self.pos(u) for u,_,_ in edges],dtype=float).reshape(len(edges),-1)
+        b=numpy.array([self.pos(v) for _,v,_ in edges],dtype=float).reshape(len(edges),-1)
+        lengths=numpy.sqrt(((b-a)**2).sum(axis=1))
+        positive=lengths[lengths>0] # zero length loops would make a null step
+        step=float(numpy.median(positive)) if len(positive) else 1
+        n=numpy.ceil(lengths/step).astype(int)+1
+        edge=numpy.repeat(numpy.arange(len(edges)),n) # edge of each sample
+        t=numpy.arange(n.sum())-numpy.repeat(numpy.cumsum(n)-n,n) # rank of each sample along its edge
+        t=(t/numpy.maximum(n-1,1)[edge])[:,numpy.newaxis]
+        samples=a[edge]+t*(b-a)[edge]
+        self._edges_index=ids,a,b,step,scipy.spatial.cKDTree(samples),edge
+        return self._edges_index
+
+    def closest_edges_many(self,points,radius):
+        """ edges closest to many positions at once, for map matching for example
+        :param points: (m,dim) array-like of positions
+        :param radius: float max distance between positions and edges
+        :return: numpy (m,) object array of closest edges as (u,v,key) tuples or None if no edge is within radius,
+          (m,) float array of distances (inf if no edge),
+          (m,dim) float array of projections of positions on edges (nan if no edge)
+        """
+        ids,a,b,step,tree,edge=self._edges_kdtree()
+        p=numpy.asarray(points,dtype=float).reshape(-1,a.shape[1])
+        m=len(p)
+        res=numpy.full(m,None,dtype=object)
+        dist=numpy.full(m,numpy.inf)
+        proj=numpy.full(p.shape,numpy.nan)
+        if m==0 or len(ids)==0:
+            return res,dist,proj
+        # any point of an edge is at most step/2 away from a sample of the edge,
+        # so the k closest samples contain the closest edge if it is closer than kth sample - step/2
+        r=radius+step/2
+        todo=numpy.arange(m)
+        k=min(8,len(edge))
+        while len(todo):
+            ds,s=tree.query(p[todo],k=k,distance_upper_bound=r)
+            ds,s=ds.reshape(len(todo),k),s.reshape(len(todo),k)
+            valid=s<len(edge) # missing neighbors are returned with index len(edge)
+            j=edge[numpy.where(valid,s,0)]
+            v=b[j]-a[j]
+            l2=(v*v).sum(axis=2)
+            w=p[todo][:,numpy.newaxis,:]
+            t=((w-a[j])*v).sum(axis=2)/numpy.where(l2>0,l2,1)
+            q=a[j]+numpy.clip(t,0,1)[:,:,numpy.newaxis]*v
+            d=numpy.where(valid,numpy.sqrt(((w-q)**2).sum(axis=2)),numpy.inf)
+            best=d.argmin(axis=1)
+            rows=numpy.arange(len(todo))
+            d,j,q=d[rows,best],j[rows,best],q[rows,best]
+            done=(d<=ds[:,-1]-step/2)|~valid[:,-1]|(k==len(edge))
+            found=done&(d<=radius)
+            res[todo[found]]=ids[j[found]]
+            dist[todo[found]]=d[found]
+            proj[todo[found]]=q[found]
+            todo=todo[~done]
+            k=min(2*k,len(edge))
+        return res,dist,proj
+
     def add_node(self, p, attr_dict=None, **attr):
         """add a node or return one already very close
         :return (x,y,...) node id
@@ -339,9 +588,11 @@ class _Geo(plot.Plot):
 
             p=a.get('pos',id)
             if isinstance(p,six.string_types):
-                p=p.split(',')
+                p=p.strip('"').split(',') # pydot keeps quotes
             try:
                 p=tuple(float(x) for x in p)
+                if 'pos' in a:
+                    a['pos']=p
             except: # assign a random position, but keep node id
                 from random import random
                 a['pos']=p=tuple((random(),random()))
@@ -357,6 +608,7 @@ class _Geo(plot.Plot):
         if close and d<=self.tol:
             return close[0]
         else: # point doesn't exist yet : create it
+            self.invalidate()
             #RTREE uses unique int node identifiers
             global _nk
             _nk+=1
@@ -389,6 +641,7 @@ class _Geo(plot.Plot):
             logging.error('GeoGraph has %d!=%d'%(n1,n2))
             raise RuntimeError('Nodes/Rtree mismatch')
         nk=self.node[n]['key']
+        self.invalidate()
         self.parent.remove_node(self,n)
         self.idx.delete(nk,n) #in fact n is ignored, the nk key is used here
 
@@ -413,6 +666,7 @@ class _Geo(plot.Plot):
         if type(k) is dict: #old syntax : previous versions of NetworkX didn't require a key
             attr_dict,k=k,None
 
+        self.invalidate()
         #adjust to existing nodes within tolerance and keep track of actual precision
         u=self.add_node(u)
         v=self.add_node(v)
@@ -480,6 +734,7 @@ class _Geo(plot.Plot):
             data=self.edge[u][v][key]
         else:
             data=self.edge[u][v]
+        self.invalidate()
         self.parent.remove_edge(self,u,v,key)
 
         if clean:
@@ -498,8 +753,116 @@ class _Geo(plot.Plot):
                 raise KeyError('%s %s number of nodes %d!=%d'%(self.__class__.__name__, self.name, n1,n2))
         return n1
 
-    def shortest_path(self,source=None,target=None):
-        return nx.shortest_path(self,source,target) #TODO : add distance weights
+    def _search(self, source, target=None):
+        """ Dijkstra search weighted by edges lengths,
+        A* search with euclidian distance to target as heuristic if target is defined,
+        which is admissible as long as edges are not shorter than the distance between their nodes
+        :return: dict of distances from source, dict of predecessors on shortest paths
+        """
+        for n in (source,target):
+            if n is not None and n not in self.adj:
+                raise nx.NetworkXError('node %s not in graph'%(n,))
+        if target is None:
+            h=lambda v:0
+        else:
+            end=self.pos(target)
+            h=lambda v:math2.dist(self.pos(v),end)
+        dist,pred={},{source:None}
+        seen={source:0}
+        c=itertools.count() # avoids comparing nodes
+        heap=[(h(source),0,next(c),source)]
+        while heap:
+            _,d,_,u=heapq.heappop(heap)
+            if u in dist:
+                continue
+            dist[u]=d
+            if u==target:
+                break
+            for v,edges in six.iteritems(self.adj[u]):
+                if v in dist:
+                    continue
+                l=d+min(e['length'] for e in six.itervalues(edges)) # shortest of multiple edges
+                if v not in seen or l<seen[v]:
+                    seen[v]=l
+                    pred[v]=u
+                    heapq.heappush(heap,(l+h(v),l,next(c),v))
+        return dist,pred
+
+    def _tree(self, source):
+        """
+        :return: cached shortest paths tree from source, as returned by :meth:`_search`
+        """
+        try:
+            trees=self.__dict__['_trees']
+        except KeyError:
+            trees=self._trees=memoize(self._search,maxsize=self.cache_size)
+        return trees(source)
+
+    @staticmethod
+    def _path(pred, target):
+        """:return: list of nodes from the root of pred tree to target"""
+        res=[]
+        while target is not None:
+            res.append(target)
+            target=pred[target]
+        return res[::-1]
+
+    def shortest_path(self,source=None,target=None,heuristic=False):
+        """ shortest paths weighted by edges lengths
+        :param source: node. all nodes if None
+        :param target: node. all nodes if None
+        :param heuristic: bool if True, a path between source and target is searched with A*,
+          which is faster but correct only if no edge is shorter than the distance between its nodes.
+          otherwise the cached shortest paths tree of source is used
+        :return: list of nodes from source to target, or dict(s) of paths like :func:`networkx.shortest_path`
+        """
+        if source is None:
+            if target is None:
+                return dict((n,self.shortest_path(n)) for n in self)
+            paths=dict((n,self.shortest_path(n,target,heuristic)) for n in self if target in self._tree(n)[0])
+            return paths
+        if target is None:
+            pred=self._tree(source)[1]
+            return dict((n,self._path(pred,n)) for n in pred)
+        if heuristic:
+            dist,pred=self._search(source,target) # A*
+        else:
+            dist,pred=self._tree(source)
+        if target not in dist:
+            raise nx.NetworkXNoPath('node %s not reachable from %s'%(target,source))
+        return self._path(pred,target)
+
+    def shortest_path_length(self,source,target=None):
+        """
+        :param source: node
+        :param target: node. all nodes if None
+        :return: float length of shortest path from source to target,
+          or dict of lengths of shortest paths to all reachable nodes
+        """
+        dist=self._tree(source)[0]
+        if target is None:
+            return dict(dist) # copy so that the cached tree can't be modified
+        try:
+            return dist[target]
+        except KeyError:
+            raise nx.NetworkXNoPath('node %s not reachable from %s'%(target,source))
+
+    def distance_matrix(self,sources,targets=None):
+        """ lengths of shortest paths between many nodes,
+        using the cached shortest path trees of sources
+        :param sources: iterable of nodes
+        :param targets: iterable of nodes, sources if None
+        :return: numpy (len(sources),len(targets)) array of floats, inf where there is no path
+        """
+        import numpy
+        sources=list(sources)
+        targets=sources if targets is None else list(targets)
+        res=numpy.full((len(sources),len(targets)),numpy.inf)
+        for i,s in enumerate(sources):
+            dist=self._tree(s)[0]
+            for j,t in enumerate(targets):
+                res[i,j]=dist.get(t,numpy.inf)
+        return res
 
     def stats(self):
         """:return: dict of graph data to use in __repr__ or usable otherwise"""
@@ -546,7 +909,10 @@ class _Geo(plot.Plot):
         return res
 
     def save(self,filename,**kwargs):
-        """ save graph in various formats"""
+        """ save graph in various formats.
+        .npz files contain only positions and edges arrays, and are reloaded quickly
+        with FrozenGeoGraph.load(filename).thaw()
+        """
         ext=filename.split('.')[-1].lower()
         if ext=='dxf':
             write_dxf(self,filename)
@@ -554,6 +920,8 @@ class _Geo(plot.Plot):
             write_dot(self, filename)
         elif ext=='json':
             write_json(self,filename,**kwargs)
+        elif ext=='npz':
+            self.freeze().save(filename)
         else:
             open(filename,'wb').write(self.render(ext,**kwargs))
         return self
@@ -599,6 +967,295 @@ class DiGraph(_Geo, nx.MultiDiGraph):
         _Geo.__init__(self,nx.MultiDiGraph,data,nodes)
 
 
+def _load_npz(filename, mmap_mode='r'):
+    """ numpy.load ignores mmap_mode for .npz files, so arrays stored
+    uncompressed in the zip file (as by numpy.savez) are memory-mapped here
+    :return: dict of arrays
+    """
+    import numpy, zipfile, struct
+    fmt=numpy.lib.format
+    res={}
+    with zipfile.ZipFile(filename) as z, open(filename,'rb') as f:
+        for info in z.infolist():
+            name=info.filename[:-4] # remove .npy
+            if info.compress_type!=zipfile.ZIP_STORED:
+                res[name]=fmt.read_array(z.open(info),allow_pickle=True)
+                continue
+            f.seek(info.header_offset+26) # in zip local file header
+            n,m=struct.unpack('<HH',f.read(4)) # lengths of file name and extra field
+            start=info.header_offset+30+n+m
+            f.seek(start)
+            version=fmt.read_magic(f)
+            read_header={(1,0):fmt.read_array_header_1_0,(2,0):fmt.read_array_header_2_0}.get(version)
+            if read_header is not None:
+                shape,fortran,dtype=read_header(f)
+                if shape and not dtype.hasobject and numpy.prod(shape)>0:
+                    res[name]=numpy.memmap(filename,dtype=dtype,mode=mmap_mode,
+                        shape=shape,order='F' if fortran else 'C',offset=f.tell())
+                    continue
+            f.seek(start) # small, empty or object arrays are simply read
+            res[name]=fmt.read_array(f,allow_pickle=True)
+    return res
+
+class FrozenGeoGraph(object):
+    """ immutable graph with nodes positions, stored in numpy arrays in
+    `compressed sparse row <https://en.wikipedia.org/wiki/Sparse_matrix>`_ format:
+    the neighbours of node i are indices[indptr[i]:indptr[i+1]]
+    at distances lengths[indptr[i]:indptr[i+1]].
+    Undirected edges are stored in both directions.
+
+    much more compact and faster than :class:`GeoGraph` for large graphs that do not change.
+    Nodes are identified by their positions, like in GeoGraph, or by their original ids if they differ
+    """
+    def __init__(self, indptr, indices, length, pos, directed=False, tol=0, ids=None, name='', multi=True):
+        """
+        :param indptr: int array of n+1 offsets in indices of the neighbours of each node
+        :param indices: int array of neighbours
+        :param length: float array of edges lengths, sorted by increasing length for each neighbour
+        :param pos: (n,dim) float array of nodes positions
+        :param directed: bool True if edges are oriented from node i to its neighbours
+        :param tol: float tolerance on node positions
+        :param ids: optional list of node ids, if they are not the positions
+        :param name: string name of the graph
+        :param multi: bool True if the graph it was frozen from allowed multiple edges
+        """
+        self.indptr=indptr
+        self.indices=indices
+        self.lengths=length
+        self.pos=pos
+        self.directed=bool(directed)
+        self.tol=float(tol)
+        self.ids=None if ids is None else list(ids)
+        self.name=name
+        self.multi=bool(multi)
+        self._index=None # dict of node ids, built if needed
+        self._kdtree=None # of nodes positions, built if needed
+        self._matrix=None # sparse matrix for scipy.sparse.csgraph, built if needed
+
+    def save(self, filename):
+        """ save graph to a .npz file, which can be loaded memory-mapped"""
+        import numpy
+        arrays=dict(indptr=self.indptr,indices=self.indices,length=self.lengths,pos=self.pos,
+            directed=self.directed,tol=self.tol,name=self.name,multi=self.multi)
+        if self.ids is not None:
+            arrays['ids']=numpy.array(self.ids+[None],dtype=object)[:-1] # keeps tuples as objects
+        numpy.savez(filename,**arrays) # uncompressed, so it can be memory-mapped
+
+    @classmethod
+    def load(cls, filename, mmap=True):
+        """
+        :param filename: .npz file written by :meth:`save`
+        :param mmap: bool if True, arrays are memory-mapped rather than read,
+          so loading is immediate and memory is shared between processes
+        :return: FrozenGeoGraph
+        """
+        import numpy
+        if mmap:
+            a=_load_npz(filename)
+        else:
+            a=numpy.load(filename,allow_pickle=True)
+        ids=a['ids'].tolist() if 'ids' in a else None
+        multi=bool(a['multi']) if 'multi' in a else True # files saved before multi was stored
+        return cls(a['indptr'],a['indices'],a['length'],a['pos'],
+            bool(a['directed']),float(a['tol']),ids,str(a['name']),multi)
+
+    def edges_arrays(self):
+        """
+        :return: (m,2) int array of indices of the ends of edges, (m,) float array of their lengths.
+          undirected edges appear once
+        """
+        import numpy
+        rows=numpy.repeat(numpy.arange(len(self.pos)),numpy.diff(self.indptr))
+        keep=slice(None) if self.directed else rows<=self.indices
+        return numpy.stack((rows[keep],self.indices[keep]),axis=1),self.lengths[keep]
+
+    def thaw(self):
+        """
+        :return: :class:`GeoGraph` or :class:`DiGraph` mutable copy of graph
+        """
+        edges,lengths=self.edges_arrays()
+        cls=DiGraph if self.directed else GeoGraph
+        kwargs={'name':self.name} if self.name else {} # no empty name in graph attributes
+        return cls.from_arrays(self.pos,edges,lengths=lengths,ids=self.ids,tol=self.tol,multi=self.multi,**kwargs)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def number_of_nodes(self):
+        return len(self.pos)
+
+    def _selfloops(self):
+        """:return: bool array of edges from a node to itself"""
+        import numpy
+        rows=numpy.repeat(numpy.arange(len(self.pos)),numpy.diff(self.indptr))
+        return self.indices==rows
+
+    def number_of_edges(self):
+        if self.directed:
+            return len(self.indices)
+        return (len(self.indices)+int(self._selfloops().sum()))//2
+
+    def is_directed(self):
+        return self.directed
+
+    def node(self, i):
+        """:return: id of node at index i"""
+        if self.ids is not None:
+            return self.ids[i]
+        return tuple(self.pos[i].tolist())
+
+    def nodes(self):
+        """:return: iterator over nodes ids"""
+        return (self.node(i) for i in range(len(self.pos)))
+
+    __iter__=nodes
+
+    def index(self, node):
+        """:return: int index of node"""
+        if self.ids is not None:
+            if self._index is None:
+                self._index=dict((n,i) for i,n in enumerate(self.ids))
+            return self._index[node]
+        d,i=self.kdtree().query(node)
+        if d>0:
+            raise KeyError(node)
+        return int(i)
+
+    def __contains__(self, node):
+        try:
+            self.index(node)
+            return True
+        except (KeyError,ValueError,TypeError):
+            return False
+
+    def neighbors(self, node):
+        """:return: iterator over the neighbours of node (successors if directed)"""
+        i=self.index(node)
+        return (self.node(j) for j in self.indices[self.indptr[i]:self.indptr[i+1]].tolist())
+
+    def degree(self, node):
+        i=self.index(node)
+        return int(self.indptr[i+1]-self.indptr[i])
+
+    def kdtree(self):
+        """:return: :class:`scipy.spatial.cKDTree` of nodes positions"""
+        if self._kdtree is None:
+            self._kdtree=scipy.spatial.cKDTree(self.pos)
+        return self._kdtree
+
+    def closest_nodes(self,p,n=1,skip=False):
+        """
+        nodes closest to a given position
+        :param p: (x,y) position tuple
+        :param skip: optional bool to skip nodes within tol of p
+        :return: list of nodes, minimal distance
+        """
+        k=n+1 if skip else n
+        d,i=self.kdtree().query(p,k=min(k,len(self.pos)))
+        res,dist=[],None
+        for d,i in zip(numpy.atleast_1d(d).tolist(),numpy.atleast_1d(i).tolist()):
+            if skip and d<=self.tol:
+                continue
+            res.append(self.node(i))
+            dist=d
+        return res[:n],dist
+
+    def box(self):
+        """:return: nodes bounding box as (xmin,ymin,...),(xmax,ymax,...)"""
+        return tuple(self.pos.min(axis=0).tolist()),tuple(self.pos.max(axis=0).tolist())
+
+    def box_size(self):
+        """:return: (x,y) size"""
+        a,b=self.box()
+        return tuple(math2.vecsub(b,a))
+
+    def length(self):
+        """:return: float sum of edges lengths"""
+        res=float(self.lengths.sum())
+        if not self.directed: # edges are stored twice, except loops
+            res=(res+float(self.lengths[self._selfloops()].sum()))/2
+        return res
+
+    def matrix(self):
+        """:return: :class:`scipy.sparse.csr_matrix` of the shortest edge between nodes"""
+        if self._matrix is None:
+            import scipy.sparse
+            n=len(self.pos)
+            indptr,indices,length=self.indptr,self.indices,self.lengths
+            rows=numpy.repeat(numpy.arange(n),numpy.diff(indptr))
+            first=numpy.ones(len(indices),dtype=bool) # keep the first, shortest, of parallel edges
+            first[1:]=(indices[1:]!=indices[:-1])|(rows[1:]!=rows[:-1])
+            if not first.all():
+                indptr=numpy.zeros(n+1,dtype=numpy.int64)
+                numpy.cumsum(numpy.bincount(rows[first],minlength=n),out=indptr[1:])
+                indices,length=indices[first],length[first]
+            self._matrix=scipy.sparse.csr_matrix((length,indices,indptr),shape=(n,n))
+        return self._matrix
+
+    def connected_components(self):
+        """
+        :return: int number of (weakly) connected components, array of component of each node
+        """
+        from scipy.sparse.csgraph import connected_components
+        return connected_components(self.matrix(),directed=self.directed,connection='weak')
+
+    def stats(self):
+        """:return: dict of graph data, like :meth:`GeoGraph.stats`"""
+        res={}
+        res['name']=self.name
+        res['bbox']=self.box()
+        res['size']=self.box_size()
+        res['nodes']=self.number_of_nodes()
+        res['edges']=self.number_of_edges()
+        res['components']=self.connected_components()[0]
+        res['length']=self.length()
+        return res
+
+    def __str__(self):
+        return str(self.stats())
+
+    def _dijkstra(self, sources):
+        from scipy.sparse.csgraph import dijkstra
+        return dijkstra(self.matrix(),directed=True,indices=sources,return_predecessors=True)
+
+    def shortest_path(self, source, target):
+        """
+        :return: list of nodes of the shortest path from source to target, weighted by edges lengths
+        """
+        i,j=self.index(source),self.index(target)
+        dist,pred=self._dijkstra(i)
+        if numpy.isinf(dist[j]):
+            raise nx.NetworkXNoPath('node %s not reachable from %s'%(target,source))
+        res=[]
+        while j>=0: # -9999 for no predecessor
+            res.append(self.node(j))
+            j=pred[j]
+        return res[::-1]
+
+    def shortest_path_length(self, source, target=None):
+        """
+        :return: float length of shortest path from source to target,
+          or dict of lengths of shortest paths to all reachable nodes
+        """
+        dist=self._dijkstra(self.index(source))[0]
+        if target is None:
+            return dict((self.node(i),d) for i,d in enumerate(dist.tolist()) if d<numpy.inf)
+        d=dist[self.index(target)]
+        if numpy.isinf(d):
+            raise nx.NetworkXNoPath('node %s not reachable from %s'%(target,source))
+        return float(d)
+
+    def distance_matrix(self, sources, targets=None):
+        """
+        :param sources: iterable of nodes
+        :param targets: iterable of nodes, sources if None
+        :return: numpy (len(sources),len(targets)) array of lengths of shortest paths, inf where there is no path
+        """
+        sources=[self.index(n) for n in sources]
+        targets=sources if targets is None else [self.index(n) for n in targets]
+        dist=self._dijkstra(sources)[0]
+        return dist[:,targets]
+
 def figure(g, box=None,**kwargs):
     """
     :param g: _Geo derived Graph
@@ -737,65 +1394,137 @@ def write_dxf(g,filename):
     """writes :class:`networkx.Graph` in .dxf format"""
     to_drawing(g).save(filename)
 
+def _edges(g):
+    """ iterates over edges of any networkx graph without building a list
+    :return: iterator over (u,v,key,data) tuples. key is None if g has no multiedges
+    """
+    multi=isinstance(g,nx.MultiGraph) # adjacency of _Geo graphs are always keydicts
+    seen=set()
+    for u,nbrs in six.iteritems(g.adj):
+        for v,data in six.iteritems(nbrs):
+            if v in seen:
+                continue
+            if multi:
+                for k,d in six.iteritems(data):
+                    yield u,v,k,d
+            else:
+                yield u,v,None,data
+        if not g.is_directed():
+            seen.add(u)
+
+_dot_plain=re.compile(r'^([A-Za-z_][A-Za-z_0-9]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?))$')
+
+def _dot_id(x):
+    """:return: string x as a DOT identifier, quoted only if needed"""
+    x=str(x)
+    if _dot_plain.match(x):
+        return x
+    return '"%s"'%x.replace('"','\\"')
+
+def _dot_attrs(d):
+    """:return: string DOT attributes list of dict d"""
+    if not d:
+        return ''
+    return ' [%s]'%', '.join('%s=%s'%(_dot_id(k),_dot_id(v)) for k,v in six.iteritems(d))
+
 def write_dot(g,filename):
+    """writes :class:`networkx.Graph` in Graphviz .dot format.
+    nodes and edges are streamed to the file, without pygraphviz or pydot
+    :param filename: string or file object
+    """
+    if isinstance(filename,six.string_types):
+        with open(filename,'w') as f:
+            return write_dot(g,f)
+    f=filename
+    directed=g.is_directed()
+    f.write('%s%sgraph %s {\n'%(
+        '' if g.is_multigraph() else 'strict ',
+        'di' if directed else '',
+        _dot_id(g.graph.get('name',''))
+    ))
+    for k,v in six.iteritems(g.graph):
+        if k!='name':
+            f.write('%s=%s\n'%(_dot_id(k),_dot_id(v)))
+    geo=isinstance(g,_Geo)
+    for n,d in six.iteritems(g.node):
+        d=dict(d)
+        if geo:
+            d.pop('key',None) # rtree key
+            pos=g.pos(n)
+        else:
+            pos=d.get('pos',None)
+        if pos is not None and not isinstance(pos,six.string_types):
+            d['pos']=','.join(map(str,pos)) # format pos as neato wants it : "x,y"
+        f.write('%s%s\n'%(_dot_id(n),_dot_attrs(d)))
+    arrow='->' if directed else '--'
+    for u,v,_,d in _edges(g):
+        f.write('%s %s %s%s\n'%(_dot_id(u),arrow,_dot_id(v),_dot_attrs(d)))
+    f.write('}\n') # no ';' after statements, otherwise pydot reads '\\n' nodes
+
+def _json_serial(obj):
+    """JSON serializer for objects not serializable by default json code"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
     try:
-        import pygraphviz
-        from networkx.drawing.nx_agraph import write_dot as _write_dot
-        logging.info("using package pygraphviz")
-    except ImportError:
-        try:
-            import pydot
-            from networkx.drawing.nx_pydot import write_dot as _write_dot
-            logging.info("using package pydot")
-        except ImportError:
-            logging.error("Both pygraphviz and pydot were not found. See \
-                http://networkx.github.io/documentation/latest/reference/drawing.html \
-                for info")
-            raise
-
-    if isinstance(g, _Geo) or any(map(lambda n:hasattr(n,'pos'),g.nodes())):
-        g=g.copy()
-
-    for n in g.nodes(data=True):
-        try:
-            pos=g.pos(n[0])
-        except AttributeError:
-            pos=n[1].get('pos',None)
-        if pos is not None: # format pos as neato wants it : "x,y"
-            n[1]['pos']='"%s,%s"'%pos
+        return str(obj)
+    except Exception:
+        pass
+    raise TypeError ("Type %s not serializable"%(type(obj)))
 
-    _write_dot(g,filename)
+def _json_chunks(g, **kwargs):
+    """ JSON representation of a graph in networkx node_link format, generated node by node
+    and edge by edge, so that large graphs are never entirely held in memory
+    :param kwargs: passed to :class:`json.JSONEncoder`
+    :return: iterator over strings
+    """
+    kwargs.setdefault('default',_json_serial)
+    encoder=json.JSONEncoder(**kwargs)
+    sep=encoder.item_separator
+    def key(name):
+        return encoder.encode(name)+encoder.key_separator
+    multigraph=g.is_multigraph()
+    yield '{'+key('directed')+encoder.encode(g.is_directed())+sep
+    yield key('multigraph')+encoder.encode(multigraph)+sep
+    yield key('graph')+encoder.encode(g.graph)+sep
+    yield key('nodes')+'['
+    index={} # node id to rank, as links refer to nodes by their rank
+    for i,(n,d) in enumerate(six.iteritems(g.node)):
+        index[n]=i
+        d=dict(d)
+        d['id']=n
+        pos=d.pop('pos',None)
+        if pos:
+            d['x']=pos[0]
+            d['y']=pos[1]
+        yield (sep if i else '')+encoder.encode(d)
+    yield ']'+sep+key('links')+'['
+    for i,(u,v,k,d) in enumerate(_edges(g)):
+        d=dict(d)
+        d['source']=index[u]
+        d['target']=index[v]
+        if multigraph:
+            d['key']=k
+        yield (sep if i else '')+encoder.encode(d)
+    yield ']}'
 
 def to_json(g, **kwargs):
     """
+    :param kwargs: passed to :class:`json.JSONEncoder`
     :return: string JSON representation of a graph
     """
-    from datetime import datetime, date, time, timedelta
-    def json_serial(obj):
-        """JSON serializer for objects not serializable by default json code"""
-        if hasattr(obj, 'isoformat'):
-            return obj.isoformat()
-        try:
-            return str(obj)
-        except Exception:
-            pass
-        raise TypeError ("Type %s not serializable"%(type(obj)))
-    from networkx.readwrite import json_graph
-    g=json_graph.node_link_data(g)
-    for node in g['nodes']:
-        pos=node.pop('pos',None)
-        if pos:
-            node['x']=pos[0]
-            node['y']=pos[1]
-            #node['fixed']=True
-    kwargs.setdefault('default',json_serial)
-    return json.dumps(g, **kwargs)
+    return ''.join(_json_chunks(g,**kwargs))
 
 def write_json(g,filename, **kwargs):
-    """write a JSON file, suitable for D*.js representation
+    """write a JSON file, suitable for D*.js representation.
+    nodes and edges are streamed to the file
+    :param filename: string or file object
+    :param kwargs: passed to :class:`json.JSONEncoder`
     """
-    with open(filename, 'w') as file:
-        file.write(to_json(g,**kwargs))
+    if isinstance(filename,six.string_types):
+        with open(filename,'w') as f:
+            return write_json(g,f,**kwargs)
+    for chunk in _json_chunks(g,**kwargs):
+        filename.write(chunk)
 
 
 def delauney_triangulation(nodes, qhull_options='', incremental=False, **kwargs):
@@ -817,7 +1546,9 @@ def delauney_triangulation(nodes, qhull_options='', incremental=False, **kwargs)
     points=numpy.array(nodes)
     tri = scipy.spatial.Delaunay(points, qhull_options=qhull_options, incremental=incremental)
     kwargs['multi']=False #to avoid duplicating triangle edges below
-    g=GeoGraph(tri,dimension=tri.ndim,**kwargs)
+    edges=tri.simplices[:,[0,1,1,2,2,0]].reshape(-1,2) # same edges as to_networkx_graph(tri)
+    g=GeoGraph.from_arrays(tri.points,edges,dimension=tri.ndim,**kwargs)
+    g.delauney=tri
     return g
 
 def euclidean_minimum_spanning_tree(nodes,**kwargs):
@@ -1255,7 +1255,7 @@ def convert(a,source,target,**kwargs):
     source,target=modes[source.upper()],modes[target.upper()]
     a=np.clip(a, source.min, source.max, out=a)
     try:
-        path=converters.shortest_path(source.name, target.name)
+        path=nx.shortest_path(converters, source.name, target.name) # fewest conversions
     except nx.exception.NetworkXError:
         raise NotImplementedError(
             'no conversion between %s and %s modes'
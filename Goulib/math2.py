@@ -14,7 +14,9 @@ __credits__ = [
     ]
 __license__ = "LGPL"
 
-import six, math, cmath, operator, itertools, fractions, numbers, logging
+import six, math, cmath, operator, itertools, fractions, numbers, logging, array
+from bisect import bisect_right
+from collections import OrderedDict
 from six.moves import map, reduce, filter, zip_longest
 
 from Goulib import itertools2
@@ -22,6 +24,11 @@ from Goulib import itertools2
 
 inf=float('Inf') #infinity
 
+try: # fast 2 args gcd
+    _gcd=math.gcd
+except AttributeError: # Python 2
+    _gcd=fractions.gcd
+
 def is_number(x):
     """:return: True if x is a number of any type"""
     # http://stackoverflow.com/questions/4187185/how-can-i-check-if-my-python-object-is-a-number
@@ -624,7 +631,39 @@ def proper_divisors(n):
     """:return: all divisors of n except n itself."""
     return (divisor for divisor in divisors(n) if divisor != n)
 
-_sieve=list() # array of bool indicating primality
+# segmented sieve of Eratosthenes over odd numbers only :
+# _sieve[i] is 1 if 2*i+1 is prime, so it covers all integers < 2*len(_sieve)
+_sieve=bytearray([0,1]) # 1 is not prime, 3 is
+_sieve_segment=1<<17 # number of odd integers sieved at once (fits in L2 cache)
+_sieve_max=1<<25 # primes_gen doesn't grow the sieve beyond this
+
+def _sieve_extend(n):
+    """extends the sieve so that it covers all integers < n
+
+    new segments are sieved with the primes already known,
+    existing ones are never recomputed
+    """
+    hi=n//2 # number of odd integers < n
+    lo=len(_sieve)
+    if hi<=lo:
+        return
+    r=isqrt(2*hi-1) # largest possible factor of a composite in the new part
+    if r//2>=lo: # make sure all prime factors up to r are known
+        _sieve_extend(r+1)
+        lo=len(_sieve)
+    while lo<hi:
+        top=min(lo+_sieve_segment,hi)
+        seg=bytearray(b'\x01')*(top-lo)
+        m=isqrt(2*top-1)//2+1 # index of largest possible prime factor +1
+        for i in itertools.compress(range(1,m),_sieve[1:m]):
+            p=2*i+1
+            j=(p*p)//2 # index of p*p
+            if j<lo: # first odd multiple of p in segment
+                j+=ceildiv(lo-j,p)*p
+            if j<top:
+                seg[j-lo::p]=bytes(ceildiv(top-j,p))
+        _sieve.extend(seg)
+        lo=top
 
 def sieve(n, oneisprime=False):
     """
@@ -635,90 +674,200 @@ def sieve(n, oneisprime=False):
     >>>prime_sieve(25)
     [2, 3, 5, 7, 11, 13, 17, 19, 23]
 
-    Algorithm & Python source: Robert William Hanks
-    http://stackoverflow.com/questions/17773352/python-sieve-prime-numbers
+    The sieve is kept as a compact bytearray of odd numbers
+    and is enlarged segment by segment when a larger n is requested.
     """
     if n<2: return []
     if n==2: return [1] if oneisprime else []
-    global _sieve
-    if n>len(_sieve): #recompute the sieve
-        #TODO: enlarge the sieve...
-        # http://stackoverflow.com/questions/2068372/fastest-way-to-list-all-primes-below-n-in-python/3035188#3035188
-        _sieve = [False,False,True,True]+[False,True] * ((n-4)//2)
-        assert(len(_sieve)==n)
-        for i in range(3,int(n**0.5)+1,2):
-            if _sieve[i]:
-                _sieve[i*i::2*i]=[False]*int((n-i*i-1)/(2*i)+1)
-    return ([1,2] if oneisprime else [2]) + [i for i in range(3,n,2) if _sieve[i]]
+    _sieve_extend(n)
+    odds=itertools.compress(range(3,n,2),_sieve[1:(n+1)//2])
+    return ([1,2] if oneisprime else [2]) + list(odds)
 
 _primes=sieve(1000) # primes up to 1000
-_primes_set = set(_primes) # to speed us primality tests below
 
 def primes(n):
     """memoized list of n first primes
 
     :warning: do not call with large n, use prime_gen instead
     """
-    m=n-len(_primes)
-    if m>0:
-        more=list(itertools2.take(m,primes_gen(_primes[-1]+1)))
-        _primes.extend(more)
-        _primes_set.union(set(more))
+    if n>len(_primes):
+        # upper bound of the n-th prime (Rosser's theorem) for n>=6
+        logn=math.log(n)
+        limit=int(n*(logn+math.log(logn)))+3
+        _primes[:]=sieve(limit)
 
     return _primes[:n]
 
+# ordered small primes for fast rejection of composites, then a single gcd
+# with the product of the remaining primes < 1000
+_small_primes=tuple(_primes[:25]) # primes < 100
+_small_primorial=mul(_primes[25:])
+
+# deterministic Miller-Rabin witnesses : all n < bound are correctly tested
+# https://oeis.org/A014233
+_mr_witnesses=(
+    (2047, (2,)),
+    (1373653, (2, 3)),
+    (25326001, (2, 3, 5)),
+    (3215031751, (2, 3, 5, 7)),
+    (2152302898747, (2, 3, 5, 7, 11)),
+    (3474749660383, (2, 3, 5, 7, 11, 13)),
+    (341550071728321, (2, 3, 5, 7, 11, 13, 17)),
+    (3825123056546413051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+    (1<<64, (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+)
+
+def _is_strong_prp(n, a, d, s):
+    """:return: True if n is a strong probable prime to base a, with n-1=d*2^s"""
+    x=pow(a,d,n)
+    if x==1 or x==n-1:
+        return True
+    for _ in range(s-1):
+        x=x*x%n # square instead of recomputing the power
+        if x==n-1:
+            return True
+    return False
+
+def jacobi(a, n):
+    """Jacobi symbol (a/n) for odd n>0
+
+    :return: int -1, 0 or 1
+    """
+    a%=n
+    res=1
+    while a:
+        while a%2==0:
+            a//=2
+            if n%8 in (3,5):
+                res=-res
+        a,n=n,a
+        if a%4==3 and n%4==3:
+            res=-res
+        a%=n
+    return res if n==1 else 0
+
+def _is_strong_lucas_prp(n):
+    """strong Lucas probable prime test with Selfridge's parameters
+
+    :param n: odd int, not a square
+    :see: https://en.wikipedia.org/wiki/Lucas_pseudoprime
+    """
+    D=5
+    while True:
+        j=jacobi(D,n)
+        if j==-1:
+            break
+        if j==0 and abs(D)!=n:
+            return False # D divides n
+        D=-D-2 if D>0 else -D+2
+    P,Q=1,(1-D)//4
+    d,s=n+1,0
+    while d%2==0:
+        d,s=d//2,s+1
+
+    def half(x): # x/2 mod n
+        return (x+n if x%2 else x)//2%n
+
+    U,V,Qk=1,P,Q%n # for k=1
+    for bit in bin(d)[3:]:
+        U,V,Qk=U*V%n,(V*V-2*Qk)%n,Qk*Qk%n # k -> 2k
+        if bit=='1': # k -> k+1
+            U,V=half(P*U+V),half(D*U+P*V)
+            Qk=Qk*Q%n
+    if U==0 or V==0:
+        return True
+    for _ in range(s-1):
+        V=(V*V-2*Qk)%n
+        if V==0:
+            return True
+        Qk=Qk*Qk%n
+    return False
+
+def _is_prime_large(n):
+    """primality test for odd n beyond the sieve"""
+    for p in _small_primes: # n is larger than all of them
+        if n%p==0:
+            return False
+    if _gcd(n,_small_primorial)!=1:
+        return False
+    d,s=n-1,0
+    while d%2==0:
+        d,s=d//2,s+1
+    for bound,witnesses in _mr_witnesses:
+        if n<bound:
+            return all(_is_strong_prp(n,a,d,s) for a in witnesses)
+    # Baillie-PSW : no known counterexample
+    if not _is_strong_prp(n,2,d,s):
+        return False
+    if is_square(n):
+        return False
+    return _is_strong_lucas_prp(n)
+
+_is_prime_cache=OrderedDict() # LRU cache of is_prime results beyond the sieve
+_is_prime_cache_size=0 # disabled by default
+
+def is_prime_cache(maxsize=1024):
+    """sets the size of the LRU cache of :func:`is_prime` results
+    for numbers too large for the sieve. Useful when the same large numbers
+    are tested repeatedly
+
+    :param maxsize: int max number of cached results. 0 disables (and clears) the cache
+    """
+    global _is_prime_cache_size
+    _is_prime_cache_size=maxsize
+    while len(_is_prime_cache)>maxsize:
+        _is_prime_cache.popitem(last=False)
+
 def is_prime(n, oneisprime=False, precision_for_huge_n=16):
-    """primality test. Uses Miller-Rabin for large n
+    """primality test.
+
+    * numbers in the sieve are looked up
+    * deterministic Miller-Rabin for n < 2^64
+    * Baillie-PSW test above
 
     :param n: int number to test
     :param oneisprime: bool True if 1 should be considered prime (it was, a long time ago)
-    :param precision_for_huge_n: int number of primes to use in Miller
+    :param precision_for_huge_n: ignored, kept for compatibility
     :return: True if n is a prime number"""
 
     if n <= 0: return False
     if n == 1: return oneisprime
-    if n<len(_sieve):
-        return _sieve[n]
-    if n in _primes_set:
-        return True
-    if any((n % p) == 0 for p in _primes_set):
+    if n<2*len(_sieve):
+        return n==2 or (n%2==1 and _sieve[n//2]==1)
+    if n%2==0:
         return False
+    if not _is_prime_cache_size:
+        return _is_prime_large(n)
+    try:
+        res=_is_prime_cache.pop(n)
+    except KeyError:
+        res=_is_prime_large(n)
+        if len(_is_prime_cache)>=_is_prime_cache_size:
+            _is_prime_cache.popitem(last=False)
+    _is_prime_cache[n]=res # most recently used
+    return res
 
-    # http://rosettacode.org/wiki/Miller-Rabin_primality_test#Python
+def is_prime_many(iterable, oneisprime=False):
+    """primality test of many numbers at once
 
-    d, s = n - 1, 0
-    while not d % 2:
-        d, s = d >> 1, s + 1
+    the sieve is first extended to cover the numbers it can,
+    so that most tests are simple lookups
 
-    def _try_composite(a, d, n, s):
-        # exact according to http://primes.utm.edu/prove/prove2_3.html
-        if pow(a, d, n) == 1:
-            return False
-        for i in range(s):
-            if pow(a, 2**i * d, n) == n-1:
-                return False
-        return True # n  is definitely composite
-
-    if n < 1373653:
-        return not any(_try_composite(a, d, n, s) for a in (2, 3))
-    if n < 25326001:
-        return not any(_try_composite(a, d, n, s) for a in (2, 3, 5))
-    if n < 118670087467:
-        if n == 3215031751:
-            return False
-        return not any(_try_composite(a, d, n, s) for a in (2, 3, 5, 7))
-    if n < 2152302898747:
-        return not any(_try_composite(a, d, n, s) for a in (2, 3, 5, 7, 11))
-    if n < 3474749660383:
-        return not any(_try_composite(a, d, n, s) for a in (2, 3, 5, 7, 11, 13))
-    if n < 341550071728321:
-        return not any(_try_composite(a, d, n, s) for a in (2, 3, 5, 7, 11, 13, 17))
-    # otherwise
-    return not any(_try_composite(a, d, n, s)
-        for a in _primes[:precision_for_huge_n])
+    :param iterable: of int numbers to test
+    :return: list of bool
+    """
+    nums=list(iterable)
+    small=[n for n in nums if n<=_sieve_max]
+    if small:
+        _sieve_extend(max(small)+1)
+    return [is_prime(n,oneisprime) for n in nums]
 
 def primes_gen(start=2,stop=None):
-    """generate prime numbers from 'start'"""
+    """generate prime numbers from 'start'
+
+    primes are read from the sieve, which grows by segments as needed
+    up to _sieve_max. Larger candidates are tested with :func:`is_prime`
+    """
     if start==1:
         yield 1 #if we asked for it explicitly
     if start<=2:
@@ -726,16 +875,35 @@ def primes_gen(start=2,stop=None):
     elif start%2==0:
         start+=1
 
-    if stop is None:
-        candidates=itertools.count(max(start,3),2)
-    elif stop>start:
-        candidates=itertools2.arange(max(start,3),stop+1,2)
-    else: #
-        candidates=itertools2.arange(start if start%2 else start-1,stop-1,-2)
+    if stop is None or stop>start:
+        n=max(start,3) # odd
+        limit=_sieve_max+1 if stop is None else min(stop+1,_sieve_max+1)
+        while stop is None or n<=stop:
+            i=n//2
+            if i>=len(_sieve):
+                if n>_sieve_max:
+                    break
+                _sieve_extend(min(2*(i+max(i,_sieve_segment)),limit))
+            end=len(_sieve) if stop is None else min(len(_sieve),(stop+1)//2)
+            for j in itertools.compress(range(i,end),_sieve[i:end]):
+                yield 2*j+1
+            n=2*end+1
+        else:
+            return
+        candidates=itertools.count(n,2) if stop is None else range(n,stop+1,2)
+    else: # descending
+        n=start if start%2 else start-1
+        if n<=_sieve_max:
+            _sieve_extend(n+1)
+            lo,hi=max(stop//2,1),n//2+1
+            for j in reversed(list(itertools.compress(range(lo,hi),_sieve[lo:hi]))):
+                yield 2*j+1
+            return
+        candidates=itertools2.arange(n,stop-1,-2)
     for n in candidates:
         if is_prime(n):
             yield n
-            
+
 def random_prime(bits):
     """returns a random number of the specified bit length"""
     import random
@@ -753,19 +921,97 @@ def euclid_gen():
         n = n * p
         yield n+1
 
+def pollard_brent(n):
+    """Brent's variant of Pollard's rho factorization algorithm
+
+    :param n: int composite number
+    :return: int a non trivial factor of n (not necessarily prime)
+    :see: https://maths-people.anu.edu.au/~brent/pd/rpb051i.pdf
+    """
+    if n%2==0: return 2
+    if n%3==0: return 3
+    m=128 # number of steps between gcd computations
+    for c in itertools.count(1): # deterministic sequence of polynomials x^2+c
+        y,r,q,g=2,1,1,1
+        while g==1:
+            x=y
+            for _ in range(r):
+                y=(y*y+c)%n
+            k=0
+            while k<r and g==1:
+                ys=y
+                for _ in range(min(m,r-k)):
+                    y=(y*y+c)%n
+                    q=q*abs(x-y)%n
+                g=_gcd(q,n)
+                k+=m
+            r*=2
+        if g==n: # backtrack step by step
+            g=1
+            while g==1:
+                ys=(ys*ys+c)%n
+                g=_gcd(abs(x-ys),n)
+        if g!=n:
+            return g
+        # failed, try another c
+
+def _factor_rho(n):
+    """:return: list of prime factors of n>1, unordered"""
+    if is_prime(n):
+        return [n]
+    d=pollard_brent(n)
+    return _factor_rho(d)+_factor_rho(n//d)
+
+_spf=array.array('l') # smallest prime factor table, see spf_sieve
+_trial_division_max=4096 # primes tried before switching to Pollard-Brent
+
+def spf_sieve(n):
+    """builds the table of smallest prime factors of all integers < n
+
+    once built, :func:`prime_factors` (and all functions using it)
+    factorize numbers < n by table lookup.
+    Use it before factorizing many numbers in a range
+
+    :param n: int size of the table
+    :return: array of int. spf[0]=0, spf[1]=1, spf[i]=smallest prime factor of i
+    """
+    global _spf
+    if n>len(_spf):
+        spf=array.array('l',range(n))
+        spf[4::2]=array.array('l',[2])*len(range(4,n,2))
+        # largest primes first, so that smaller ones overwrite them
+        for p in reversed(sieve(isqrt(n-1)+1)[1:]):
+            spf[p*p::2*p]=array.array('l',[p])*len(range(p*p,n,2*p))
+        _spf=spf
+    return _spf
+
 def prime_factors(num, start=2):
-    """generates all prime factors (ordered) of num"""
-    for p in primes_gen(start):
-        if num==1:
-            break
-        if is_prime(num): #because it's fast
-            yield num
-            break
-        if p>num:
-            break
-        while num % p==0:
+    """generates all prime factors (ordered) of num
+
+    uses the :func:`spf_sieve` table if num is in it,
+    otherwise trial division by small primes, then Pollard-Brent for the
+    remaining cofactor, with Miller-Rabin checks through :func:`is_prime`
+
+    :param num: int number to factorize
+    :param start: int smallest prime to try, when num is known to have no smaller factor
+    """
+    if num<len(_spf):
+        while num>1:
+            p=_spf[num]
+            yield p
+            num//=p
+        return
+    start=max(start,2)
+    if start<=_trial_division_max:
+        for p in primes_gen(start,_trial_division_max):
+            if p*p>num:
+                break
+            while num%p==0:
+                yield p
+                num=num//p
+    if num>1:
+        for p in sorted(_factor_rho(num)):
             yield p
-            num=num//p
 
 def factorize(n):
     """find the prime factors of n along with their frequencies. Example:
@@ -821,6 +1067,111 @@ def euler_phi(n):
 
 totient=euler_phi #alias. totient is available in sympy
 
+# vectorized versions over range(N), using numpy
+# they all sieve with one numpy operation per prime p<=sqrt(N),
+# then handle all primes p>sqrt(N) together with one operation per cofactor k<sqrt(N),
+# since such p divides n<N at most once, and is its only factor >sqrt(N)
+
+def _sieve_range(N, small, large):
+    """applies a sieve over range(N)
+
+    :param N: int size of the range
+    :param small: function(p) called for each prime p<=sqrt(N-1)
+    :param large: function(idx,P) called with arrays of multiples idx=k*P
+      of all primes P>sqrt(N-1), for k=1,2,...
+    """
+    if N<3: # no primes
+        return
+    import numpy as np
+    r=isqrt(N-1)
+    p=sieve(N)
+    for q in itertools.takewhile(lambda q:q<=r,p):
+        small(q)
+    P=np.array(p[bisect_right(p,r):],dtype=np.int64)
+    for k in range(1,ceildiv(N,r+1)):
+        Pk=P[:np.searchsorted(P,ceildiv(N,k))] # primes with k*p<N
+        if len(Pk)==0:
+            break
+        large(k*Pk,Pk)
+
+def is_prime_range(N):
+    """:return: numpy array of bool, True at index n if n is prime, for n in range(N)"""
+    import numpy as np
+    res=np.zeros(N,dtype=bool)
+    if N>2:
+        _sieve_extend(N)
+        odd=np.frombuffer(bytes(_sieve[:N//2]),dtype=np.uint8)
+        res[1::2]=odd!=0
+        res[2]=True
+    return res
+
+def euler_phi_range(N):
+    """:return: numpy array of :func:`euler_phi` (n) for n in range(N)"""
+    import numpy as np
+    res=np.arange(N,dtype=np.int64)
+    def small(p):
+        res[p::p]-=res[p::p]//p
+    def large(idx,P):
+        res[idx]-=res[idx]//P
+    _sieve_range(N,small,large)
+    return res
+
+totient_range=euler_phi_range
+
+def moebius_range(N):
+    """:return: numpy array of :func:`moebius` (n) for n in range(N)"""
+    import numpy as np
+    res=np.ones(N,dtype=np.int64)
+    def small(p):
+        res[p::p]*=-1
+        res[p*p::p*p]=0
+    def large(idx,P):
+        res[idx]*=-1
+    _sieve_range(N,small,large)
+    res[:1]=0
+    return res
+
+def number_of_divisors_range(N):
+    """:return: numpy array of :func:`number_of_divisors` (n) for n in range(N)"""
+    import numpy as np
+    res=np.ones(N,dtype=np.int64)
+    def small(p):
+        q,e=p,1
+        while q<N: # multiply by e+1 where e is the exponent of p
+            res[q::q]//=e
+            res[q::q]*=e+1
+            q,e=q*p,e+1
+    def large(idx,P):
+        res[idx]*=2
+    _sieve_range(N,small,large)
+    res[:1]=0
+    return res
+
+def omega_range(N):
+    """:return: numpy array of :func:`omega` (n) for n in range(N)"""
+    import numpy as np
+    res=np.zeros(N,dtype=np.int64)
+    def small(p):
+        res[p::p]+=1
+    def large(idx,P):
+        res[idx]+=1
+    _sieve_range(N,small,large)
+    return res
+
+def bigomega_range(N):
+    """:return: numpy array of :func:`bigomega` (n) for n in range(N)"""
+    import numpy as np
+    res=np.zeros(N,dtype=np.int64)
+    def small(p):
+        q=p
+        while q<N:
+            res[q::q]+=1
+            q*=p
+    def large(idx,P):
+        res[idx]+=1
+    _sieve_range(N,small,large)
+    return res
+
 def prime_ktuple(constellation):
     """
     generates tuples of primes with specified differences
@@ -930,6 +1281,16 @@ def digsum(num, base=10, f=None):
     d=[f(x,i) for i,x in enumerate(d)]
     return sum(d)
 
+def digsum_range(N, base=10):
+    """:return: numpy array of :func:`digsum` (n,base) for n in range(N)"""
+    import numpy as np
+    n=np.arange(N,dtype=np.int64)
+    res=np.zeros(N,dtype=np.int64)
+    while n.any():
+        res+=n%base
+        n//=base
+    return res
+
 def integer_exponent(a,b=10):
     """
     :returns: int highest power of b that divides a.
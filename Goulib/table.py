@@ -12,10 +12,15 @@ __license__ = "LGPL"
 import six, logging
 from six.moves import html_parser, reduce
 
-import csv, itertools, codecs, json, collections
+import csv, itertools, codecs, json, collections, operator
 
 import datetime as std_datetime
 
+try: # needed only for ColumnTable
+    import numpy as np
+except ImportError:
+    np=None
+
 try: # using http://lxml.de/
     from lxml import etree as ElementTree
     defaultparser=ElementTree.HTMLParser
@@ -210,6 +215,49 @@ class Row(object):
             res+=cell.html(**cell_args)
         return tag('tr',res,**kwargs)
     
+def _read_float(x):
+    """same as :meth:`Cell.read` for strings representing numbers"""
+    x=float(x)
+    return int(x) if x.is_integer() else x
+
+def _read_str(x):
+    """same as :meth:`Cell.read`, but fast for strings that cannot be numbers"""
+    c=x[0]
+    if c.isdigit() or c.isspace() or c in '+-.iInN': # could be a number, inf or nan
+        return Cell.read(x)
+    return x
+
+def _read_func(x):
+    """:return: function converting strings like x, faster than :meth:`Cell.read`"""
+    for f in (int,_read_float):
+        try:
+            f(x)
+            return f
+        except ValueError:
+            pass
+    return _read_str
+
+def _csv_reader(filename, **kwargs):
+    """generates rows of a .csv file as lists of strings
+
+    :param encoding: string, default 'utf-8'
+    :param errors: string, default 'strict'
+    :param kwargs: other parameters are passed to :func:`csv.reader`
+    """
+    encoding=kwargs.pop('encoding','utf-8') #must be iso-8859-15 in some cases
+    errors=kwargs.pop('errors','strict')
+    if six.PY2:
+        with codecs.open(filename, 'rb', errors=errors) as f:
+            for row in csv.reader(f, **kwargs):
+                yield [unicode(cell, encoding) for cell in row]
+    else:
+        with open(filename, 'rt', errors=errors, encoding=encoding) as f:
+            for row in csv.reader(f, **kwargs):
+                yield row
+
+
+_missing=object() # sentinel for index updates
+
 class Table(list):
     """Table class with CSV I/O, easy access to columns, HTML output"""
     def __init__(self,data=[],**kwargs):
@@ -218,6 +266,7 @@ class Table(list):
         :param titles: optional list of strings used as column id
         :param footer: optional list of functions used as column reducers
         """
+        self._indexes={} # column:(kind,data) see create_index
         try:
             self.titles=data.titles
         except:
@@ -242,6 +291,58 @@ class Table(list):
         if filename:
             self.load(filename,**kwargs)
             
+    def __getstate__(self): # indexes are rebuilt when needed, not copied nor pickled
+        state=self.__dict__.copy()
+        state['_indexes']=dict((i,(kind,None)) for i,(kind,_) in self._indexes.items())
+        return state
+
+    def __reduce__(self): # rows are passed to __init__, as pickle would add them before the state
+        return (self.__class__,(list(self),),self.__getstate__())
+
+    # list methods that change rows invalidate indexes
+
+    def __setitem__(self,i,value):
+        self._invalidate()
+        super(Table,self).__setitem__(i,value)
+
+    def __delitem__(self,i):
+        self._invalidate()
+        super(Table,self).__delitem__(i)
+
+    def insert(self,i,line):
+        self._invalidate()
+        super(Table,self).insert(i,line)
+
+    def pop(self,i=-1):
+        self._invalidate()
+        return super(Table,self).pop(i)
+
+    def remove(self,line):
+        self._invalidate()
+        super(Table,self).remove(line)
+
+    def reverse(self):
+        self._invalidate()
+        super(Table,self).reverse()
+
+    def clear(self):
+        self._invalidate()
+        del self[:]
+
+    def __imul__(self,n):
+        self._invalidate()
+        return super(Table,self).__imul__(n)
+
+    def __iadd__(self,lines):
+        self.extend(lines)
+        return self
+
+    def extend(self,lines):
+        n=len(self)
+        super(Table,self).extend(lines)
+        for r in range(n,len(self)):
+            self._index_add(r)
+
     def __repr__(self):
         """:return: repr string of titles+5 first lines"""
         return 'Table(len=%d,titles=%s,data=%s)'%(len(self),self.titles,self[:5])
@@ -406,25 +507,10 @@ class Table(list):
         titles_line=kwargs.pop('titles_line',1)-1
         data_line=kwargs.pop('data_line',2)-1
         
-        dialect=kwargs.setdefault('dialect',csv.excel)
-        delimiter=kwargs.setdefault('delimiter',';')
-        encoding=kwargs.pop('encoding','utf-8') #must be iso-8859-15 in some cases
-        errors=kwargs.pop('errors','strict')
-        
-        def csv_reader2(): # version for Python 2
-            with codecs.open(filename, 'rb', errors=errors) as f:
-                csv_reader = csv.reader(f, **kwargs)
-                for row in csv_reader:
-                    yield [unicode(cell, encoding) for cell in row]
-        
-        def csv_reader3():  # version for Python 3
-            with open(filename, 'rt', errors=errors, encoding=encoding) as f:
-                csv_reader = csv.reader(f, **kwargs)
-                for row in csv_reader:
-                    yield row
-        
-        reader = csv_reader2() if six.PY2 else csv_reader3()
-        
+        kwargs.setdefault('dialect',csv.excel)
+        kwargs.setdefault('delimiter',';')
+        reader=_csv_reader(filename,**kwargs)
+
         for i,row in enumerate(reader):
             if i==titles_line: #titles can have no left/right spaces
                 self.titles=[Cell.read(x) for x in row]
@@ -434,6 +520,76 @@ class Table(list):
                     self.append(line)
         return self
     
+    @classmethod
+    def iter_csv(cls, filename, chunksize=10000, usecols=None, where=None, **kwargs):
+        """reads a .csv or similar file by chunks, in bounded memory
+
+        the type of each column is inferred once from its first value,
+        which avoids calling :meth:`Cell.read` on each cell of numeric columns
+
+        :param filename: string path of the file
+        :param chunksize: int max number of rows of each chunk
+        :param usecols: optional list of column titles or indexes to read
+        :param where: optional function of the form lambda line:bool
+          returning True if the (projected) line should be kept
+        :param kwargs: same as :meth:`read_csv`
+        :yield: Table (or subclass) of at most chunksize lines
+        """
+        titles_line=kwargs.pop('titles_line',1)-1
+        data_line=kwargs.pop('data_line',2)-1
+        titles=kwargs.pop('titles',[])
+        kwargs.setdefault('dialect',csv.excel)
+        kwargs.setdefault('delimiter',';')
+
+        def _table(lines):
+            res=cls(titles=list(titles))
+            res.extend(lines) # much faster than append
+            return res
+
+        cols=None # indexes of the columns to read, if usecols
+        convs=[] # conversion function of each column, None until known
+        chunk=[]
+        for i,row in enumerate(_csv_reader(filename,**kwargs)):
+            if i==titles_line: #titles can have no left/right spaces
+                titles=[Cell.read(x) for x in row]
+                continue
+            if i<data_line:
+                continue
+            if usecols is None: # all columns, as in read_csv
+                convs.extend([None]*(len(row)-len(convs)))
+            else:
+                if cols is None:
+                    cols=[c if isinstance(c,six.integer_types) else titles.index(c) for c in usecols]
+                    titles=[titles[j] if j<len(titles) else None for j in cols]
+                    convs=[None]*len(cols)
+                row=[row[j] if j<len(row) else '' for j in cols]
+            try: # fast path once all column types are known
+                line=[None if x=='' else f(x) for f,x in zip(convs,row)]
+            except (TypeError,ValueError): # unknown or changed type
+                line=[]
+                for k,x in enumerate(row):
+                    if x=='':
+                        line.append(None)
+                        continue
+                    f=convs[k]
+                    if f is None:
+                        f=convs[k]=_read_func(x)
+                    try:
+                        line.append(f(x))
+                    except ValueError: # use the general case from now on
+                        f=convs[k]=_read_str
+                        line.append(f(x))
+            if line==[None]: #strange last line sometimes ...
+                continue
+            if where is not None and not where(line):
+                continue
+            chunk.append(line)
+            if len(chunk)>=chunksize:
+                yield _table(chunk)
+                chunk=[]
+        if chunk:
+            yield _table(chunk)
+
     def save(self,filename,**kwargs):
         ext=filename.split('.')[-1].lower()
         if ext in ('xls','xlsx'):
@@ -534,7 +690,7 @@ class Table(list):
         """
         :return: number of columns, ignoring title
         """
-        return reduce(max,list(map(len,self)))
+        return reduce(max,map(len,self),0)
                 
     def find_col(self,title):
         """finds a column from a part of the title"""
@@ -591,11 +747,148 @@ class Table(list):
         """
         :return: int row number of first line where column contains value
         """
-        for i,v in enumerate(self.icol(column)):
-            if v==value:
-                return i
-        return None
-    
+        rows=self.lookup(value,column)
+        return min(rows) if rows else None
+
+    def create_index(self,column,kind='hash'):
+        """creates a persistent index on a column, to speed up lookups and joins
+
+        indexes are updated by :meth:`append`, :meth:`set` and :meth:`setcol`,
+        other changes to the table invalidate them so they are rebuilt when needed,
+        except changes made directly in a row, like t[0][0]=v : call :meth:`drop_index`
+        or use :meth:`set` instead
+        :param column: column name or number
+        :param kind: 'hash' for equality lookups (values must be hashable)
+          or 'sorted' for equality and range lookups (None values are not indexed)
+        """
+        if kind not in ('hash','sorted'):
+            raise ValueError("kind must be 'hash' or 'sorted', not %r"%kind)
+        self._indexes[self._i(column)]=(kind,None)
+        return self
+
+    def drop_index(self,column=None):
+        """removes the index on column, or all indexes if column is None"""
+        if column is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(self._i(column),None)
+
+    def _invalidate(self):
+        """marks all indexes for rebuild after an unspecified change"""
+        for i,(kind,_) in self._indexes.items():
+            self._indexes[i]=(kind,None)
+
+    def _index(self,i):
+        """:return: kind,data of up to date index on column i, or None,None"""
+        kind,data=self._indexes.get(i,(None,None))
+        if kind is not None and data is None:
+            if kind=='hash':
+                data={}
+                for r,v in enumerate(self.icol(i)):
+                    data.setdefault(v,[]).append(r)
+            else:
+                from .container import SortedCollection
+                data=SortedCollection(sorted((v,r) for r,v in enumerate(self.icol(i)) if v is not None),
+                    key=operator.itemgetter(0))
+            self._indexes[i]=(kind,data)
+        return kind,data
+
+    def _index_set(self,r,i,old,new):
+        """updates index on column i when row r changes from old to new value"""
+        kind,data=self._indexes.get(i,(None,None))
+        if data is None: # no index, or will be rebuilt anyway
+            return
+        if kind=='hash':
+            if old is not _missing:
+                rows=data[old]
+                rows.remove(r)
+                if not rows:
+                    del data[old]
+            data.setdefault(new,[]).append(r)
+        else:
+            if old is not _missing and old is not None:
+                data.remove((old,r))
+            if new is not None:
+                data.insert_right((new,r))
+
+    def _index_add(self,r):
+        """adds row r to all indexes"""
+        row=list.__getitem__(self,r)
+        for i in self._indexes:
+            self._index_set(r,i,_missing,row[i] if i<len(row) else None)
+
+    def lookup(self,value,column=0):
+        """
+        :return: list of row numbers where column contains value, using an index if available
+        """
+        i=self._i(column)
+        kind,data=self._index(i)
+        if kind=='hash':
+            return list(data.get(value,[]))
+        if kind=='sorted':
+            return self.between(value,value,i)
+        return [r for r,v in enumerate(self.icol(i)) if v==value]
+
+    def between(self,lo=None,hi=None,column=0):
+        """
+        :param lo,hi: bounds included, None for no bound
+        :return: list of row numbers where lo<=column<=hi, ordered by increasing value
+        uses a sorted index on column, which is created if column has no index.
+        a hash index on column is kept, and the rows are sorted for this call only
+        """
+        i=self._i(column)
+        if i not in self._indexes:
+            self.create_index(i,'sorted')
+        kind,data=self._index(i)
+        if kind=='sorted':
+            return [r for _,r in data.find_range(lo,hi)]
+        res=sorted((v,r) for r,v in enumerate(self.icol(i))
+            if v is not None and (lo is None or lo<=v) and (hi is None or v<=hi))
+        return [r for _,r in res]
+
+    def join(self,other,on,how='inner'):
+        """hash join with another table
+
+        :param other: Table
+        :param on: column or list of columns existing in both tables
+        :param how: 'inner' keeps only lines of self matching lines of other,
+          'left' keeps all lines of self, with None in other's columns when there is no match
+        :return: Table with the columns of self followed by the columns of other except on
+        """
+        if how not in ('inner','left'):
+            raise ValueError("how must be 'inner' or 'left', not %r"%how)
+        if not isinstance(on,(list,tuple)):
+            on=[on]
+        left=[self._i(c) for c in on]
+        right=[other._i(c) for c in on]
+        if None in left or None in right:
+            raise KeyError('join columns %s not found in both tables'%on)
+
+        # hash of other's rows, reusing its index if possible
+        kind,data=other._index(right[0]) if len(right)==1 else (None,None)
+        if kind=='hash':
+            key=lambda row:row[left[0]] if left[0]<len(row) else None
+        else:
+            data={}
+            for r,row in enumerate(other):
+                k=tuple(row[j] if j<len(row) else None for j in right)
+                data.setdefault(k,[]).append(r)
+            key=lambda row:tuple(row[j] if j<len(row) else None for j in left)
+
+        nl=len(self.titles) or self.ncols()
+        nr=len(other.titles) or other.ncols()
+        cols=[j for j in range(nr) if j not in right]
+        res=Table(titles=list(self.titles)+[other.titles[j] for j in cols if j<len(other.titles)])
+        for row in self:
+            row=list(row)+[None]*(nl-len(row))
+            matches=data.get(key(row),())
+            for r in matches:
+                o=other[r]
+                list.append(res,row+[o[j] if j<len(o) else None for j in cols])
+            if not matches and how=='left':
+                list.append(res,row+[None]*len(cols))
+        return res
+
     def __getitem__(self, n):
         try:
             c=self._i(n[1])
@@ -614,10 +907,15 @@ class Table(list):
     def set(self,row,col,value):
         col=self._i(col)
         if row>=len(self): 
-            self.extend([list()]*(1+row-len(self)))
-        if col>=len(self[row]):
-            self[row].extend([None]*(1+col-len(self[row])))
-        self[row][col]=value
+            self.extend([list() for _ in range(1+row-len(self))])
+        line=self[row]
+        if col>=len(line):
+            old=None
+            line.extend([None]*(1+col-len(line)))
+        else:
+            old=line[col]
+        line[col]=value
+        self._index_set(row,col,old,value)
     
     def setcol(self,col,value,i=0):
         """set column values
@@ -650,6 +948,7 @@ class Table(list):
                 self.set(r,i,v)
         else:
             list.append(self,list(line))
+            self._index_add(len(self)-1)
         return self
             
     def addcol(self,title,val=None,i=0):
@@ -665,6 +964,7 @@ class Table(list):
             
     def sort(self,by,reverse=False):
         '''sort by column'''
+        self._invalidate()
         i=self._i(by)
         if isinstance(i, int):
             list.sort(self,key=lambda x:x[i],reverse=reverse)
@@ -702,8 +1002,90 @@ class Table(list):
         return collections.OrderedDict(
             (k,t) for (k,t) in self.groupby_gen(by,sort,removecol)
         )
-        
-    
+
+    def _aggregations(self,by,**kwargs):
+        """parses the parameters of :meth:`aggregate`
+
+        :return: list of key column indexes, list of (title, function name, column index)
+        """
+        def _cols(c):
+            if c is None or c is False or c is True:
+                return []
+            if not isinstance(c,(list,tuple)):
+                c=[c]
+            return [self._i(x) for x in c]
+
+        aggs=[]
+        if kwargs.get('count') is True:
+            aggs.append(('count','count',None))
+        for f in ('count','sum','mean','var','min','max'):
+            for j in _cols(kwargs.get(f)):
+                aggs.append(('%s(%s)'%(f,self.titles[j] if j<len(self.titles) else j),f,j))
+        return _cols(by),aggs
+
+    def aggregate(self,by,**kwargs):
+        """summary of the table grouped by one or more key columns
+
+        lines are grouped in a single pass over a hash table, without sorting
+        the table nor building subtables. None values are ignored
+
+        :param by: column or list of columns used as keys
+        :param count: True to count lines in each group, or column(s) to count non None values
+        :param sum: column or list of columns to sum
+        :param mean: column or list of columns to average
+        :param var: column or list of columns for sample variance
+        :param min: column or list of columns for minimum
+        :param max: column or list of columns for maximum
+        :return: Table with one line per group in order of first appearance,
+          with key columns followed by aggregates titled like 'sum(Cost)'
+        """
+        from .stats import Stats
+        keys,aggs=self._aggregations(by,**kwargs)
+        cols=sorted(set(j for _,_,j in aggs if j is not None))
+        numeric=set(j for _,f,j in aggs if f in ('sum','mean','var'))
+
+        def _get(row,j):
+            return row[j] if j<len(row) else None
+
+        groups=collections.OrderedDict() # key -> [number of lines, {column:[n,lo,hi,Stats]}]
+        for row in self:
+            k=tuple(_get(row,j) for j in keys)
+            g=groups.get(k)
+            if g is None:
+                g=groups[k]=[0,{}]
+            g[0]+=1
+            acc=g[1]
+            for j in cols:
+                x=_get(row,j)
+                if x is None:
+                    continue
+                a=acc.get(j)
+                if a is None:
+                    acc[j]=[1,x,x,Stats([x]) if j in numeric else None]
+                    continue
+                a[0]+=1
+                if x<a[1]: a[1]=x
+                if x>a[2]: a[2]=x
+                if a[3] is not None: a[3].append(x)
+
+        def _value(g,f,j):
+            if j is None: # count lines
+                return g[0]
+            a=g[1].get(j)
+            if a is None:
+                return 0 if f=='count' else None
+            if f=='count': return a[0]
+            if f=='min': return a[1]
+            if f=='max': return a[2]
+            if f=='sum': return a[3].sum
+            if f=='mean': return a[3].mean
+            return a[3].var
+
+        res=Table(titles=[self.titles[j] if j<len(self.titles) else j for j in keys]+[t for t,_,_ in aggs])
+        for k,g in groups.items():
+            list.append(res,list(k)+[_value(g,f,j) for _,f,j in aggs])
+        return res
+
     def hierarchy(self,by='Level',
                   factory=lambda row:(row,[]),          #creates an object from a line
                   linkfct=lambda x,y,row:x[1].append(y) #creates a parend/child relation between x and y. raw is also available (for qty)
@@ -733,6 +1115,7 @@ class Table(list):
         """
         res=True
         i=self._i(by)
+        self._invalidate()
         for row in self:
             try:
                 x=row[i]
@@ -795,6 +1178,7 @@ class Table(list):
         :param f: function of the form lambda line:bool returning True if line should be removed
         :return: int number of lines removed
         """
+        self._invalidate()
         i=self._i(f)
         if i is not None:
             f=lambda x:x[i] in value
@@ -804,3 +1188,643 @@ class Table(list):
     
 
                 
+
+class Column(object):
+    """column of a :class:`ColumnTable`, stored in a numpy array
+
+    * int, float and bool values are stored in typed arrays. None is NaN in float columns,
+      int or bool columns containing None are stored as objects
+    * strings are dictionary-encoded : int codes into a list of unique values, -1 for None
+    * anything else is stored in an object array
+
+    the array has spare capacity so that appending values takes amortized constant time
+    """
+    def __init__(self,values=[]):
+        """
+        :param values: iterable of cell values, or Column to copy
+        """
+        if isinstance(values,Column):
+            self.data=values.data.copy()
+            self.categories=values.categories
+        else:
+            self._encode(list(values))
+
+    @property
+    def data(self):
+        """:return: numpy array of stored values, or of codes if dictionary-encoded"""
+        return self._data[:self._n]
+
+    @data.setter
+    def data(self,array):
+        self._data=array
+        self._n=len(array)
+
+    @property
+    def categories(self):
+        """:return: list of strings if dictionary-encoded, None otherwise"""
+        return self._categories
+
+    @categories.setter
+    def categories(self,categories):
+        self._categories=categories
+        self._catindex=None # categories may be shared with other Columns
+
+    def _code(self,value):
+        """:return: int code of string value, added to categories if needed"""
+        if self._catindex is None: # copy categories before adding any
+            self._categories=list(self._categories)
+            self._catindex=dict((v,i) for i,v in enumerate(self._categories))
+        c=self._catindex.get(value)
+        if c is None:
+            c=self._catindex[value]=len(self._categories)
+            self._categories.append(value)
+        return c
+
+    def _encode(self,values):
+        self.categories=None # list of strings if dictionary-encoded
+        types=set(type(v) for v in values)
+        types.discard(type(None))
+        hasnone=len(values)>0 and None in values
+        if not types:
+            self.data=np.array(values,dtype=object)
+        elif types<=set(six.integer_types) and not hasnone:
+            try:
+                self.data=np.array(values,dtype=np.int64)
+            except OverflowError:
+                self.data=np.array(values,dtype=object)
+        elif types=={bool} and not hasnone:
+            self.data=np.array(values,dtype=bool)
+        elif float in types and types<=set(six.integer_types+(float,)):
+            self.data=np.array([np.nan if v is None else v for v in values],dtype=np.float64)
+        elif all(issubclass(t,six.string_types) for t in types):
+            index,categories={},[]
+            codes=np.empty(len(values),dtype=np.int32)
+            for i,v in enumerate(values):
+                if v is None:
+                    codes[i]=-1
+                    continue
+                c=index.get(v)
+                if c is None:
+                    c=index[v]=len(categories)
+                    categories.append(v)
+                codes[i]=c
+            self.data=codes
+            self.categories=categories
+            self._catindex=index
+        else:
+            self.data=np.empty(len(values),dtype=object)
+            self.data[:]=values
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return 'Column(%s)'%self.tolist()
+
+    def _decode(self,x):
+        """converts a value from self.data to Python"""
+        if self.categories is not None:
+            return None if x<0 else self.categories[x]
+        if self.data.dtype==np.float64 and np.isnan(x):
+            return None
+        return x.item() if isinstance(x,np.generic) else x
+
+    @property
+    def values(self):
+        """:return: numpy array of the decoded values"""
+        if self.categories is None:
+            return self.data
+        cats=np.empty(len(self.categories)+1,dtype=object)
+        cats[:-1]=self.categories # last one is None for code -1
+        return cats[self.data]
+
+    def tolist(self):
+        """:return: list of Python values"""
+        if self.categories is not None:
+            cats=self.categories+[None]
+            return [cats[c] for c in self.data.tolist()]
+        res=self.data.tolist()
+        if self.data.dtype==np.float64:
+            res=[None if x!=x else x for x in res] #NaN
+        return res
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self,i):
+        if isinstance(i,six.integer_types+(np.integer,)):
+            return self._decode(self.data[i])
+        return self.take(i)
+
+    def take(self,index):
+        """:return: Column made of rows at index (slice, int array or bool mask)"""
+        res=Column.__new__(Column)
+        res.data=self.data[index]
+        res.categories=self.categories
+        self._catindex=None # categories are shared now
+        return res
+
+    def keys(self):
+        """:return: numpy array whose order is the order of the values, for sorting and grouping"""
+        if self.categories is None:
+            return self.data
+        order=sorted(range(len(self.categories)),key=self.categories.__getitem__)
+        rank=np.empty(len(order)+1,dtype=np.int32)
+        rank[order]=np.arange(len(order))
+        rank[-1]=-1 # None first
+        return rank[self.data]
+
+    def set(self,i,value):
+        """sets value at row i"""
+        if self.categories is not None and isinstance(value,six.string_types):
+            self.data[i]=self._code(value)
+            return
+        if self.data.dtype==object \
+        or (self.data.dtype==np.float64 and isinstance(value,six.integer_types+(float,)) and not isinstance(value,bool)) \
+        or (self.data.dtype==np.int64 and isinstance(value,six.integer_types) and not isinstance(value,bool)) \
+        or (self.data.dtype==bool and isinstance(value,bool)):
+            self.data[i]=value
+            return
+        values=self.tolist() # type changes
+        values[i]=value
+        self._encode(values)
+
+    def extend(self,values):
+        """appends values, in amortized constant time unless the type of the column changes"""
+        values=list(values)
+        if not values:
+            return
+        if self._n==0:
+            self._encode(values)
+            return
+        new=None # array of values to append
+        dtype=self._data.dtype
+        if self.categories is not None:
+            if all(v is None or isinstance(v,six.string_types) for v in values):
+                new=np.array([-1 if v is None else self._code(v) for v in values],dtype=np.int32)
+        elif dtype==object:
+            new=np.empty(len(values),dtype=object)
+            new[:]=values
+        else:
+            tail=Column(values)
+            kind=tail.data.dtype
+            if tail.categories is not None:
+                pass
+            elif kind==dtype or (dtype==np.float64 and kind==np.int64):
+                new=tail.data
+            elif dtype==np.float64 and kind==object and all(v is None for v in values):
+                new=np.full(len(values),np.nan)
+        if new is None: # type changes
+            self._encode(self.tolist()+values)
+            return
+        n=self._n+len(new)
+        if n>len(self._data): # grow capacity geometrically
+            data=np.empty(max(n,2*len(self._data)),dtype=dtype)
+            data[:self._n]=self._data[:self._n]
+            self._data=data
+        self._data[self._n:n]=new
+        self._n=n
+
+    def map(self,f):
+        """:return: Column of f(x) for all values x
+        f is called only once per distinct value of dictionary-encoded columns
+        """
+        if self.categories is None:
+            return Column(f(x) for x in self.tolist())
+        mapped=Column(f(x) for x in self.categories)
+        res=mapped.take(self.data)
+        if None in self.tolist(): # code -1 must still give None
+            values=res.tolist()
+            for i in np.nonzero(self.data<0)[0]:
+                values[i]=None
+            res=Column(values)
+        return res
+
+class ColumnTable(Table):
+    """:class:`Table` stored by columns of typed numpy arrays
+
+    faster and much more compact than Table for large data,
+    especially with repeated strings, which are dictionary-encoded.
+    Rows are built on the fly when iterating or indexing,
+    while column operations (col, sort, groupby, total, ...) are vectorized.
+    Appending rows one by one is slow : build it from a whole Table or file
+    """
+    def __init__(self,data=[],**kwargs):
+        """
+        :param data: Table, list of list of cells, or string as filename
+        :param titles: optional list of strings used as column id
+        :param footer: optional list of functions used as column reducers
+        """
+        self._indexes={} # invalidated by all changes
+        if isinstance(data,six.string_types):
+            data=Table(data,**kwargs)
+        try:
+            self.titles=list(data.titles)
+        except AttributeError:
+            self.titles=kwargs.pop('titles',[])
+        try:
+            self.footer=data.footer
+        except AttributeError:
+            self.footer=kwargs.pop('footer',[])
+        if isinstance(data,ColumnTable):
+            self.columns=[Column(c) for c in data.columns]
+        else:
+            self.columns=[]
+            if isinstance(data, dict):
+                data=data.values()
+            self.extend(data)
+
+    def __reduce__(self): # for copy and pickle, as the underlying list is empty
+        return (self.__class__,(self.to_table(),))
+
+    def to_table(self):
+        """:return: :class:`Table` with the same content"""
+        return Table(list(self),titles=list(self.titles),footer=self.footer)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __iter__(self):
+        for row in zip(*[c.tolist() for c in self.columns]):
+            yield list(row)
+
+    def _take(self,index,columns=None):
+        """:return: ColumnTable with rows at index and optional subset of columns"""
+        if columns is None:
+            columns=range(len(self.columns))
+        res=ColumnTable(titles=[self.titles[j] for j in columns if j<len(self.titles)])
+        res.columns=[self.columns[j].take(index) for j in columns]
+        return res
+
+    def __getitem__(self,n):
+        try:
+            c=self._i(n[1])
+        except TypeError:
+            if isinstance(n,slice):
+                return list(self._take(n))
+            return [c[n] for c in self.columns]
+        column=self.columns[c]
+        if isinstance(n[0],slice):
+            return column.take(n[0]).tolist()
+        return column[n[0]]
+
+    # list methods, as the underlying list is empty
+
+    def _setrows(self,rows):
+        """replaces all rows, keeping the number of columns"""
+        self._invalidate()
+        ncols=len(self.columns)
+        self.columns=[]
+        self.extend(rows)
+        while len(self.columns)<ncols:
+            self.columns.append(Column([None]*len(self)))
+
+    def __setitem__(self,i,row):
+        if isinstance(i,slice):
+            rows=list(self)
+            rows[i]=row
+            self._setrows(rows)
+            return
+        for j,v in enumerate(row):
+            self.set(i,j,v)
+
+    def __delitem__(self,i):
+        remove=np.arange(len(self))[i] # raises IndexError as list does
+        self._invalidate()
+        keep=np.ones(len(self),dtype=bool)
+        keep[remove]=False
+        self.columns=[c.take(keep) for c in self.columns]
+
+    def insert(self,i,line):
+        rows=list(self)
+        rows.insert(i,line)
+        self._setrows(rows)
+
+    def pop(self,i=-1):
+        if len(self)==0:
+            raise IndexError('pop from empty table')
+        row=self[i]
+        del self[i]
+        return row
+
+    def remove(self,line):
+        for i,row in enumerate(self):
+            if row==line:
+                del self[i]
+                return
+        raise ValueError('line not in table')
+
+    def clear(self):
+        self._invalidate()
+        self.columns=[c.take(slice(0,0)) for c in self.columns]
+
+    def copy(self):
+        return ColumnTable(self)
+
+    def count(self,line):
+        return sum(1 for row in self if row==line)
+
+    def reverse(self):
+        self._invalidate()
+        self.columns=[c.take(slice(None,None,-1)) for c in self.columns]
+
+    def __reversed__(self):
+        return iter(list(self)[::-1])
+
+    def __contains__(self,line):
+        return any(row==line for row in self)
+
+    def __iadd__(self,rows):
+        self.extend(rows)
+        return self
+
+    def __add__(self,other):
+        return list(self)+list(other)
+
+    def __radd__(self,other):
+        return list(other)+list(self)
+
+    def __mul__(self,n):
+        return list(self)*n
+
+    __rmul__=__mul__
+
+    def __imul__(self,n):
+        self._setrows(list(self)*n)
+        return self
+
+    def __ne__(self,other):
+        return not self==other
+
+    def __lt__(self,other):
+        return list(self)<list(other)
+
+    def __le__(self,other):
+        return list(self)<=list(other)
+
+    def __gt__(self,other):
+        return list(self)>list(other)
+
+    def __ge__(self,other):
+        return list(self)>=list(other)
+
+    def ncols(self):
+        return len(self.columns)
+
+    def array(self,column):
+        """:return: numpy array of column values"""
+        return self.columns[self._i(column)].values
+
+    def icol(self,column):
+        """iterates a column"""
+        return iter(self.col(column))
+
+    def col(self,column,title=False):
+        i=self._i(column)
+        res=self.columns[i].tolist() if i is not None and i<len(self.columns) else [None]*len(self)
+        if title:
+            res=[self.titles[i]]+res
+        return res
+
+    def index(self,value,column=0):
+        """
+        :return: int row number of first line where column contains value
+        """
+        res=np.nonzero(self.array(column)==value)[0]
+        return int(res[0]) if len(res) else None
+
+    def extend(self,rows):
+        """appends rows (iterable of lists)"""
+        rows=[row if isiterable(row) else [row] for row in rows]
+        if not rows:
+            return self
+        self._invalidate()
+        n=len(self)
+        width=max(max(len(row) for row in rows),len(self.columns))
+        while len(self.columns)<width:
+            self.columns.append(Column([None]*n))
+        for j,c in enumerate(self.columns):
+            c.extend(row[j] if j<len(row) else None for row in rows)
+        return self
+
+    def set(self,row,col,value):
+        self._invalidate()
+        col=self._i(col)
+        if row>=len(self):
+            self.extend([[]]*(1+row-len(self)))
+        if col>=len(self.columns):
+            self.extend([])
+            n=len(self)
+            while col>=len(self.columns):
+                self.columns.append(Column([None]*n))
+        self.columns[col].set(row,value)
+
+    def setcol(self,col,value,i=0):
+        """set column values
+        :param col: int or string column index
+        :param value: single value assigned to whole column or iterable assigned to each cell
+        :param i: optional int : index of first row to assign
+        """
+        self._invalidate()
+        j=self._i(col)
+        n=len(self)
+        if isiterable(value):
+            value=list(value)
+        else:
+            value=[value]*(n-i)
+        if i+len(value)>n:
+            self.extend([[]]*(i+len(value)-n))
+        while j>=len(self.columns):
+            self.columns.append(Column([None]*len(self)))
+        values=self.columns[j].tolist()
+        values[i:i+len(value)]=value
+        self.columns[j]=Column(values)
+
+    def append(self,line):
+        ''' appends a line to table
+        :param line: can be either:
+        * a list
+        * a dict or column names:values
+        '''
+        if isinstance(line,dict):
+            row=[None]*len(self.titles)
+            for k,v in line.items():
+                i=self._i(k)
+                if i is None: #column doesn't exist:
+                    i=len(self.titles)
+                    self.titles.append(k)
+                    row.append(None)
+                row[i]=v
+            line=row
+        return self.extend([line])
+
+    def addcol(self,title,val=None,i=0):
+        '''add column to the right'''
+        col=len(self.titles)
+        self.titles.append(title)
+        self.setcol(col,val,i)
+        return self
+
+    def sort(self,by,reverse=False):
+        '''sort by column'''
+        self._invalidate()
+        order=np.argsort(self.columns[self._i(by)].keys(),kind='mergesort') # stable
+        if reverse:
+            order=order[::-1]
+        self.columns=[c.take(order) for c in self.columns]
+
+    def groupby_gen(self,by,sort=True,removecol=True):
+        """generates subtables, without modifying the table
+
+        :param sort: bool if True, keys are generated in sorted order,
+          otherwise in order of first appearance
+        """
+        i=self._i(by)
+        column=self.columns[i]
+        keys=column.keys()
+        uniq,first,inverse=np.unique(keys,return_index=True,return_inverse=True)
+        if not sort:
+            rank=np.empty(len(first),dtype=np.int64)
+            rank[np.argsort(first,kind='mergesort')]=np.arange(len(first))
+            inverse=rank[inverse]
+            first=np.sort(first)
+        order=np.argsort(inverse,kind='mergesort')
+        bounds=np.cumsum(np.bincount(inverse))
+        columns=[j for j in range(len(self.columns)) if not (removecol and j==i)]
+        start=0
+        for g,end in enumerate(bounds):
+            yield column[int(first[g])],self._take(order[start:end],columns)
+            start=end
+
+    def aggregate(self,by,**kwargs):
+        """vectorized version of :meth:`Table.aggregate`
+
+        falls back to the generic version when a key or an aggregated column
+        is not numeric, except for counts
+        """
+        keys,aggs=self._aggregations(by,**kwargs)
+        def _numeric(c):
+            return c.categories is None and c.data.dtype in (np.int64,np.float64,bool)
+        def _generic():
+            return ColumnTable(Table.aggregate(self,by,**kwargs))
+        n=len(self)
+        if not keys or n==0:
+            return _generic()
+        gid=np.zeros(n,dtype=np.int64)
+        for j in keys:
+            c=self.columns[j]
+            if c.categories is None and not _numeric(c):
+                return _generic()
+            if c.data.dtype==np.float64 and np.isnan(c.data).any():
+                return _generic() # NaN!=NaN
+            _,ids=np.unique(c.data,return_inverse=True)
+            gid=gid*(ids.max()+1)+ids
+        _,first,gid=np.unique(gid,return_index=True,return_inverse=True)
+        # renumber groups in order of first appearance
+        rank=np.empty(len(first),dtype=np.int64)
+        rank[np.argsort(first,kind='mergesort')]=np.arange(len(first))
+        gid=rank[gid]
+        first=np.sort(first)
+        ng=len(first)
+
+        res=[[self.columns[j][int(i)] for i in first] for j in keys]
+        for _,f,j in aggs:
+            if j is None:
+                res.append(np.bincount(gid,minlength=ng).tolist())
+                continue
+            c=self.columns[j]
+            if f=='count' and c.categories is not None:
+                valid=c.data>=0
+            elif not _numeric(c):
+                return _generic()
+            elif c.data.dtype==np.float64:
+                valid=~np.isnan(c.data)
+            else:
+                valid=np.ones(n,dtype=bool)
+            g=gid[valid]
+            count=np.bincount(g,minlength=ng)
+            if f=='count':
+                res.append(count.tolist())
+                continue
+            x=c.data[valid]
+            if x.dtype==bool:
+                x=x.astype(np.int64)
+            if f in ('min','max'):
+                if x.dtype==np.float64:
+                    init=np.inf if f=='min' else -np.inf
+                else:
+                    info=np.iinfo(x.dtype)
+                    init=info.max if f=='min' else info.min
+                v=np.full(ng,init,dtype=x.dtype)
+                (np.minimum if f=='min' else np.maximum).at(v,g,x)
+            else:
+                v=np.zeros(ng,dtype=x.dtype)
+                np.add.at(v,g,x)
+                if f in ('mean','var'):
+                    v=v/np.maximum(count,1)
+                if f=='var':
+                    d=np.zeros(ng,dtype=np.float64)
+                    np.add.at(d,g,(x-v[g])**2)
+                    v=np.where(count>1,d/np.maximum(count-1,1),0.)
+            v=v.tolist()
+            res.append([None if k==0 else a for a,k in zip(v,count.tolist())])
+
+        titles=[self.titles[j] if j<len(self.titles) else j for j in keys]+[t for t,_,_ in aggs]
+        return ColumnTable(list(zip(*res)),titles=titles)
+
+    def applyf(self,by,f,skiperrors=False):
+        """ apply a function to a column
+        :param by: column name of number
+        :param f: function of the form lambda cell:content
+        :param skiperrors: bool. if True, errors while running f are ignored
+        :return: bool True if ok, False if skiperrors==True and conversion failed
+        """
+        self._invalidate()
+        i=self._i(by)
+        res=[True]
+        def g(x):
+            try:
+                return f(x)
+            except Exception as e:
+                if not skiperrors:
+                    raise
+                res[0]=False
+                return x
+        self.columns[i]=self.columns[i].map(g)
+        return res[0]
+
+    _vectorized={sum:'sum', min:'min', max:'max'} # builtins replaced by numpy functions
+
+    def total(self,funcs):
+        """build a footer row by appling funcs to all columns
+        """
+        funcs=funcs+[None]*(len(self.titles)-len(funcs))
+        self.footer=[]
+        for i,f in enumerate(funcs):
+            try:
+                values=self.columns[i].values
+                if values.dtype!=object and f in self._vectorized \
+                and not (values.dtype==np.float64 and np.isnan(values).any()): # None
+                    res=getattr(np,self._vectorized[f])(values)
+                    res=res.item()
+                else:
+                    res=f(self.col(i))
+                self.footer.append(res)
+            except Exception:
+                self.footer.append(f)
+        return self.footer
+
+    def remove_lines_where(self,f,value=(None,0,'')):
+        """
+        :param f: function of the form lambda line:bool returning True if line should be removed
+        :return: int number of lines removed
+        """
+        self._invalidate()
+        i=self._i(f)
+        if i is not None:
+            values=self.columns[i].tolist()
+            remove=np.array([x in value for x in values],dtype=bool)
+        else:
+            remove=np.array([bool(f(row)) for row in self],dtype=bool)
+        self.columns=[c.take(~remove) for c in self.columns]
+        return int(remove.sum())
@@ -100,6 +100,12 @@ class TestSortedCollection:
         # assert_equal(expected, sorted_collection.find(k))
         raise SkipTest 
 
+    def test_find_range(self):
+        for sc,s in self.testSC:
+            assert_equal(sc.find_range(2,3.5),[x for x in s if 2<=x<=3.5])
+            assert_equal(sc.find_range(hi=2),[x for x in s if x<=2])
+            assert_equal(sc.find_range(),s)
+
     def test_find_ge(self):
         # sorted_collection = SortedCollection(iterable, key)
         # assert_equal(expected, sorted_collection.find_ge(k))
@@ -8,7 +8,82 @@ from Goulib.decorators import *
 
 class TestMemoize:
     def test_memoize(self):
-        pass
+        @memoize
+        def fib(n):
+            return n if n<2 else fib(n-1)+fib(n-2)
+        assert_equal(fib(100),354224848179261915075)
+        assert_equal(fib.cache_info(),(98,101,None,101))
+        assert_true(354224848179261915075 in fib.cache.values()) # results, as before
+        assert_true(fib.__wrapped__.cache is fib.cache)
+        total=memoize(sum)
+        assert_equal(total([1,2]),3) # unhashable args
+        assert_equal(total([1,2]),3)
+        assert_equal(total.cache_info().hits,1)
+
+    def test_maxsize(self):
+        calls=[]
+        @memoize(maxsize=2)
+        def f(x):
+            calls.append(x)
+            return x*x
+        for x in [1,2,1,3,2,1]:
+            f(x)
+        assert_equal(calls,[1,2,3,2,1]) # 2 then 1 were evicted as least recently used
+        assert_equal(f.cache_info().currsize,2)
+        assert_equal(f.cache_info().hits,1)
+
+    def test_lfu(self):
+        calls=[]
+        @memoize(maxsize=2,policy='lfu')
+        def f(x):
+            calls.append(x)
+            return x
+        for x in [1,1,2,3,1,2]:
+            f(x)
+        assert_equal(calls,[1,2,3,2]) # 1 is kept as most frequently used
+
+    def test_ttl(self):
+        import time
+        @memoize(ttl=0.01)
+        def f(x):
+            return time.time()
+        t=f(0)
+        assert_equal(f(0),t)
+        time.sleep(0.02)
+        assert_true(f(0)>t)
+
+    def test_filename(self):
+        import os, tempfile
+        filename=os.path.join(tempfile.mkdtemp(),'memoize')
+        calls=[]
+        def f(x):
+            calls.append(x)
+            return x*2
+        g=memoize(f,filename=filename)
+        assert_equal(g(21),42)
+        g.shelf.close()
+        g=memoize(f,filename=filename) # simulates a restart
+        assert_equal(g(21),42)
+        assert_equal(calls,[21])
+        g.shelf.close()
+
+    def test_filename_restart(self):
+        import os, sys, subprocess, tempfile, Goulib
+        filename=os.path.join(tempfile.mkdtemp(),'memoize')
+        code='\n'.join([
+            'import sys',
+            'from Goulib.decorators import memoize',
+            'calls=[]',
+            '@memoize(filename=sys.argv[1])',
+            'def f(x,y=1):',
+            '    calls.append(x)',
+            '    return x*y',
+            'f(2,y=3)',
+            'print(len(calls))', # shelf isn't closed explicitly
+        ])
+        env=dict(os.environ,PYTHONPATH=os.path.dirname(os.path.dirname(Goulib.__file__)))
+        calls=[subprocess.check_output([sys.executable,'-c',code,filename],env=env).strip() for _ in range(2)]
+        assert_equal(calls,[b'1',b'0']) # second interpreter finds the result with kwargs
 
 class TestDebug:
     def test_debug(self):
@@ -22,13 +97,77 @@ class TestNodebug:
 
 class TestGetThreadPool:
     def test_get_thread_pool(self):
-        # assert_equal(expected, get_thread_pool())
-        raise SkipTest 
+        assert_true(get_thread_pool(2) is get_thread_pool(2))
+        assert_false(get_thread_pool(2) is get_thread_pool(3))
+
+def _sleep(t):
+    import time
+    time.sleep(t)
+    return t
+
+@timeout(10,processes=True)
+def _square(x):
+    return x*x
+
+def _pid(*args):
+    import os
+    return os.getpid()
 
 class TestTimeout:
     def test_timeout(self):
-        # assert_equal(expected, timeout(timeout))
-        raise SkipTest 
+        f=timeout(0.5,workers=4)(_sleep)
+        assert_equal(f(0.01),0.01)
+        assert_raises(TimeoutError,f,1)
+        assert_equal(f.stats['calls'],2)
+        assert_equal(f.stats['timeouts'],1)
+
+    def test_timeout_processes(self):
+        import time
+        f=timeout(0.2,processes=True)(_sleep)
+        assert_equal(f(0.01),0.01)
+        t=time.time()
+        assert_raises(TimeoutError,f,10) # the process is killed
+        assert_true(time.time()-t<5)
+        assert_raises(TypeError,f,'a') # exceptions are forwarded
+        assert_equal(f.stats['timeouts'],1)
+        assert_equal(f.stats['calls'],3)
+
+    def test_timeout_partial(self):
+        import functools
+        f=timeout(5,processes=True)(functools.partial(_sleep,0.01))
+        assert_equal(f(),0.01)
+        f=timeout(5,processes=True)(lambda x:x+1)
+        assert_equal(f(1),2)
+
+    def test_timeout_reuse(self):
+        f=timeout(0.5,workers=1,processes=True)(_pid)
+        pid=f()
+        assert_equal(f(),pid) # the worker process is reused
+        g=timeout(0.2,workers=1,processes=True)(_sleep)
+        assert_raises(TimeoutError,g,10)
+        assert_not_equal(f(),pid) # the timed out worker was replaced
+
+    def test_timeout_decorator(self):
+        import multiprocessing
+        method=multiprocessing.get_start_method()
+        multiprocessing.set_start_method('spawn',force=True) # default on Windows and MacOS
+        try:
+            assert_equal(_square(3),9)
+        finally:
+            multiprocessing.set_start_method(method,force=True)
+        assert_equal(_square(4),16)
+
+class TestAsyncTimeout:
+    def test_async_timeout(self):
+        import asyncio
+        f=async_timeout(0.2,workers=4)(_sleep)
+        loop=asyncio.get_event_loop()
+        assert_equal(loop.run_until_complete(f(0.01)),0.01)
+        assert_raises(asyncio.TimeoutError,loop.run_until_complete,f(1))
+        assert_equal(f.stats['timeouts'],1)
+        assert_raises(TypeError,loop.run_until_complete,f('a'))
+        assert_equal(f.stats['calls'],3)
+        assert_true(asyncio.iscoroutinefunction(f))
 
 class TestItimeout:
     def test_itimeout(self):
@@ -281,6 +281,20 @@ class TestGroup:
         dxf= Drawing(path+'/data/Homer_Simpson_by_CyberDrone.dxf')
         self.blocks= dxf.block
         assert_true('hand 1' in self.blocks)
+        assert_equal(len(dxf.block),7)
+        assert_true(all(isinstance(e,Instance) for e in dxf))
+        assert_equal(len(dxf.block['hand 1']),87)
+        assert_equal(len(list(dxf.block.values())),7)
+        assert_equal(sorted(dxf.block.keys()),sorted(dxf.block))
+        assert_true(all(dxf.block[k] is v for k,v in dxf.block.items()))
+        assert_equal(dxf.block.get('no such block'),None)
+        assert_false(hasattr(dxf,'dxf')) # entities were streamed
+
+        # filtering
+        assert_equal(len(Drawing(path+'/data/Homer_Simpson_by_CyberDrone.dxf',layers=['nothing'])),0)
+        lines=Drawing(path+'/data/drawing.dxf',only=['LINE'])
+        assert_equal(len(lines),4)
+        assert_true(all(isinstance(e,Segment2) for e in lines))
 
     def test_swap(self):
         # group = Group()
@@ -290,6 +304,95 @@ class TestGroup:
     def test_length(self):
         assert_equal(self.group.length,27.22534104051515)
 
+    def test_spatial_index(self):
+        g=Group([Segment2(Point2(i,0),Point2(i,1)) for i in range(20)])
+        assert_equal(g.bbox(),BBox((0,0),(19,1)))
+        assert_equal(g.spatial_index.intersection((2.5,0,4.5,2)),[3,4])
+        g.append(Segment2(Point2(0,0),Point2(-1,-1))) # index is updated
+        assert_equal(g.bbox(),BBox((-1,-1),(19,1)))
+        g._apply_transform(Trans(offset=(10,0))) # index is rebuilt
+        assert_equal(g.bbox(),BBox((9,-1),(29,1)))
+        assert_equal(g.spatial_index.intersection((2.5,0,4.5,2)),[])
+
+    def test_bbox(self):
+        s=Segment2((0,0),(1,1))
+        c=Circle((5,5),1)
+        inner=Group([s,c])
+        inst=Instance(inner,Trans(offset=(10,0)))
+        top=Group([Group([inner]),inst])
+        assert_equal(top.bbox(),BBox((0,0),(16,6)))
+        assert_true(top.bbox() is top.bbox()) # cached
+        s.setattr(p=Point2(-3,-3)) # invalidates up to top
+        assert_equal(top.bbox(),BBox((-3,-3),(16,6)))
+        inner[1]=Circle((5,5),2)
+        assert_equal(top.bbox(),BBox((-3,-3),(17,7)))
+        inner.append(Point2(0,20))
+        assert_equal(top.bbox(),BBox((-3,-3),(17,20)))
+        inst.setattr(trans=Trans(offset=(0,-10)))
+        assert_equal(top.bbox(),BBox((-3,-13),(7,20)))
+        inner._apply_transform(Trans(offset=(1,0)))
+        assert_equal(top.bbox(),BBox((-2,-13),(8,20)))
+        inner[-1].y=30 # entities modified directly must be invalidated
+        inner[-1].invalidate()
+        assert_equal(top.bbox(),BBox((-2,-13),(8,30)))
+        inner[-1].setattr(y=40)
+        assert_equal(top.bbox(),BBox((-2,-13),(8,40)))
+        s.color='red'
+        assert_true(top._bbox is not None)
+
+    def test_bbox_transform(self):
+        import pickle
+        p=Point2(0,0)
+        p.bbox()
+        assert_equal((Trans(offset=(5,5))*p).bbox(),BBox((5,5),(5,5))) # cache isn't copied
+        g=Group([Point2(0,0),Segment2((0,0),(1,1))])
+        g.bbox()
+        g._apply_transform(Trans(offset=(10,10)))
+        assert_equal(g.bbox(),BBox((10,10),(11,11)))
+        g=pickle.loads(pickle.dumps(g))
+        assert_true(g._bbox is None)
+        assert_true(g[1]._bbox is None)
+
+    def test_collections(self):
+        g=Group([Segment2((0,0),(1,1)),Segment2((1,0),(0,1)),Circle((5,5),1),Arc2((0,0),(1,0),(0,1))])
+        g[1].color='red'
+        c=g.collections()
+        assert_equal(len(c),3) # black segments, red segment, black curves
+        assert_equal(len(c[0].get_segments()),1)
+        assert_equal(len(c[2].get_paths()),2)
+        assert_true(g.render('png',batch=True))
+
+    def test_thumbnail(self):
+        g=Group([Segment2((0,0),(10,0)),Segment2((0,0),(0,5)),Text('x',(1,1),size=1)])
+        g[1].color='red'
+        img=g.thumbnail(11,fmt=None)
+        assert_equal(img.shape,(6,11,3))
+        assert_equal(img[5].tolist(),[[255,0,0]]+[[0,0,0]]*10) # red drawn last
+        assert_equal(img[0,5].tolist(),[255,255,255])
+        assert_equal(img[0,0].tolist(),[255,0,0])
+        assert_true(g.thumbnail().startswith(b'\x89PNG'))
+
+    def test_intersect(self):
+        g=Group([Segment2(Point2(i,0),Point2(i,1)) for i in range(20)])
+        s=Segment2(Point2(2.5,.5),Point2(5.5,.5))
+        assert_equal([e for _,e in g.intersect(s)],g[3:6])
+        assert_equal(len(list(g.intersect(Line2(Point2(0,.5),Vector2(1,0))))),20)
+
+    def test_intersections(self):
+        g=Group([Chain([Segment2((0,0),(2,2)),Segment2((2,2),(4,0))]),Segment2((0,1),(4,1))])
+        res=[p.xy for p,_,_ in g.intersections()]
+        assert_equal(sorted(res),[(1,1),(2,2),(3,1)]) # (2,2) is the common end in the Chain
+
+    def test_connect(self):
+        g=Group([Segment2(Point2(i,0),Point2(i,1)) for i in range(20)])
+        assert_equal(g.connect(Point2(7.2,3)),Segment2(Point2(7,1),Point2(7.2,3)))
+        assert_equal(g.distance(Point2(7.5,.5)),.5)
+
+    def test_nearest(self):
+        g=Group([Segment2(Point2(i,0),Point2(i,1)) for i in range(20)])
+        assert_equal(g.nearest(Point2(7.2,3)),[g[7]])
+        assert_equal(g.nearest(Point2(7.2,3),3),[g[7],g[8],g[6]])
+
     def test___copy__(self):
         # group = Group()
         # assert_equal(expected, group.__copy__())
@@ -361,6 +464,37 @@ class TestChain:
         # assert_equal(expected, chain.to_dxf(split, **attr))
         raise SkipTest
 
+    def test_simplify(self):
+        n=1000
+        pts=[Point2(10,0)]+[Point2(10*cos(2*pi*i/n),10*sin(2*pi*i/n)) for i in range(1,n)]+[Point2(10,0)]
+        circle=Chain([Segment2(p,q) for p,q in zip(pts,pts[1:])])
+        circle.color='red'
+        res=circle.simplify(0.01)
+        assert_true(len(res)<150)
+        assert_true(res.isclosed())
+        assert_equal(res.color,'red')
+        assert_equal(res.length,circle.length,places=1)
+        assert_equal(len(circle),n) # unchanged
+        res=circle.simplify(0.01,arcs=True)
+        assert_true(len(res)<=2)
+        assert_true(isinstance(res[0],Arc2))
+        assert_equal(res[0].r,10)
+        assert_true(res.isclosed())
+        # line, quarter circle and line
+        pts=[(x,0) for x in range(11)]+[(10+5*sin(t*pi/20),5-5*cos(t*pi/20)) for t in range(1,11)]+[(15,y) for y in range(6,15)]
+        chain=Chain([Segment2(Point2(p),Point2(q)) for p,q in zip(pts,pts[1:])])
+        res=chain.simplify(0.02,arcs=True)
+        assert_equal([e.__class__ for e in res],[Segment2,Arc2,Segment2])
+        assert_equal(res[1].c,Point2(10,5))
+        assert_equal(res.start,chain.start)
+        assert_equal(res.end,chain.end)
+        # runs are split where attributes change
+        chain=Chain([Segment2(Point2(x,0),Point2(x+1,0)) for x in range(10)])
+        for s in chain[5:]:
+            s.color='red'
+        res=chain.simplify(0.01)
+        assert_equal([(e.start.x,e.end.x,e.color) for e in res],[(0,5,'black'),(5,10,'red')])
+
     def test_from_svg(self):
         # chain = Chain(data)
         # assert_equal(expected, chain.from_svg())
@@ -431,6 +565,31 @@ class TestDrawing:
     def test_render(self):
         assert_true(b'!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"' in self.simple.render('svg'))
 
+    def test_lod(self):
+        pts=[Point2(x/100,(x/100)**2) for x in range(101)]
+        chain=Chain([Segment2(p,q) for p,q in zip(pts,pts[1:])])
+        d=Drawing([chain,Group([Chain(chain)]),Circle((0,0),1)])
+        lod=d.lod(0.01)
+        assert_true(d.lod(0.01) is lod) # cached
+        assert_true(len(lod[0])<10)
+        assert_true(len(lod[1][0])<10)
+        assert_true(lod[2] is d[2])
+        assert_true(d.lod(0.1) is not lod)
+        chain[0].setattr(p=Point2(-1,0)) # modifying the drawing clears the cache
+        assert_true(d.lod(0.01) is not lod)
+        assert_equal(d.lod(0.01)[0].start,Point2(-1,0))
+        lod=d.lod(0.01)
+        d[1][0][0].setattr(p=Point2(-2,0)) # in a nested Group, without cached bbox
+        assert_true(d.lod(0.01) is not lod)
+        lod=d.lod(0.01)
+        d[1][0]._apply_transform(Trans(offset=(0,1)))
+        assert_equal(d.lod(0.01)[1][0].start,Point2(-2,1))
+        lod=d.lod(0.01)
+        d+=[Point2(5,5)]
+        assert_true(d.lod(0.01) is not lod)
+        assert_equal(len(d.lod(0.01)),4)
+        assert_true(d.render('png',tol=0.01))
+
 class TestSpline:
     def test___init__(self):
         # spline = Spline(points)
@@ -542,9 +701,20 @@ class TestInstance:
         raise SkipTest 
 
     def test___iter__(self):
-        # instance = Instance(group, trans, name)
-        # assert_equal(expected, instance.__iter__())
-        raise SkipTest 
+        block=Group([Segment2((0,0),(1,0))])
+        inner=Instance(block,Trans(offset=(1,0)))
+        inner.color='red'
+        outer=Instance(Group([inner,Point2(0,0)]),Trans(rotation=90))
+        res=list(outer)
+        assert_true(isinstance(res[0],Instance))
+        assert_true(res[0].group is block) # not copied
+        assert_equal(res[0].color,'red')
+        assert_equal(res[1],Point2(0,0))
+        assert_equal(list(res[0])[0],Segment2((0,1),(0,2)))
+        assert_equal(outer.bbox(),BBox((0,0),(0,2)))
+        assert_equal(res[0].bbox(),BBox((0,1),(0,2)))
+        block.append(Segment2((1,0),(3,0))) # invalidates cached bboxes of yielded Instances
+        assert_equal(res[0].bbox(),BBox((0,1),(0,4)))
 
     def test___repr__(self):
         # instance = Instance(group, trans, name)
@@ -556,6 +726,35 @@ class TestInstance:
         # assert_equal(expected, instance.from_dxf(blocks, mat3))
         raise SkipTest 
 
+class TestTransformStack:
+    def test_push(self):
+        stack=TransformStack()
+        assert_equal(stack.trans,None)
+        stack.push(Trans(offset=(1,0)))
+        assert_equal(stack.push(None),Trans(offset=(1,0)))
+        assert_equal(stack.push(Trans(scale=2)),Trans(scale=2,offset=(1,0)))
+        stack.pop()
+        stack.pop()
+        assert_equal(stack.pop(),Trans(offset=(1,0)))
+        assert_equal(stack.trans,None)
+
+    def test_walk(self):
+        block=Group([Segment2((0,0),(1,0)),Circle((0,0),1)])
+        inner=Group([Instance(block,Trans(offset=(0,i))) for i in range(3)])
+        top=Group([Instance(inner,Trans(scale=2)),Point2(5,5)])
+        res=list(TransformStack().walk(top))
+        assert_equal(len(res),7)
+        assert_true(res[0][0] is block[0]) # untransformed
+        assert_equal(res[5][1],Trans(scale=2,offset=(0,4)))
+        assert_equal(res[6],(top[1],None))
+        transformed=[e if t is None else t*e for e,t in res]
+        assert_equal(transformed,[e for i in top[0] for e in i]+[top[1]])
+
+    def test_apply(self):
+        xy=[(0,0),(1,2)]
+        assert_equal(TransformStack.apply(None,xy).tolist(),[[0,0],[1,2]])
+        assert_equal(TransformStack.apply(Trans(scale=2,offset=(1,1)),xy).tolist(),[[1,1],[3,5]])
+
 class TestCalcBulge:
     def test_calc_bulge(self):
         # assert_equal(expected, calcBulge(p1, bulge, p2))
@@ -563,8 +762,21 @@ class TestCalcBulge:
 
 class TestChains:
     def test_chains(self):
-        # assert_equal(expected, chains(group, tol, mergeable))
-        raise SkipTest 
+        pts=[Point2(0,0),Point2(1,0),Point2(1,1),Point2(0,1)]
+        square=[Segment2(pts[i-1],pts[i]) for i in range(4)]
+        other=Segment2(Point2(5,5),Point2(6,6))
+        group=[square[2],other,square[0].swap(),square[3],square[1]]
+        res=chains(group)
+        assert_equal(len(res),2)
+        assert_equal(len(res[0]),4)
+        assert_true(res[0].isclosed())
+        assert_equal(res[1],Chain([other]))
+
+        # mergeable prevents merging entities of different colors
+        for e,c in zip(square,['red','red','blue','blue']):
+            e.color=c
+        res=chains(square,mergeable=lambda c,e:c.color==e.color)
+        assert_equal(sorted(len(c) for c in res),[2,2])
 
 if __name__=="__main__":
     runmodule(level=logging.WARNING)
@@ -288,9 +288,24 @@ class TestMatrix3:
         raise SkipTest
 
     def test___mul__(self):
-        # matrix3 = Matrix3()
-        # assert_equal(expected, matrix3.__mul__(other))
-        raise SkipTest
+        mat=self.mat123*self.mat456
+        assert_equal(mat,Matrix3.from_array(np.dot(self.mat123,self.mat456)))
+        assert_equal(self.mat123,Matrix3(1,2,3,4,5,6,7,8,9)) # unchanged
+        assert_equal(Matrix3.new_translate(1,2)*Point2(1,1),Point2(2,3))
+
+    def test___array__(self):
+        a=np.asarray(self.mat456)
+        assert_equal(a.shape,(3,3))
+        assert_equal(a[0].tolist(),[4,9,3]) # by lines while Matrix3() args are by columns
+        assert_equal(a[:,2].tolist(),list(self.mat456[6:9]))
+        assert_equal(a.dtype,float)
+        assert_equal(np.asarray(self.mat456,dtype=int).dtype,int)
+        assert_equal(self.mat456.__array__(copy=True).tolist(),a.tolist()) # numpy 2 signature
+        assert_raises(ValueError,self.mat456.__array__,copy=False)
+
+    def test_from_array(self):
+        assert_equal(Matrix3.from_array(np.asarray(self.mat456)),self.mat456)
+        assert_equal(Matrix3.from_array(np.eye(3)),self.id3)
 
     def test___setitem__(self):
         pass # used everywhere
@@ -389,6 +404,84 @@ class TestPolar:
         # assert_equal(expected, Polar(mag, angle))
         raise SkipTest
 
+class TestPoint2Array:
+    @classmethod
+    def setup_class(self):
+        self.pts=[Point2(0,0),Point2(1,0),Point2(1,1),Point2(-2,3)]
+        self.a=Point2Array(self.pts)
+
+    def test___init__(self):
+        assert_equal(len(self.a),4)
+        assert_equal(Point2Array(self.a.array),self.a)
+        assert_equal(Point2Array([(0,0),(1,0)]).array.shape,(2,2))
+
+    def test___getitem__(self):
+        p=self.a[2]
+        assert_true(isinstance(p,Point2))
+        assert_equal(p,Point2(1,1))
+        assert_equal(self.a[1:3],self.pts[1:3])
+        a=Point2Array(self.a)
+        a[0].x=5 # view
+        assert_equal(a.array[0,0],5)
+        a.y[:]=0 # view
+        assert_equal(a[3],(-2,0))
+        assert_equal(self.a[3],(-2,3)) # copy was not affected
+
+    def test___eq__(self):
+        assert_true(self.a==self.pts)
+        assert_true(self.a==[tuple(p) for p in self.pts])
+        assert_false(self.a!=self.pts)
+        assert_false(self.a==self.pts[::-1])
+        a=Point2Array(self.a)
+        a[1:3]=self.pts[2:4] # slice assignment from Point2s
+        assert_equal(a[2],self.pts[3])
+
+    def test_arithmetic(self):
+        v=Vector2(1,2)
+        assert_equal(list(self.a+v),[p+v for p in self.pts])
+        assert_true(isinstance(self.a+v,Point2Array))
+        d=self.a-Point2(1,1)
+        assert_true(isinstance(d,Vector2Array))
+        assert_equal(list(d),[p-Point2(1,1) for p in self.pts])
+        assert_equal(list(self.a*2),[p*2 for p in self.pts])
+        assert_equal(list(-self.a),[-p for p in self.pts])
+
+    def test_arithmetic_reflected(self):
+        # scalar on the left must broadcast like the array on the left
+        p,v=Point2(1,1),Vector2(1,2)
+        d=p-self.a
+        assert_true(isinstance(d,Vector2Array))
+        assert_equal(list(d),[p-q for q in self.pts])
+        s=v+self.a
+        assert_true(isinstance(s,Point2Array))
+        assert_equal(list(s),[v+q for q in self.pts])
+        assert_true(isinstance(p+self.a,Vector2Array))
+        assert_equal(list(2*self.a),[2*q for q in self.pts])
+        assert_equal(list(v-Vector2Array(self.pts)),[v-Vector2(q) for q in self.pts])
+        assert_true(isinstance(self.a-self.a,Vector2Array))
+
+    def test_dot(self):
+        v=Vector2(3,-1)
+        assert_equal(list(self.a.dot(v)),[p.dot(v) for p in self.pts])
+
+    def test_cross(self):
+        assert_equal(list(self.a.cross()),[p.cross() for p in self.pts])
+
+    def test_normalize(self):
+        n=Vector2Array(self.a).normalized()
+        assert_equal(list(n),[Vector2(p).normalized() for p in self.pts])
+        assert_equal(list(self.a.mag()),[abs(p) for p in self.pts])
+
+    def test_distance(self):
+        p=Point2(1,2)
+        assert_equal(list(self.a.distance(p)),[q.distance(p) for q in self.pts])
+
+    def test_apply_transform(self):
+        m=Matrix3.new_rotate(pi/3).translate(1,2).scale(2)
+        assert_equal(list(m*self.a),[m*p for p in self.pts])
+        assert_equal(list(m*Vector2Array(self.a)),[m*Vector2(p) for p in self.pts])
+        assert_equal(self.a[3],(-2,3)) # not modified
+
 class TestLine2:
     @classmethod
     def setup_class(self):
@@ -674,9 +767,66 @@ class TestArgPair:
         #assert_equal(argPair(1),(1,1)) # not allowed anymore
 
 class TestCopy:
+    @classmethod
+    def setup_class(self):
+        self.objects=[Vector2(1,2),Point2(1,2),Line2((0,0),(1,1)),Segment2((0,0),(1,1)),
+            Circle((0,0),2),Arc2((0,0),(1,0),(0,1)),Ellipse((0,0),1,2),Matrix3.new_rotate(1)]
+
     def test_copy(self):
-        # assert_equal(expected, copy(object))
-        raise SkipTest 
+        for o in self.objects:
+            c=copy(o)
+            assert_equal(repr(c),repr(o))
+            assert_false(c is o)
+        s=Segment2((0,0),(1,1))
+        s.color='red' # derived classes have a __dict__
+        c=copy(s)
+        assert_equal(c.color,'red')
+        assert_false(c.p is s.p)
+
+    def test_slots(self):
+        for o in (Vector2(1,2),Line2((0,0),(1,1)),Matrix3()):
+            assert_false(hasattr(o,'__dict__'))
+        p=Point2(1,2)
+        p.layer=0 # Point2 keeps a __dict__ for drawing attributes
+        assert_equal(p.__dict__,{'layer':0})
+
+    def test_pickle(self):
+        import pickle
+        for o in self.objects:
+            for protocol in range(pickle.HIGHEST_PROTOCOL+1):
+                assert_equal(repr(pickle.loads(pickle.dumps(o,protocol))),repr(o))
+
+class TestIntersections:
+    def test_intersections(self):
+        s1=Segment2((0,0),(2,2))
+        s2=Segment2((0,2),(2,0))
+        s3=Segment2((2.5,1),(5,1)) # far from all but a
+        s4=Segment2((-1,-1),(.5,.5)) # colinear with s1
+        a=Arc2((3,1),(3,0),(3,2)) # right half circle
+        res=list(intersections([s1,s2,s3,s4,a]))
+        assert_equal(len(res),4)
+        assert_true((Point2(1,1),s1,s2) in res)
+        assert_true((Point2(4,1),s3,a) in res)
+        # colinear overlap generates ends of segment as in Line2.intersect
+        assert_true((Point2(-1,-1),s1,s4) in res)
+        assert_true((Point2(.5,.5),s1,s4) in res)
+        assert_equal(list(intersections([s1,s3])),[])
+
+    def test_scaling(self):
+        import time
+        def duration(n): # parallel segments all crossing the sweep line
+            segs=[Segment2((0,i),(1,i)) for i in range(n)]
+            t=time.time()
+            assert_equal(list(intersections(segs)),[])
+            return time.time()-t
+        t1=min(duration(2000) for _ in range(3))
+        t4=min(duration(8000) for _ in range(3))
+        assert_true(t4<8*t1+0.05) # quadratic would be 16 times longer
+
+    def test_arc_segment(self):
+        a=Arc2((0,0),(1,0),(0,1))
+        s=Segment2((0,0),(2,2))
+        assert_equal(a.intersect(s),Point2(sqrt(.5),sqrt(.5)))
 
 class TestCircleFrom3Points:
     def test_circle_from_3_points(self):
@@ -174,6 +174,21 @@ class TestMatrix4:
         assert_equal(mat123,self.mat123)
         assert_false(mat123 is self.mat123)
 
+    def test___array__(self):
+        a=np.asarray(self.mat123)
+        assert_equal(a.shape,(4,4))
+        assert_equal(a[0].tolist(),[1,4,7,0]) # by lines while Matrix4() args are by columns
+        mat=Matrix4.new_translate(1,2,3)
+        assert_equal(np.asarray(mat)[:3,3].tolist(),[1,2,3])
+        assert_equal(a.dtype,float)
+        assert_equal(self.mat123.__array__(None,True).tolist(),a.tolist()) # numpy 2 signature
+        assert_raises(ValueError,self.mat123.__array__,copy=False)
+
+    def test_from_array(self):
+        assert_equal(Matrix4.from_array(np.asarray(self.mat123)),self.mat123)
+        mat=Matrix4.new_rotatex(1)*Matrix4.new_translate(1,2,3)
+        assert_equal(Matrix4.from_array(np.dot(Matrix4.new_rotatex(1),Matrix4.new_translate(1,2,3))),mat)
+
     def test___call__(self):
         # matrix4 = Matrix4()
         # assert_equal(expected, matrix4.__call__(other))
@@ -457,6 +472,41 @@ class TestQuaternion:
 
 
 
+class TestVector3Array:
+    @classmethod
+    def setup_class(self):
+        self.vs=[Vector3(1,0,0),Vector3(0,1,2),Vector3(-1,2,3)]
+        self.a=Vector3Array(self.vs)
+
+    def test___getitem__(self):
+        v=self.a[1]
+        assert_true(isinstance(v,Vector3))
+        assert_equal(v,self.vs[1])
+        a=Vector3Array(self.a)
+        a[2].normalize() # in place, through the view
+        assert_equal(a[2],self.vs[2].normalized())
+
+    def test_arithmetic(self):
+        v=Vector3(1,2,3)
+        assert_equal(list(self.a+v),[w+v for w in self.vs])
+        assert_equal(list(self.a/2),[w/2 for w in self.vs])
+
+    def test_dot(self):
+        v=Vector3(1,2,3)
+        assert_equal(list(self.a.dot(v)),[w.dot(v) for w in self.vs])
+
+    def test_cross(self):
+        v=Vector3(1,2,3)
+        assert_equal(list(self.a.cross(v)),[w.cross(v) for w in self.vs])
+
+    def test_apply_transform(self):
+        m=Matrix4.new_rotate_axis(pi/3,Vector3(1,1,0)).translate(1,2,3)
+        assert_equal(list(m*self.a),[m*w for w in self.vs])
+        p=Point3Array(self.a)
+        assert_equal(list(m*p),[m*Point3(w) for w in self.vs])
+        m=Matrix4.new_perspective(pi/2,1.5,1.,100.)
+        assert_equal(list(m.transform(p)),[m.transform(Point3(w)) for w in self.vs])
+
 class TestPoint3:
     @classmethod
     def setup_class(self):
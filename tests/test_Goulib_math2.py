@@ -232,6 +232,14 @@ class TestSieve:
         last=sieve(10000)[-1] #more than _sieve for coverage
         assert_equal(last,9973)
 
+    def test_sieve_extend(self):
+        n=len(sieve(20000))
+        assert_equal(n,2262)
+        assert_equal(sieve(25),[2, 3, 5, 7, 11, 13, 17, 19, 23])
+        assert_equal(len(sieve(20000)),n) # smaller sieves are just reused
+        assert_true(is_prime(19997))
+        assert_false(is_prime(19999))
+
 class TestPrimes:
     def test_primes(self):
         last=primes(1001)[999] #more than _primes for coverage
@@ -348,11 +356,47 @@ class TestIsPrime:
         )
         assert_true(is_prime(643808006803554439230129854961492699151386107534013432918073439524138264842370630061369715394739134090922937332590384720397133335969549256322620979036686633213903952966175107096769180017646161851573147596390153))
         assert_false(is_prime(743808006803554439230129854961492699151386107534013432918073439524138264842370630061369715394739134090922937332590384720397133335969549256322620979036686633213903952966175107096769180017646161851573147596390153))
+        assert_true(is_prime(2**89-1))
+        assert_false(is_prime((2**61-1)*(2**89-1)))
+
+    def test_is_prime_cache(self):
+        is_prime_cache(16)
+        assert_true(is_prime(2**61-1))
+        assert_true(is_prime(2**61-1)) # from cache
+        is_prime_cache(0)
+        assert_true(is_prime(2**61-1))
+
+class TestIsPrimeMany:
+    def test_is_prime_many(self):
+        assert_equal(is_prime_many([1, 2, 9, 997, 2**61-1, 2**61+1]),[False, True, False, True, True, False])
+
+class TestJacobi:
+    def test_jacobi(self):
+        assert_equal(jacobi(1001,9907),-1)
+        assert_equal(jacobi(19,45),1)
+        assert_equal(jacobi(30,45),0)
 
 class TestPrimeFactors:
     def test_prime_factors(self):
         assert_equal(prime_factors(2014),[2, 19, 53])
         assert_equal(prime_factors(2048),[2, 2, 2, 2, 2, 2, 2, 2, 2, 2, 2])
+        assert_equal(prime_factors(1000000007*9999999967),[1000000007, 9999999967])
+        assert_equal(prime_factors(3**7*4099**2*1000003),[3]*7+[4099,4099,1000003])
+
+class TestPollardBrent:
+    def test_pollard_brent(self):
+        assert_equal(pollard_brent(2**64+1),274177)
+        n=1000003*1000037
+        d=pollard_brent(n)
+        assert_true(d in (1000003,1000037))
+
+class TestSpfSieve:
+    def test_spf_sieve(self):
+        spf=spf_sieve(10000)
+        assert_equal(spf[:10],[0,1,2,3,2,5,2,7,2,3])
+        assert_equal(spf[9991],97) # 97*103
+        assert_equal(prime_factors(9991),[97,103])
+        assert_equal(factorize(9216),[(2,10),(3,2)])
 
 class TestFactorize:
     def test_factorize(self):
@@ -621,6 +665,37 @@ class TestEulerPhi:
     def test_euler_phi(self):
         assert_equal(euler_phi(8849513),8843520)
 
+class TestEulerPhiRange:
+    def test_euler_phi_range(self):
+        assert_equal(euler_phi_range(10),[0, 1, 1, 2, 2, 4, 2, 6, 4, 6])
+        assert_equal(euler_phi_range(8849514)[-1],euler_phi(8849513))
+
+class TestMoebiusRange:
+    def test_moebius_range(self):
+        assert_equal(moebius_range(11),[0, 1, -1, -1, 0, -1, 1, -1, 0, 0, 1])
+
+class TestNumberOfDivisorsRange:
+    def test_number_of_divisors_range(self):
+        res=number_of_divisors_range(1000)
+        assert_equal(res[:10],[0, 1, 2, 2, 3, 2, 4, 2, 4, 3])
+        assert_equal(res[720],number_of_divisors(720))
+        assert_equal(res[997],2)
+
+class TestOmegaRange:
+    def test_omega_range(self):
+        assert_equal(omega_range(13),[0, 0, 1, 1, 1, 1, 2, 1, 1, 1, 2, 1, 2])
+        assert_equal(bigomega_range(13),[0, 0, 1, 1, 2, 1, 2, 1, 3, 2, 2, 1, 3])
+
+class TestIsPrimeRange:
+    def test_is_prime_range(self):
+        res=is_prime_range(10000)
+        assert_equal([i for i,p in enumerate(res) if p],sieve(10000))
+
+class TestDigsumRange:
+    def test_digsum_range(self):
+        assert_equal(digsum_range(1235)[1234],10)
+        assert_equal(digsum_range(256,2)[255],8)
+
 class TestRecurrence:
     def test_recurrence(self):
         # assert_equal(expected, recurrence(factors, values, max))
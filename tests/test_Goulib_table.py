@@ -8,6 +8,7 @@ from nose import SkipTest
 from Goulib.tests import *
 from Goulib.table import *
 import datetime,os, operator,six
+from Goulib import math2, stats
 
 class TestTable:
     
@@ -66,6 +67,21 @@ class TestTable:
         t.to_timedelta('timedelta')
         assert_equal(t,self.t)
         
+    def test_iter_csv(self):
+        filename=self.path+'/results/table/iter.csv'
+        self.t.save(filename)
+        t=Table(filename)
+        chunks=list(Table.iter_csv(filename,chunksize=10))
+        assert_equal([len(c) for c in chunks],[10,10,10,10,3])
+        assert_equal(chunks[0].titles,t.titles)
+        assert_equal(sum(chunks,[]),list(t))
+        
+        jones=list(ColumnTable.iter_csv(filename,usecols=['Rep','Cost'],where=lambda line:line[0]=='Jones'))
+        assert_equal(len(jones),1)
+        assert_equal(jones[0].titles,['Rep','Cost'])
+        assert_equal(len(jones[0]),8)
+        assert_equal(jones[0][0],['Jones',1.99])
+
     def test_write_csv(self):
         pass #tested in test_read_csv
     
@@ -204,9 +220,75 @@ class TestTable:
         raise SkipTest 
 
     def test_index(self):
-        # table = Table(filename, titles, data, **kwargs)
-        # assert_equal(expected, table.index(value, column))
-        raise SkipTest
+        t=Table(self.t)
+        i=t.index('Pencil','Item')
+        assert_equal(t[i,'Item'],'Pencil')
+        t.create_index('Item')
+        assert_equal(t.index('Pencil','Item'),i)
+        assert_equal(t.index('Eraser','Item'),None)
+
+    def test_lookup(self):
+        t=Table(titles=['k','v'],data=[['a',1],['b',2],['a',3]])
+        assert_equal(t.lookup('a','k'),[0,2])
+        t.create_index('k')
+        assert_equal(t.lookup('a','k'),[0,2])
+        t.append(['a',4])
+        t.set(0,'k','c')
+        assert_equal(t.lookup('a','k'),[2,3])
+        assert_equal(t.lookup('c','k'),[0])
+        t.setcol('k','b')
+        assert_equal(t.lookup('b','k'),[0,1,2,3])
+        t.append({'v':5}) # k is None
+        assert_equal(t.lookup(None,'k'),[4])
+        t.sort('v',reverse=True) # invalidates
+        assert_equal(t.lookup('b','k'),[1,2,3,4])
+        u=Table(t) # copy has no index data
+        del t[0]
+        assert_equal(t.lookup('b','k'),[0,1,2,3])
+        assert_equal(u.lookup('b','k'),[1,2,3,4])
+        t*=2
+        assert_equal(t.lookup('b','k'),list(range(8)))
+        t+=[['a',6]]
+        assert_equal(t.lookup('a','k'),[8])
+        t.clear()
+        assert_equal(t.lookup('b','k'),[])
+
+    def test_between(self):
+        t=Table(titles=['k','v'],data=[['a',3],['b',1],['c',None],['d',2]])
+        assert_equal(t.between(2,3,'v'),[3,0])
+        t.set(1,'v',5)
+        t.append(['e',2.5])
+        assert_equal(t.between(2,3,'v'),[3,4,0])
+        assert_equal(t.between(hi=2,column='v'),[3])
+        assert_equal(t.lookup(5,'v'),[1])
+        t.create_index('k') # hash index is not replaced
+        assert_equal(t.between('b','c','k'),[1,2])
+        assert_equal(t._indexes[0][0],'hash')
+
+    def test_pickle(self):
+        import pickle
+        t=Table(titles=['k','v'],data=[['a',1],['b',2],['a',3]])
+        t.create_index('k')
+        assert_equal(t.lookup('a','k'),[0,2])
+        u=pickle.loads(pickle.dumps(t))
+        assert_equal(u,t)
+        assert_equal(u.titles,t.titles)
+        assert_equal(u.lookup('a','k'),[0,2])
+        c=pickle.loads(pickle.dumps(ColumnTable(t)))
+        assert_equal(list(c),list(t))
+
+    def test_join(self):
+        bom=Table(titles=['part','qty'],data=[['p1',2],['p2',1],['p3',4],['p1',1]])
+        parts=Table(titles=['part','price','desc'],data=[['p1',1.5,'bolt'],['p2',10.,'plate']])
+        t=bom.join(parts,'part')
+        assert_equal(t.titles,['part','qty','price','desc'])
+        assert_equal(list(t),[['p1',2,1.5,'bolt'],['p2',1,10.,'plate'],['p1',1,1.5,'bolt']])
+        parts.create_index('part')
+        t=bom.join(parts,['part'],how='left')
+        assert_equal(len(t),4)
+        assert_equal(t[2],['p3',4,None,None])
+        assert_raises(ValueError,bom.join,parts,'part','right')
+        assert_equal(len(Table().join(Table(),0)),0) # no titles, no rows
     
     def test_transpose(self):
         t=self.t.transpose()
@@ -233,6 +315,23 @@ class TestTable:
         # assert_equal(expected, table.groupby_gen(by, sort, removecol))
         raise SkipTest # TODO: implement your test here
 
+    def test_aggregate(self):
+        t=Table(self.path+'/data/test.xls') # in file order, as other tests sort self.t
+        t.applyf('Cost',float)
+        t.applyf('Total',lambda x:float(x) if isinstance(x,(six.integer_types,float)) else float(x.replace(',','')))
+        a=t.aggregate(u'Région',count=True,sum=u'Unités',mean='Cost',min='Rep',max='Total')
+        assert_equal(a.titles,[u'Région','count',u'sum(Unités)','mean(Cost)','min(Rep)','max(Total)'])
+        assert_equal(a.col(u'Région'),['East','Central','West'])
+        assert_equal(a.col('count'),[13,24,6])
+        assert_equal(sum(a.col(u'sum(Unités)')),2121)
+        east=[row for row in t if row[1]=='East']
+        assert_true(math2.isclose(a[0][3],stats.mean(row[5] for row in east)))
+        assert_equal(a[0][4],min(row[2] for row in east))
+        # several keys, None ignored
+        t=Table(titles=['k1','k2','v'],data=[['a',1,1.],['a',2,2.],['a',1,None],['b',1,4.],['a',1,3.]])
+        a=t.aggregate(['k1','k2'],count=['v'],sum='v',var='v')
+        assert_equal(list(a),[['a',1,2,4.,2.],['a',2,1,2.,0],['b',1,1,4.,0]])
+
     def test_json(self):
         # table = Table(data, **kwargs)
         # assert_equal(expected, table.json(**kwargs))
@@ -263,6 +362,137 @@ class TestTable:
         # assert_equal(expected, table.to_timedelta(by, fmt, skiperrors))
         raise SkipTest # TODO: implement your test here
 
+class TestColumnTable:
+
+    @classmethod
+    def setup_class(self):
+        self.path=os.path.dirname(os.path.abspath(__file__))
+        self.t=Table(self.path+'/data/test.xls')
+        self.t.applyf('Cost',float)
+        self.t.to_date('OrderDate',fmt=['%m/%d/%Y','Excel'])
+        self.c=ColumnTable(self.t)
+
+    def test___init__(self):
+        assert_equal(self.c,self.t)
+        assert_equal(len(self.c),len(self.t))
+        assert_equal(self.c.ncols(),self.t.ncols())
+        assert_equal(self.c.columns[self.c._i('Rep')].categories[:3],['Jones', 'Kivell', 'Jardine'])
+
+    def test___getitem__(self):
+        assert_equal(self.c[3],self.t[3])
+        assert_equal(self.c[3,'Cost'],self.t[3,'Cost'])
+        assert_equal(self.c[2:5],self.t[2:5])
+
+    def test_html(self):
+        assert_equal(self.c.html(),self.t.html())
+
+    def test_sort(self):
+        c=ColumnTable(self.c)
+        c.sort('Cost')
+        col=c.col('Cost')
+        assert_equal(col[0],1.29)
+        assert_equal(col[-1],275)
+        c.sort('Rep')
+        assert_equal(c.col('Rep'),sorted(self.t.col('Rep')))
+
+    def test_groupby(self):
+        d=self.c.groupby(u'Région')
+        assert_equal(list(d),['Central', 'East', 'West'])
+        assert_equal(len(d['East']),13)
+        assert_equal(d['East'].ncols(),self.c.ncols()-1)
+        assert_equal(self.c,self.t) # not sorted
+
+    def test_aggregate(self):
+        kw=dict(count=True,sum='Cost',mean=u'Unités',var='Cost',min='Cost',max=u'Unités')
+        for by in (u'Région',['Rep','Item'],'Item'):
+            a=self.c.aggregate(by,**kw)
+            b=self.t.aggregate(by,**kw)
+            assert_true(isinstance(a,ColumnTable))
+            assert_equal(a.titles,b.titles)
+            assert_equal(len(a),len(b))
+            for ra,rb in zip(a,b):
+                for x,y in zip(ra,rb):
+                    if isinstance(x,float):
+                        assert_true(math2.isclose(x,y))
+                    else:
+                        assert_equal(x,y)
+        # fallback for non numeric columns
+        assert_equal(self.c.aggregate('Item',min='Rep'),self.t.aggregate('Item',min='Rep'))
+
+    def test_total(self):
+        c=ColumnTable(self.c)
+        assert_equal(c.total([None,None,None,None,sum,max]),[None,None,None,None,2121,275,None])
+
+    def test_to_date(self):
+        c=ColumnTable(titles=['d'],data=[['2017-01-01'],['2017-01-02'],['2017-01-01']])
+        c.to_date('d')
+        assert_equal(c.col('d'),[date(2017,1,1),date(2017,1,2),date(2017,1,1)])
+
+    def test_append(self):
+        c=ColumnTable(titles=['a','b'],data=[[1,'x']])
+        c.append({'a':2,'c':3.5})
+        c.append([3,'y'])
+        assert_equal(list(c),[[1,'x',None],[2,None,3.5],[3,'y',None]])
+        c.set(0,'a','z')
+        assert_equal(c.col('a'),['z',2,3])
+
+    def test_remove_lines_where(self):
+        c=ColumnTable(self.c)
+        assert_equal(c.remove_lines_where('Rep',('Jones',)),8)
+        assert_equal(len(c),len(self.c)-8)
+
+    def test_list_methods(self):
+        rows=[[1,'a',1.5],[2,'b',None],[3,'a',2.5]]
+        c=ColumnTable(rows)
+        t=Table(rows)
+        for x in (c,t):
+            x.insert(1,[9,'z',0.5])
+            x.reverse()
+        assert_equal(list(c),list(t))
+        assert_equal(list(reversed(c)),list(reversed(t)))
+        assert_true([9,'z',0.5] in c)
+        assert_false([7,'z',0.5] in c)
+        assert_equal(c.count([1,'a',1.5]),1)
+        assert_equal(c.pop(),t.pop())
+        assert_equal(c.pop(0),t.pop(0))
+        del c[0]
+        del t[0]
+        assert_equal(list(c),list(t))
+        c+=[[5,'q',1.0]]
+        t+=[[5,'q',1.0]]
+        assert_equal(list(c),list(t))
+        c[0:1]=[[6,'w',2.0],[7,'e',3.0]]
+        t[0:1]=[[6,'w',2.0],[7,'e',3.0]]
+        assert_equal(list(c),list(t))
+        c.remove([7,'e',3.0])
+        assert_equal(list(c),[[6,'w',2.0],[5,'q',1.0]])
+        assert_raises(ValueError,c.remove,[7,'e',3.0])
+        assert_false(c!=ColumnTable(c))
+        assert_equal(c+[[1]],list(c)+[[1]])
+        del c[:]
+        assert_equal(len(c),0)
+        assert_raises(IndexError,c.pop)
+        assert_raises(IndexError,c.__delitem__,0)
+
+    def test_total_none(self):
+        rows=[[1.5],[None],[2.5]]
+        assert_equal(ColumnTable(rows).total([sum]),Table(rows).total([sum]))
+
+class TestColumn:
+    def test_extend(self):
+        c=Column(['a','b'])
+        d=c.take([0])
+        for x in ('c',None,'a'):
+            c.extend([x])
+        assert_equal(c.tolist(),['a','b','c',None,'a'])
+        assert_equal(d.categories,['a','b']) # not modified
+        c=Column([1])
+        c.extend([2.5])
+        c.extend([None])
+        assert_equal(c.tolist(),[1,2.5,None])
+        c.extend(['x']) # type changes
+        assert_equal(c.tolist(),[1,2.5,None,'x'])
+
 class TestAttr:
     def test_attr(self):
         # assert_equal(expected, attr(args))